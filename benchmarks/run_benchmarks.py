@@ -0,0 +1,290 @@
+"""Benchmark the real loader and game loop on synthetic mazes of growing size.
+
+Each case runs in its own subprocess, under a memory limit and a timeout, so
+peak memory is measured per case. A case that blows up is recorded as failed
+instead of taking the whole run down. Results are written as JSON. They can
+be compared against a stored baseline so that regressions show up.
+
+    python benchmarks/run_benchmarks.py                      # default size sweep
+    python benchmarks/run_benchmarks.py --sizes 100,2000 --frames 600
+    python benchmarks/run_benchmarks.py --level ghost_boss.csv --headless
+    python benchmarks/run_benchmarks.py --save-baseline      # store results as the new baseline
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+GENERATED_DIR = os.path.join(BENCH_DIR, 'generated')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+
+DEFAULT_SIZES = (100, 250, 500, 1000, 2000)
+VIEW_SIZE = (1800, 960)
+
+# Metrics compared against the baseline (lower is better)
+COMPARED_METRICS = ('load_cold_s', 'load_warm_s', 'frame_mean_ms', 'frame_p95_ms', 'peak_rss_mb')
+
+
+def generate_synthetic_level(path, size, walls=0.25, colored=0.05, ghosts=0.0005, boxes=0.001, spikes=0.001, seed=0):
+    """
+    Write a size x size level with a solid border and tokens scattered at the given densities.
+    The player starts in the top-left corner and the endpoint is in the bottom-right one.
+    Rows are streamed to disk, so this never holds the whole level in memory.
+    """
+    rng = random.Random(seed)
+    thresholds = []
+    total = 0.0
+    for token, density in (('w', walls), ('wr', colored / 3), ('wg', colored / 3), ('wb', colored / 3),
+                           ('er', ghosts), ('br', boxes), ('tgr', spikes)):
+        total += density
+        thresholds.append((total, token))
+
+    with open(path, 'w') as f:
+        for row in range(size):
+            cells = []
+            for col in range(size):
+                if row in (0, size - 1) or col in (0, size - 1):
+                    cells.append('w')
+                elif (row, col) == (1, 1):
+                    cells.append('p')
+                elif (row, col) == (size - 2, size - 2):
+                    cells.append('end')
+                elif row <= 3 and col <= 3:
+                    cells.append('o')  # Keep the spawn clear
+                else:
+                    roll = rng.random()
+                    cells.append(next((token for limit, token in thresholds if roll < limit), 'o'))
+            f.write(' '.join(cells) + '\n')
+
+
+def synthetic_level_path(size, densities, seed):
+    """Generated levels are cached by their parameters."""
+    name = 'bench_{}_w{walls}_c{colored}_g{ghosts}_b{boxes}_s{spikes}_{seed}.csv'.format(size, seed=seed, **densities)
+    path = os.path.join(GENERATED_DIR, name)
+    if not os.path.exists(path):
+        os.makedirs(GENERATED_DIR, exist_ok=True)
+        generate_synthetic_level(path, size, seed=seed, **densities)
+    return path
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(level_path, frames, warmup, headless, seed, streaming=False, horde=False):
+    """Load level_path and run the game loop for frames steps. Runs inside the child process."""
+    import contextlib
+    import io
+
+    from src.world import World, Inputs, init_headless
+    from src.level_format import compiled_path
+    from src.render import Camera, draw_world
+    from src.profiler import percentile
+    from src.variants import variant_cache_size
+    import pygame
+
+    init_headless()
+    screen = None if headless else pygame.Surface(VIEW_SIZE)
+
+    # Cold load compiles the CSV, warm load reads the compiled cache
+    cache = compiled_path(level_path)
+    if os.path.exists(cache):
+        os.remove(cache)
+    quiet = io.StringIO()
+    result = {}
+    for label in ('load_cold_s', 'load_warm_s'):
+        with contextlib.redirect_stdout(quiet):
+            start = time.perf_counter()
+            world = World(levels=[level_path], levels_dir='', preload=False, seed=seed, streaming=streaming,
+                          horde=horde)
+            result[label] = time.perf_counter() - start
+    if not world.player:
+        raise RuntimeError(f"{level_path} has no player spawn")
+
+    level = world.level
+    result['sprites'] = {name: len(level[name]) for name in ('all_sprites', 'dynamic_sprites', 'solid_sprites',
+                                                              'enemies', 'boxes', 'traps')}
+    result['tiles'] = level['tilemap'].width * level['tilemap'].height
+
+    # Steady state: a seeded random walk with the occasional mask switch
+    rng = random.Random(seed)
+    camera = Camera(*VIEW_SIZE)
+    held = Inputs()
+    times = []
+    with contextlib.redirect_stdout(quiet):
+        for frame in range(warmup + frames):
+            if frame % 20 == 0:
+                held = Inputs(left=rng.random() < 0.4, right=rng.random() < 0.5,
+                              up=rng.random() < 0.4, down=rng.random() < 0.5)
+            equip = rng.choice(('red', 'green', 'blue')) if frame % 90 == 45 else None
+            inputs = Inputs(held.left, held.right, held.up, held.down, equip=equip)
+            start = time.perf_counter()
+            world.step(inputs, 1 / 60)
+            if screen is not None:
+                camera.update(world.player)
+                draw_world(screen, world, camera)
+            if frame >= warmup:
+                times.append(time.perf_counter() - start)
+            if not world.running:
+                break
+    world.shutdown()
+
+    result['frames'] = len(times)
+    result['frame_mean_ms'] = sum(times) / len(times) * 1000 if times else 0.0
+    result['frame_p95_ms'] = percentile(times, 0.95) * 1000
+    result['frame_max_ms'] = max(times, default=0.0) * 1000
+    result['peak_rss_mb'] = peak_rss_mb()
+    result['variant_cache'], result['variant_cache_bytes'] = variant_cache_size()
+    return result
+
+
+def run_case_in_subprocess(name, level_path, args):
+    """Run one case in a fresh interpreter with a memory limit and timeout."""
+    command = [sys.executable, os.path.abspath(__file__), '--child', level_path,
+               '--frames', str(args.frames), '--warmup', str(args.warmup), '--seed', str(args.seed)]
+    if args.headless:
+        command.append('--headless')
+    if args.streaming:
+        command.append('--streaming')
+    if args.horde:
+        command.append('--horde')
+
+    def limit_memory():
+        try:
+            import resource
+            limit = args.max_memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError):
+            pass
+
+    print(f"  {name} ...", end='', flush=True)
+    start = time.perf_counter()
+    try:
+        proc = subprocess.run(command, capture_output=True, text=True, timeout=args.timeout,
+                              preexec_fn=limit_memory if os.name == 'posix' else None)
+    except subprocess.TimeoutExpired:
+        print(f" timed out after {args.timeout}s")
+        return {'name': name, 'level': level_path, 'status': 'timeout'}
+
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        error = (proc.stderr.strip().splitlines() or ['exit code %d' % proc.returncode])[-1]
+        print(f" failed: {error}")
+        return {'name': name, 'level': level_path, 'status': 'failed', 'error': error}
+
+    result = json.loads(lines[-1])
+    result.update(name=name, level=level_path, status='ok', wall_s=time.perf_counter() - start)
+    print(" load {load_cold_s:.2f}s/{load_warm_s:.2f}s  frame {frame_mean_ms:.2f}ms (p95 {frame_p95_ms:.2f})"
+          "  rss {peak_rss_mb:.0f}MB  sprites {sprites[all_sprites]}".format(**result))
+    return result
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Print metrics that got more than tolerance worse than the baseline. Returns the number of regressions."""
+    previous = {case['name']: case for case in baseline.get('cases', []) if case.get('status') == 'ok'}
+    regressions = 0
+    for case in results['cases']:
+        old = previous.get(case['name'])
+        if old is None:
+            continue
+        if case.get('status') != 'ok':
+            print(f"REGRESSION {case['name']}: {case.get('status')} (baseline ran fine)")
+            regressions += 1
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = old.get(metric), case.get(metric)
+            if before and after is not None and after > before * (1 + tolerance):
+                print(f"REGRESSION {case['name']} {metric}: {before:.3f} -> {after:.3f} (+{(after / before - 1) * 100:.0f}%)")
+                regressions += 1
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark level loading and the game loop")
+    parser.add_argument('--level', action='append', help="Benchmark an existing level (name in mazes/ or a path)")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help="Synthetic maze sizes in tiles")
+    parser.add_argument('--frames', type=int, default=300, help="Measured frames per case")
+    parser.add_argument('--warmup', type=int, default=30, help="Frames run before measuring")
+    parser.add_argument('--headless', action='store_true', help="Simulation only, skip rendering")
+    parser.add_argument('--streaming', action='store_true', help="Load levels in streaming mode")
+    parser.add_argument('--horde', action='store_true', help="Simulate ghosts as NumPy arrays")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--walls', type=float, default=0.25, help="Neutral wall density")
+    parser.add_argument('--colored', type=float, default=0.05, help="Colored wall density")
+    parser.add_argument('--ghosts', type=float, default=0.0005, help="Ghost density")
+    parser.add_argument('--boxes', type=float, default=0.001, help="Box density")
+    parser.add_argument('--spikes', type=float, default=0.001, help="Spike density")
+    parser.add_argument('--timeout', type=int, default=600, help="Seconds before a case is abandoned")
+    parser.add_argument('--max-memory-mb', type=int, default=8192, help="Address space limit per case")
+    parser.add_argument('--output', help="Results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="Write these results as the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed slowdown before flagging (0.2 = 20%%)")
+    parser.add_argument('--child', metavar='LEVEL', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_case(args.child, args.frames, args.warmup, args.headless, args.seed, args.streaming,
+                                  args.horde)))
+        return 0
+
+    cases = []
+    # Streaming and horde runs get their own baseline entries
+    suffix = ('_streaming' if args.streaming else '') + ('_horde' if args.horde else '')
+    for level in args.level or []:
+        path = level if os.path.exists(level) else os.path.join(ROOT, 'mazes', level)
+        cases.append((os.path.basename(path) + suffix, path))
+    if not args.level:
+        densities = {'walls': args.walls, 'colored': args.colored, 'ghosts': args.ghosts,
+                     'boxes': args.boxes, 'spikes': args.spikes}
+        for size in (int(s) for s in args.sizes.split(',') if s.strip()):
+            print(f"Generating {size}x{size} maze...")
+            cases.append((f"synthetic_{size}{suffix}", synthetic_level_path(size, densities, args.seed)))
+
+    print(f"Running {len(cases)} case(s), {args.frames} frames each{' (headless)' if args.headless else ''}")
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {'frames': args.frames, 'warmup': args.warmup, 'headless': args.headless, 'seed': args.seed,
+                     'streaming': args.streaming, 'horde': args.horde},
+        'cases': [run_case_in_subprocess(name, path, args) for name, path in cases],
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime('bench_%Y%m%d_%H%M%S.json'))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=1)
+    print(f"Results written to {output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=1)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        print(f"{regressions} regression(s) against {args.baseline}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,64 +1,94 @@
 import pygame
 import sys
 import os
+import argparse
+import random
+import time
 from glob import glob
-from src.audio import SoundManager
+from src.audio import SoundManager, CACHE_DIR_NAME as SOUND_CACHE_DIR
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from src.loader import load_level
-from src.entities import Player, Wall
+from src.world import World, Inputs, init_headless
+from src.replay import InputRecorder, Replay, play_replay, DEFAULT_FPS
+from src.profiler import FrameProfiler
+from src.render import Camera, DirtyRenderer, draw_world
+from src.mazegen import write_level
+from src.hud import HUD
 
-TILE_SIZE = 32
 WIDTH, HEIGHT = 1800, 960
 
-# Level list - order matters
-LEVELS = [
-    '_tutorial_0.csv',
-    '_tutorial_1.csv',
-    '_tutorial_2.csv',    
-    '_wall_level_1.csv',
-    '_tutorial_spike_1.csv',     
-    '_tutorial_spike_2.csv',
-    '_level_1.csv',
-    '_level_2.csv', 
-    '_tutorial_ghost_0.csv',  
-    '_tutorial_ghost.csv',
-    'tutorial_box.csv',
-    'maze_level_2.csv', 
-    'maze_level_3.csv',
-    'maze_level_4.csv',
-    'maze_level_omri1.csv',
-    'maze_level_omri2.csv',
-    'ghost_boss.csv',
-    'you_win.csv'
-]
+parser = argparse.ArgumentParser(description="Masks - Game Jam")
+parser.add_argument('--seed', type=int, help="Seed for every random choice (cobwebs, sound variants)")
+parser.add_argument('--fixed-step', action='store_true', help="Advance 1/60 s per frame instead of wall-clock time")
+parser.add_argument('--record', metavar='FILE', help="Record this run's inputs to FILE (implies --fixed-step)")
+parser.add_argument('--replay', metavar='FILE', help="Play back a recorded run at maximum speed")
+parser.add_argument('--headless', action='store_true', help="With --replay: no window or audio, just simulate")
+parser.add_argument('--profile', metavar='FILE', help="Profile every frame and write the trace (.csv or .json) on exit")
+parser.add_argument('--generate', metavar='WxH', help="Play a freshly generated maze of this size in tiles")
+parser.add_argument('--streaming', action='store_true', help="Create level entities only near the camera (for huge mazes)")
+parser.add_argument('--dirty-rects', action='store_true', help="Repaint and present only the screen areas that changed")
+parser.add_argument('--horde', action='store_true', help="Simulate ghosts as NumPy arrays (for levels with hundreds of them)")
+args = parser.parse_args()
+if args.generate and (args.record or args.replay):
+    parser.error("--generate cannot be combined with --record or --replay")
+
+# F3 toggles the profiler overlay, F4 dumps the buffered trace
+profiler = FrameProfiler(enabled=bool(args.profile))
+
+replay = Replay.load(args.replay) if args.replay else None
+if replay:
+    # The recording decides the seed and simulation mode
+    args.seed = replay.seed
+    args.streaming = replay.streaming
+    args.horde = replay.horde
+elif args.seed is None and args.record:
+    args.seed = random.randrange(2**32)
+fixed_step = args.fixed_step or bool(args.record) or bool(replay)
+
+if replay and args.headless:
+    # Simulate the whole replay without opening a window
+    init_headless()
+    start = time.perf_counter()
+    world = play_replay(replay, profiler=profiler)
+    elapsed = time.perf_counter() - start
+    digest = world.state_digest()
+    print(f"Replayed {len(replay)} frames in {elapsed:.2f}s ({len(replay) / max(elapsed, 1e-9):.0f} frames/s)")
+    print(f"Final level {world.level_index + 1}, state {digest}")
+    if replay.final_digest and replay.final_digest != digest:
+        print(f"Warning: replay diverged from the recording (recorded state {replay.final_digest})")
+    if args.profile:
+        print(f"Profile written to {profiler.export(args.profile)}")
+    world.shutdown()
+    sys.exit()
 
 pygame.mixer.pre_init(frequency=44100, size=-16, channels=2, buffer=512)
 pygame.init()
 
 # After pygame.init()
 assets_path = os.path.join(os.path.dirname(__file__), 'assets', 'game sound')
-sound_manager = SoundManager(assets_path)
+# Sounds decode on background workers (cached next to the assets), so the window opens right away
+sound_manager = SoundManager(assets_path, rng=random.Random(args.seed), workers=2,
+                             cache_dir=os.path.join(assets_path, SOUND_CACHE_DIR))
 
-# Load sound effects
+# Register sound effects
 sound_manager.load_sound('key', 'sound effects/key/key1.wav')
 sound_manager.load_sound('trap', 'sound effects/trap/trap1.wav', volume=0.5)
 sound_manager.load_sound('button', 'sound effects/button/button1.wav')
 
-# Load drag sound variants (for door opening)
+# Register drag sound variants (for door opening)
 drag_sounds = glob(os.path.join(assets_path, 'sound effects', 'drag', '*.wav'))
 sound_manager.load_sound_variants('drag', drag_sounds)
 
-# Load hurt sound variants (for taking damage)
+# Register hurt sound variants (for taking damage)
 hurt_sounds = glob(os.path.join(assets_path, 'sound effects', 'hurt', '*.wav'))
 sound_manager.load_sound_variants('hurt', hurt_sounds)
 
 # Start background music
 sound_manager.play_music('music/MainMusic.wav')
 
-# Load chase music
+# Register chase music
 sound_manager.load_chase_music('music/ChaseMusic.wav', volume=0.3)
 
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
@@ -66,421 +96,138 @@ pygame.display.set_caption("Masks - Game Jam")
 
 clock = pygame.time.Clock()
 running = True
-current_level_index = 0
-
-
-def load_level_by_index(index):
-    """Load a level by its index in the LEVELS list."""
-    if index >= len(LEVELS):
-        return None
-    level_path = os.path.join(os.path.dirname(__file__), 'mazes', LEVELS[index])
-    return load_level(level_path, TILE_SIZE)
 
+# Generated mazes are written under mazes/generated and played on their own
+levels = None
+if args.generate:
+    width, height = (int(value) for value in args.generate.lower().split('x'))
+    maze_seed = args.seed if args.seed is not None else random.randrange(2**32)
+    generated_dir = os.path.join(os.path.dirname(__file__), 'mazes', 'generated')
+    os.makedirs(generated_dir, exist_ok=True)
+    levels = [write_level(os.path.join(generated_dir, f'maze_{width}x{height}_{maze_seed}.csv'), width, height, maze_seed)]
+    print(f"Generated {width}x{height} maze (seed {maze_seed})")
 
 # Load initial level
-level_data = load_level_by_index(current_level_index)
+world = World(levels=levels, sound_manager=sound_manager, start_level=replay.start_level if replay else 0, seed=args.seed,
+              profiler=profiler, streaming=args.streaming, horde=args.horde)
+show_profiler = bool(args.profile)
+recorder = InputRecorder(args.record, args.seed, streaming=args.streaming, horde=args.horde) if args.record else None
+replay_inputs = replay.inputs() if replay else None
 
-if not level_data:
+if not world.level:
     print("Error: Could not load any levels!")
+    world.shutdown()
+    sound_manager.shutdown()
     pygame.quit()
     sys.exit()
 
-player = level_data['player']
-all_sprites = level_data['all_sprites']
-solid_sprites = level_data['solid_sprites']
-mask_sprites = level_data['mask_sprites']
-endpoints = level_data['endpoints']
-doors = level_data['doors']
-keys = level_data['keys']
-enemies = level_data['enemies']
-traps = level_data['traps']
-plate_presses = level_data['presses']
-boxes = level_data['boxes']
-
-if not player:
+if not world.player:
     print("Error: No player spawn point found in level!")
+    world.shutdown()
+    sound_manager.shutdown()
     pygame.quit()
     sys.exit()
 
 
-class Camera:
-    """Camera that follows the player."""
-    def __init__(self, width, height):
-        self.camera = pygame.Rect(0, 0, width, height)
-        self.width = width
-        self.height = height
-    
-    def apply(self, entity):
-        """Apply camera offset to an entity's rect."""
-        return entity.rect.move(-self.camera.x, -self.camera.y)
-    
-    def update(self, target):
-        """Update camera to follow target (player)."""
-        # Center camera on target
-        x = target.rect.centerx - self.width // 2
-        y = target.rect.centery - self.height // 2
-        
-        # Clamp camera to level bounds (prevent black borders)
-        x = max(0, x)
-        y = max(0, y)
-        
-        self.camera.x = x
-        self.camera.y = y
-
-
 camera = Camera(WIDTH, HEIGHT)
+dirty_renderer = DirtyRenderer() if args.dirty_rects else None
 
+# HUD text is only re-rendered when it changes
+hud = HUD()
+hud.add_text('help', (10, HEIGHT - 110), "1=Red, 2=Green, 3=Blue, 0=No Mask | R=Reset | Arrow Keys=Move",
+             color=(150, 150, 150))
+hud.add_text('level', (10, HEIGHT - 80))
+hud.add_text('mask', (10, HEIGHT - 50))
+hud.add_text('lives', (10, HEIGHT - 20))
 
-def update_mask_effects(player, mask_sprites):
-    """Update which sprites are solid/ghostly based on player's mask."""
-    for sprite in mask_sprites:
-        if hasattr(sprite, 'color'):
-            if player.current_mask == sprite.color:
-                # Make sprite ghostly and non-collidable
-                if hasattr(sprite, 'toggle'):
-                    sprite.toggle(False)
-            else:
-                # Make sprite solid and collidable
-                if hasattr(sprite, 'toggle'):
-                    sprite.toggle(True)
-
-
-def check_aabb_collision(rect1, rect2):
-    """Check if two rects overlap (AABB collision)."""
-    return rect1.colliderect(rect2)
-
-
-def resolve_collision(player, solid_sprites):
-    """
-    Resolve player collision with solid sprites.
-    Player stops when hitting a solid sprite.
-    Handles X and Y collisions separately so player can slide along walls.
-    """
-    # Move on X axis and check collision
-    player.pos.x += player.velocity.x
-    player.rect.x = player.pos.x
-    
-    for solid in solid_sprites:
-        if hasattr(solid, 'on_off') and not solid.on_off:
-            continue
-        if hasattr(solid, 'is_open') and solid.is_open:
-            continue  # Skip open doors
-        if check_aabb_collision(player.rect, solid.rect):
-            # Undo X movement
-            player.pos.x -= player.velocity.x
-            player.rect.x = player.pos.x
-            player.velocity.x = 0
-            break
-    
-    # Move on Y axis and check collision
-    player.pos.y += player.velocity.y
-    player.rect.y = player.pos.y
-    
-    for solid in solid_sprites:
-        if hasattr(solid, 'on_off') and not solid.on_off:
-            continue
-        if hasattr(solid, 'is_open') and solid.is_open:
-            continue  # Skip open doors
-        if check_aabb_collision(player.rect, solid.rect):
-            # Undo Y movement
-            player.pos.y -= player.velocity.y
-            player.rect.y = player.pos.y
-            player.velocity.y = 0
-            break
-
-
-def handle_mask_pickup(player, mask_sprites):
-    """Check if player touches a mask and equip it."""
-    for mask_obj in mask_sprites:
-        if hasattr(mask_obj, 'color') and not hasattr(mask_obj, 'on_off'):
-            # This is a mask (has color but no on_off toggle)
-            if isinstance(mask_obj, type(player)) or mask_obj.__class__.__name__ == 'Mask':
-                if check_aabb_collision(player.rect, mask_obj.rect):
-                    player.equip_mask(mask_obj.color)
-                    sound_manager.play_sound('button')
-                    mask_obj.kill()
-
-
-def handle_key_pickup(player, keys, doors):
-    """Check if player collects a key and open corresponding door."""
-    for key in keys:
-        if check_aabb_collision(player.rect, key.rect):
-            # Find and open the corresponding door
-            for door in doors:
-                if door.door_id == key.key_id:
-                    door.open_door()
-                    sound_manager.play_sound('drag')  # Play random drag sound
-                    # Remove door from solid_sprites so it's not collidable
-                    if door in solid_sprites:
-                        solid_sprites.remove(door)
-            key.kill()
-
-
-def check_level_complete(player, endpoints):
-    """Check if player reached the level endpoint."""
-    for endpoint in endpoints:
-        if check_aabb_collision(player.rect, endpoint.rect):
-            return True
-    return False
-
-
-def check_spike_collision(player, traps):
-    """Check if player hit an open spike. Returns True if hit an open spike."""
-    for trap in traps:
-        if trap.__class__.__name__ == 'Spike':
-            if check_aabb_collision(player.rect, trap.rect):
-                if trap.is_open:
-                    return True
-    return False
-
-
-def next_level():
-    """Load the next level."""
-
-    global current_level_index, player, all_sprites, solid_sprites, mask_sprites, endpoints, camera, doors, keys, enemies, traps, plate_presses, boxes
-
-    current_level_index += 1
-    level_data = load_level_by_index(current_level_index)
-    
-    if not level_data:
-        # No more levels
-        print("You beat all levels! Congratulations!")
-        return False
-    enemies=level_data['enemies']
-    player = level_data['player']
-    all_sprites = level_data['all_sprites']
-    solid_sprites = level_data['solid_sprites']
-    mask_sprites = level_data['mask_sprites']
-    endpoints = level_data['endpoints']
-    doors = level_data['doors']
-    keys = level_data['keys']
-    traps = level_data['traps']
-    camera = Camera(WIDTH, HEIGHT)
-    enemies = level_data['enemies']
-    plate_presses=level_data['presses']
-    boxes = level_data['boxes']
-    print(f"Level {current_level_index + 1} loaded!")
-
-    return True
-
-
-def reload_level():
-    """Reload the current level from scratch."""
-    global player, all_sprites, solid_sprites, mask_sprites, endpoints, camera, doors, keys, enemies, traps, plate_presses, boxes
-    
-    level_data = load_level_by_index(current_level_index)
-    
-    if not level_data:
-        print("Error: Could not reload level!")
-        return False
-    
-    player = level_data['player']
-    all_sprites = level_data['all_sprites']
-    solid_sprites = level_data['solid_sprites']
-    mask_sprites = level_data['mask_sprites']
-    endpoints = level_data['endpoints']
-    doors = level_data['doors']
-    keys = level_data['keys']
-    enemies = level_data['enemies']
-    traps = level_data['traps']
-    plate_presses = level_data['presses']
-    boxes = level_data['boxes']
-    camera = Camera(WIDTH, HEIGHT)
-    
-    # Link pressure plates to their corresponding doors
-    for press in plate_presses:
-        press.set_door_list([door for door in doors if door.door_id == press.plate_id])
-    
-    print(f"Level {current_level_index + 1} reloaded!")
-    return True
-
-#[print(d.open_door()) for d in doors]
-#[print(d.door_id) for d in doors]
-
-# Link pressure plates to their corresponding doors (initial level)
-for press in plate_presses:
-    press.set_door_list([door for door in doors if door.door_id == press.plate_id])
-
-enemy_collisions=0
+# Key presses that map to one-shot inputs
+MASK_KEYS = {pygame.K_1: 'red', pygame.K_2: 'green', pygame.K_3: 'blue'}
 
 # Game loop
 while running:
-    dt = clock.tick(60) / 1000.0  # Delta time in seconds
-
+    if replay:
+        clock.tick()  # Replays run as fast as possible
+    else:
+        dt = clock.tick(60) / 1000.0  # Delta time in seconds
+    if fixed_step:
+        dt = 1.0 / (replay.fps if replay else DEFAULT_FPS)
+    profiler.begin_frame()
+
+    presses = {}
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
         elif event.type == pygame.KEYDOWN:
             # Switch masks with number keys
-            if event.key == pygame.K_1:
-                player.equip_mask('red')
-            elif event.key == pygame.K_2:
-                player.equip_mask('green')
-            elif event.key == pygame.K_3:
-                player.equip_mask('blue')
+            if event.key in MASK_KEYS:
+                presses['equip'] = MASK_KEYS[event.key]
             elif event.key == pygame.K_0:
-                player.unequip_mask()
+                presses['unequip'] = True
             # Reload level with R key
             elif event.key == pygame.K_r:
-                reload_level()
-    
-    # Update player input and position
-    if player:
-        player.handle_input()
-        
-        # Check for box pushing - player can push boxes if wearing matching color mask
-        # Use predicted position (current + velocity) to check collision
-        predicted_rect = player.rect.copy()
-        predicted_rect.x += player.velocity.x
-        predicted_rect.y += player.velocity.y
-        
-        for box in boxes:
-            if predicted_rect.colliderect(box.rect):
-                # Check if player has matching mask color
-                if player.current_mask == box.color:
-                    # Calculate push direction based on player velocity
-                    push_x = 0
-                    push_y = 0
-                    if player.velocity.x > 0:
-                        push_x = player.speed
-                    elif player.velocity.x < 0:
-                        push_x = -player.speed
-                    if player.velocity.y > 0:
-                        push_y = player.speed
-                    elif player.velocity.y < 0:
-                        push_y = -player.speed
-                    
-                    # Try to push box - check if new position would collide with walls
-                    new_box_rect = box.rect.copy()
-                    new_box_rect.x += push_x
-                    new_box_rect.y += push_y
-                    
-                    # Check collision with solid sprites (except the box itself)
-                    can_push = True
-                    for solid in solid_sprites:
-                        if solid != box and new_box_rect.colliderect(solid.rect):
-                            # Check if solid is actually solid (not a ghosted wall or open door)
-                            if hasattr(solid, 'on_off') and not solid.on_off:
-                                continue
-                            if hasattr(solid, 'is_open') and solid.is_open:
-                                continue
-                            can_push = False
-                            break
-                    
-                    # Also check collision with other boxes
-                    for other_box in boxes:
-                        if other_box != box and new_box_rect.colliderect(other_box.rect):
-                            can_push = False
-                            break
-                    
-                    if can_push:
-                        box.pos.x += push_x
-                        box.pos.y += push_y
-                        box.rect.topleft = (box.pos.x, box.pos.y)
-        
-        # Move and check collision (handles both X and Y separately)
-        resolve_collision(player, solid_sprites)
-
-        # Update mask effects on sprites
-        update_mask_effects(player, mask_sprites)
-        
-        # Check for mask pickup
-        handle_mask_pickup(player, all_sprites)
-        
-        # Animate masks with bobbing motion
-        for mask in mask_sprites:
-            if mask.__class__.__name__ == 'Mask':
-                mask.update(dt)
-        
-        # Animate keys with bobbing motion
-        for key in keys:
-            key.update(dt)
-
-        # Update pressure plates
-        for press in plate_presses:
-            was_pressed = press.is_pressed
-            press.update(boxes, player, dt)
-            # If plate state changed, toggle doors and play sound
-            if press.is_pressed != was_pressed:
-                press.change_doors()
-                sound_manager.play_sound('drag')
-
-        # Update enemies and check if any are chasing
-        any_enemy_chasing = False
-        for enemy in enemies:
-            enemy.update(player)
-            resolve_collision(enemy, solid_sprites)
-            
-            # Check if this enemy is within chase distance
-            distance = ((player.pos[0] - enemy.pos[0])**2 + (player.pos[1] - enemy.pos[1])**2)**0.5
-            if distance < enemy.chase_distance:
-                any_enemy_chasing = True
-            
-            if check_aabb_collision(player.rect,enemy.rect):
-                enemy_collisions+=1
-                if enemy_collisions>50:
-                    enemy_collisions=0
-                    sound_manager.play_sound('hurt')
-                    reload_level()
-        
-        # Switch music based on chase state
-        if any_enemy_chasing:
-            sound_manager.start_chase()
-        else:
-            sound_manager.stop_chase()
-        # Animate spikes
-        for trap in traps:
-            if trap.__class__.__name__ == 'Spike':
-                was_open = trap.is_open
-                trap.update(dt)
-                # Play trap sound when spike activates
-                if trap.is_open and not was_open:
-                    sound_manager.play_sound('trap')
-        # Check for key pickup and door opening
-        handle_key_pickup(player, keys, doors)
-        
-        # Check for spike collision
-        if check_spike_collision(player, traps):
-            sound_manager.play_sound('hurt')
-            reload_level()
-        
-        # Check for level completion
-        if check_level_complete(player, endpoints):
-            if not next_level():
-                running = False
-        
-        # Update camera to follow payer
-        camera.update(player)
+                presses['reload'] = True
+            # Profiler overlay and trace dump
+            elif event.key == pygame.K_F3:
+                show_profiler = not show_profiler
+                profiler.set_enabled(show_profiler or bool(args.profile))
+            elif event.key == pygame.K_F4:
+                path = profiler.export(time.strftime('profile_%Y%m%d_%H%M%S.csv'))
+                print(f"Profile written to {path}")
+    profiler.mark('events')
+    
+    # Advance the simulation
+    if replay:
+        inputs = next(replay_inputs, None)
+        if inputs is None:
+            break
+    else:
+        inputs = Inputs.from_keys(pygame.key.get_pressed(), **presses)
+    if recorder:
+        recorder.record(inputs)
+    world.step(inputs, dt)
+    if not world.running:
+        running = False
+    player = world.player
+    
+    # Update camera to follow payer
+    camera.update(player)
+    profiler.mark('camera')
+    
+    # Update HUD (fixed to screen, not affected by camera)
+    hud.set_text('lives', f"Lives: {player.lives}")
+    hud.set_text('mask', f"Mask: {player.current_mask or 'None'}")
+    hud.set_text('level', f"Level: {world.level_index + 1}/{len(world.levels)}")
+    overlays = [hud.overlay()]
+    if show_profiler:
+        overlays.append((profiler.overlay(), (10, 10)))
+    profiler.mark('hud')
     
     # Render
-    screen.fill((20, 20, 30))
-    
-    # Draw sprites with camera offset - sort by layer then Y position
-    def get_sprite_layer(sprite):
-        class_name = sprite.__class__.__name__
-        if class_name in ('Spike', 'PressPlate'):
-            return 0  # Traps and plates draw first (bottom)
-        elif class_name == 'Player':
-            return 2  # Player draws on top
-        return 1  # Everything else in the middle
-    
-    sorted_sprites = sorted(all_sprites, key=lambda s: (get_sprite_layer(s), s.rect.y))
-    for sprite in sorted_sprites:
-        screen.blit(sprite.image, camera.apply(sprite))
-    
-    # Draw HUD (fixed to screen, not affected by camera)
-    font = pygame.font.Font(None, 24)
-    lives_text = font.render(f"Lives: {player.lives}", True, (255, 255, 255))
-    mask_text = font.render(f"Mask: {player.current_mask or 'None'}", True, (255, 255, 255))
-    level_text = font.render(f"Level: {current_level_index + 1}/{len(LEVELS)}", True, (255, 255, 255))
-    help_text = font.render("1=Red, 2=Green, 3=Blue, 0=No Mask | R=Reset | Arrow Keys=Move", True, (150, 150, 150))
-    
-    screen.blit(help_text, (10, HEIGHT - 110))
-    screen.blit(level_text, (10, HEIGHT - 80))
-    screen.blit(mask_text, (10, HEIGHT - 50))
-    screen.blit(lives_text, (10, HEIGHT - 20))
-    
-    pygame.display.flip()
-
+    if dirty_renderer:
+        dirty_rects = dirty_renderer.draw(screen, world, camera, overlays, profiler)
+    else:
+        draw_world(screen, world, camera, profiler)
+        screen.blits(overlays, doreturn=False)
+        dirty_rects = None
+    
+    if dirty_rects is None:
+        pygame.display.flip()
+    else:
+        pygame.display.update(dirty_rects)
+    profiler.mark('flip')
+    profiler.end_frame()
+
+if args.profile:
+    print(f"Profile written to {profiler.export(args.profile)}")
+if recorder:
+    recorder.close(world.state_digest())
+    print(f"Recorded {recorder.frames} frames to {args.record} (seed {args.seed})")
+if replay:
+    digest = world.state_digest()
+    print(f"Replay finished at level {world.level_index + 1}, state {digest}")
+    if replay.final_digest and replay.final_digest != digest:
+        print(f"Warning: replay diverged from the recording (recorded state {replay.final_digest})")
+world.shutdown()
+sound_manager.shutdown()
 pygame.quit()
-sys.exit()
\ No newline at end of file
+sys.exit()
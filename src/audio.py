@@ -1,43 +1,211 @@
-import pygame
+"""Sound effects and music.
+
+Registering a sound does not decode it. With workers > 0 the WAV is decoded on
+a thread pool as soon as it is registered, so startup does not wait for audio.
+With workers=0 it is decoded the first time it is played. Either way the
+pygame Sound is only created on the main thread, on first use, from a buffer
+that is already in the mixer's format, which is a plain copy. Playing a sound
+whose decode is still running waits for it.
+
+The workers do not touch pygame: decode_wav reads plain PCM WAVs with the
+wave module and converts them to signed 16-bit at the mixer's channel count.
+Files it cannot convert (another sample rate, compressed, not a WAV) are left
+to pygame on the main thread. With a cache_dir, the decoded buffers are stored
+on disk at mixer format, keyed by the source file's path, size and mtime. Later
+runs then only read them back.
+"""
+import hashlib
 import os
 import random
+import struct
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+CACHE_DIR_NAME = '.soundcache'
+
+# Cache file header: magic, source mtime_ns, source size, frequency, channels
+_CACHE_HEADER = struct.Struct('<4sqqii')
+_CACHE_MAGIC = b'SND1'
+_MIXER_S16 = -16  # pygame.mixer format code for signed 16-bit samples
+
+# Unsigned 8-bit sample -> high byte of the signed 16-bit sample
+_U8_TO_S16_HIGH = bytes((value - 128) & 0xFF for value in range(256))
+
+
+def decode_wav(path, frequency, channels):
+    """
+    Read a PCM WAV and return its samples as signed 16-bit little-endian bytes with the
+    given channel count, or None if it would need resampling or is not a plain PCM WAV.
+    Does not touch pygame, so it is safe to call from any thread.
+    """
+    try:
+        with wave.open(path, 'rb') as wav:
+            if wav.getcomptype() != 'NONE' or wav.getframerate() != frequency:
+                return None
+            width, source_channels = wav.getsampwidth(), wav.getnchannels()
+            data = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    if source_channels not in (1, channels):
+        return None
+    if width == 2:
+        samples = data
+    elif width == 1:
+        samples = bytearray(len(data) * 2)
+        samples[1::2] = data.translate(_U8_TO_S16_HIGH)
+    elif width in (3, 4):
+        # Keep the two most significant bytes of each little-endian sample
+        samples = bytearray(len(data) // width * 2)
+        samples[0::2] = data[width - 2::width]
+        samples[1::2] = data[width - 1::width]
+    else:
+        return None
+    if source_channels != channels:
+        # Mono to multi-channel: the same sample on every channel
+        frames = memoryview(samples)
+        spread = bytearray(len(samples) * channels)
+        for channel in range(channels):
+            spread[channel * 2::channels * 2] = frames[0::2]
+            spread[channel * 2 + 1::channels * 2] = frames[1::2]
+        samples = spread
+    return bytes(samples)
+
+
+class _SoundSlot:
+    """A registered sound: its file, its volume and, once used, its pygame Sound."""
+    __slots__ = ('path', 'volume', 'sound', 'future', 'failed')
+
+    def __init__(self, path, volume):
+        self.path = path
+        self.volume = volume
+        self.sound = None  # pygame.mixer.Sound, created on first use
+        self.future = None  # Background decode of the buffer, if one was started
+        self.failed = False
+
 
 class SoundManager:
-    def __init__(self, base_path):
+    def __init__(self, base_path, rng=None, workers=0, cache_dir=None):
         self.base_path = base_path
-        self.sounds = {}
+        self.rng = rng or random.Random()  # Seed it to make variant choices reproducible
+        self.sounds = {}  # Name -> _SoundSlot, or list of them for variants
         self.music_volume = 0.9
         self.sfx_volume = 0.7
+        self.cache_dir = cache_dir  # Directory for decoded buffers (None: no disk cache)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sound-decode') if workers else None
+        self.mixer_format = None  # (frequency, format, channels) of the mixer, read on first registration
         # Chase music system
         self.main_music_path = None
-        self.chase_music = None  # pygame.mixer.Sound for chase music
+        self.chase_music = None  # _SoundSlot for chase music
         self.chase_channel = None  # Dedicated channel for chase music
         self.is_chasing = False
-        
+
+    def _register(self, filepath, volume):
+        """Create the slot for a sound file and start decoding it if there is a thread pool."""
+        if self.mixer_format is None:
+            self.mixer_format = pygame.mixer.get_init()
+        slot = _SoundSlot(os.path.join(self.base_path, filepath), volume)
+        if self.executor:
+            slot.future = self.executor.submit(self._decode, slot.path)
+        return slot
+
+    def _cache_path(self, path):
+        key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key + '.pcm')
+
+    def _read_cache(self, path, stat):
+        frequency, _, channels = self.mixer_format
+        try:
+            with open(self._cache_path(path), 'rb') as f:
+                header = f.read(_CACHE_HEADER.size)
+                if header != _CACHE_HEADER.pack(_CACHE_MAGIC, stat.st_mtime_ns, stat.st_size, frequency, channels):
+                    return None
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_cache(self, path, stat, buffer):
+        """Write atomically so a half-written file is never read back. Cache failures are not fatal."""
+        frequency, _, channels = self.mixer_format
+        cache_path = self._cache_path(path)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(_CACHE_HEADER.pack(_CACHE_MAGIC, stat.st_mtime_ns, stat.st_size, frequency, channels))
+                f.write(buffer)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Warning: Could not write sound cache {cache_path}: {e}")
+
+    def _decode(self, path):
+        """
+        Return the samples of path in the mixer's format, from the disk cache when it is fresh.
+        Returns None when the file has to be decoded by pygame. Safe to call from any thread.
+        """
+        if self.mixer_format is None or self.mixer_format[1] != _MIXER_S16:
+            return None
+        stat = os.stat(path)
+        if self.cache_dir:
+            buffer = self._read_cache(path, stat)
+            if buffer is not None:
+                return buffer
+        frequency, _, channels = self.mixer_format
+        buffer = decode_wav(path, frequency, channels)
+        if buffer is not None and self.cache_dir:
+            self._write_cache(path, stat, buffer)
+        return buffer
+
+    def _resolve(self, slot):
+        """Return the slot's pygame Sound, creating it on first use. None if the file could not be loaded."""
+        if slot.sound is not None or slot.failed:
+            return slot.sound
+        try:
+            buffer = slot.future.result() if slot.future else self._decode(slot.path)
+            if buffer is not None:
+                sound = pygame.mixer.Sound(buffer=buffer)
+            else:
+                sound = pygame.mixer.Sound(slot.path)
+                if self.cache_dir and self.mixer_format and self.mixer_format[1] == _MIXER_S16:
+                    # pygame did the decoding this time; keep its result for the next run
+                    self._write_cache(slot.path, os.stat(slot.path), sound.get_raw())
+        except (OSError, pygame.error) as e:
+            print(f"Warning: Could not load sound {slot.path}: {e}")
+            slot.failed = True
+            return None
+        finally:
+            slot.future = None
+        sound.set_volume(slot.volume)
+        slot.sound = sound
+        return sound
+
     def load_sound(self, name, filepath, volume=None):
-        """Load a sound effect. Optional volume override (0.0 to 1.0)."""
-        full_path = os.path.join(self.base_path, filepath)
-        self.sounds[name] = pygame.mixer.Sound(full_path)
-        self.sounds[name].set_volume(volume if volume is not None else self.sfx_volume)
-    
+        """Register a sound effect, decoded in the background or on first use. Optional volume override (0.0 to 1.0)."""
+        self.sounds[name] = self._register(filepath, volume if volume is not None else self.sfx_volume)
+
     def load_sound_variants(self, name, filepaths):
-        """Load multiple variants of a sound for random playback."""
-        self.sounds[name] = []
-        for filepath in filepaths:
-            full_path = os.path.join(self.base_path, filepath)
-            sound = pygame.mixer.Sound(full_path)
-            sound.set_volume(self.sfx_volume)
-            self.sounds[name].append(sound)
-    
+        """Register multiple variants of a sound for random playback."""
+        self.sounds[name] = [self._register(filepath, self.sfx_volume) for filepath in filepaths]
+
     def play_sound(self, name):
         """Play a sound effect. If multiple variants exist, plays a random one."""
         if name in self.sounds:
-            sound = self.sounds[name]
-            if isinstance(sound, list):
-                random.choice(sound).play()
-            else:
+            slot = self.sounds[name]
+            if isinstance(slot, list):
+                slot = self.rng.choice(slot)
+            sound = self._resolve(slot)
+            if sound is not None:
                 sound.play()
-    
+
+    def is_ready(self):
+        """Whether every registered sound has finished decoding (or is left for first use)."""
+        slots = [self.chase_music] if self.chase_music else []
+        for slot in self.sounds.values():
+            slots.extend(slot if isinstance(slot, list) else [slot])
+        return all(slot.future is None or slot.future.done() for slot in slots)
+
     def play_music(self, filepath, loop=-1):
         """Play background music. loop=-1 means infinite loop."""
         full_path = os.path.join(self.base_path, filepath)
@@ -45,24 +213,23 @@ class SoundManager:
         pygame.mixer.music.load(full_path)
         pygame.mixer.music.set_volume(self.music_volume)
         pygame.mixer.music.play(loop)
-    
+
     def load_chase_music(self, filepath, volume=None):
-        """Load chase music as a Sound object for independent playback."""
-        full_path = os.path.join(self.base_path, filepath)
-        self.chase_music = pygame.mixer.Sound(full_path)
-        self.chase_music.set_volume(volume if volume is not None else self.music_volume)
+        """Register chase music, played as a Sound for independent playback."""
+        self.chase_music = self._register(filepath, volume if volume is not None else self.music_volume)
         # Reserve a channel for chase music
         self.chase_channel = pygame.mixer.Channel(7)  # Use channel 7 for chase music
-    
+
     def start_chase(self):
         """Start chase music - pause main music, play chase from beginning."""
         if self.is_chasing:
             return  # Already chasing
         self.is_chasing = True
         pygame.mixer.music.pause()
-        if self.chase_music and self.chase_channel:
-            self.chase_channel.play(self.chase_music, loops=-1)
-    
+        chase_music = self._resolve(self.chase_music) if self.chase_music else None
+        if chase_music and self.chase_channel:
+            self.chase_channel.play(chase_music, loops=-1)
+
     def stop_chase(self):
         """Stop chase music - resume main music from where it paused."""
         if not self.is_chasing:
@@ -71,28 +238,39 @@ class SoundManager:
         if self.chase_channel:
             self.chase_channel.stop()
         pygame.mixer.music.unpause()
-    
+
+    def on_chase_change(self, chasing):
+        """Chase alert from the proximity service: switch between main and chase music."""
+        if chasing:
+            self.start_chase()
+        else:
+            self.stop_chase()
+
     def stop_music(self):
         pygame.mixer.music.stop()
         if self.chase_channel:
             self.chase_channel.stop()
         self.is_chasing = False
-    
+
     def pause_music(self):
         pygame.mixer.music.pause()
-    
+
     def unpause_music(self):
         pygame.mixer.music.unpause()
-    
+
     def set_music_volume(self, volume):
         self.music_volume = volume
         pygame.mixer.music.set_volume(volume)
-    
+
     def set_sfx_volume(self, volume):
         self.sfx_volume = volume
-        for sound in self.sounds.values():
-            if isinstance(sound, list):
-                for s in sound:
-                    s.set_volume(volume)
-            else:
-                sound.set_volume(volume)
\ No newline at end of file
+        for slot in self.sounds.values():
+            for s in (slot if isinstance(slot, list) else [slot]):
+                s.volume = volume
+                if s.sound is not None:
+                    s.sound.set_volume(volume)
+
+    def shutdown(self):
+        """Stop the decode workers, dropping the decodes that have not started yet."""
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
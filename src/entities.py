@@ -1,33 +1,10 @@
 import pygame
 
+from .variants import get_variant
 
-class Wall(pygame.sprite.Sprite):
-    def __init__(self, x, y, image, tile_size, color=(100, 100, 100)):
-        super().__init__()
-        self.color = color
-        self.on_off = True  # Default to solid
-        self.image = image.copy() if isinstance(image, pygame.Surface) else pygame.Surface((tile_size, tile_size))
-        try:
-            self.image = self.image.convert_alpha()
-        except pygame.error:
-            # Fallback if no display mode set
-            pass
-        self.rect = self.image.get_rect(topleft=(x, y))
-        self.base_image = self.image.copy()  # Store original for toggling
-        self.update_appearance()
-
-    def update_appearance(self):
-        """Updates the opacity based on the on_off state."""
-        self.image = self.base_image.copy()
-        if not self.on_off:
-            self.image.set_alpha(100) # Ghostly/Transparent
-        else:
-            self.image.set_alpha(255) # Fully Opaque
-
-    def toggle(self, state):
-        """Method to change wall state based on player's current mask."""
-        self.on_off = state
-        self.update_appearance()
+GHOST_ALPHA = 100  # Surface alpha of ghosted walls and open doors
+CHASE_SPEED = 10  # Per-axis ghost speed per frame inside the chase radius
+WANDER_SPEED = 2
 
 
 class Character(pygame.sprite.Sprite):
@@ -46,18 +23,37 @@ class Character(pygame.sprite.Sprite):
 
 
 class Player(Character):
+    _layer = 2  # Drawn on top
+
     def __init__(self, x, y, sprite_img, lives=3, sprite_variants=None):
         super().__init__(x, y, sprite_img, lives)
         self.current_mask = None # Holds the color of the current mask
         self.speed = 4
         self.facing_right = True  # Track sprite direction
-        self.base_image = sprite_img.copy()  # Store original sprite
+        self.base_image = sprite_img  # Original sprite (shared, never modified)
         self.sprite_variants = sprite_variants or {}  # Dict of mask color -> sprite image
+        self.mask_listeners = []  # Called with (old color, new color) when the worn mask changes
+
+    def add_mask_listener(self, listener):
+        """Call listener(old_color, new_color) every time the worn mask changes."""
+        self.mask_listeners.append(listener)
+
+    def _set_mask(self, color):
+        old_color = self.current_mask
+        self.current_mask = color
+        self._update_sprite_display()
+        if color != old_color:
+            for listener in self.mask_listeners:
+                listener(old_color, color)
 
     def handle_input(self):
         keys = pygame.key.get_pressed()
-        self.velocity.x = (keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]) * self.speed
-        self.velocity.y = (keys[pygame.K_DOWN] - keys[pygame.K_UP]) * self.speed
+        self.set_direction(keys[pygame.K_RIGHT] - keys[pygame.K_LEFT], keys[pygame.K_DOWN] - keys[pygame.K_UP])
+
+    def set_direction(self, dx, dy):
+        """Set velocity from a direction (-1, 0 or 1 per axis) without reading the keyboard."""
+        self.velocity.x = dx * self.speed
+        self.velocity.y = dy * self.speed
         
         # Update sprite direction based on movement
         if self.velocity.x > 0:  # Moving right
@@ -75,12 +71,7 @@ class Player(Character):
         if self.current_mask and self.current_mask in self.sprite_variants:
             current_sprite = self.sprite_variants[self.current_mask]
 
-        sprite = current_sprite.copy()
-
-        if not self.facing_right:
-            sprite = pygame.transform.flip(sprite, True, False)
-
-        self.image = sprite
+        self.image = get_variant(current_sprite, flip_x=not self.facing_right)
 
     def update(self):
         """Update player position."""
@@ -89,13 +80,11 @@ class Player(Character):
     
     def equip_mask(self, color):
         """Equip a mask and change sprite."""
-        self.current_mask = color
-        self._update_sprite_display()
+        self._set_mask(color)
     
     def unequip_mask(self):
         """Remove the current mask and change sprite."""
-        self.current_mask = None
-        self._update_sprite_display()
+        self._set_mask(None)
 
 
 class Enemy(Character):
@@ -104,15 +93,30 @@ class Enemy(Character):
         self.current_mask = None  # Holds the color of the current mask
         self.speed = 4
         self.facing_right = True  # Track sprite direction
-        self.base_image = sprite_img.copy()  # Store original sprite
+        self.base_image = sprite_img  # Original sprite (shared, never modified)
         self.sprite_variants = sprite_variants or {}  # Dict of mask color -> sprite image
         self.chase_distance=250
-    def set_speed(self,player):
+    def is_chasing(self, player):
+        """Whether the player is inside the chase radius (squared distances, no square root)."""
+        dx = player.pos[0] - self.pos[0]
+        dy = player.pos[1] - self.pos[1]
+        return dx * dx + dy * dy < self.chase_distance * self.chase_distance
+
+    def set_speed(self, player, flow_field=None, proximity=None):
         #self.velocity=(((self.pos[0] - player.pos[0])**2+(self.pos[1] - player.pos[1])**2)*0.5)*(self.pos[0] - player.pos[0]) ,(((self.pos[0] - player.pos[0])**2+(self.pos[1] - player.pos[1])**2)*0.5)*(self.pos[1] - player.pos[1])
-        if ((player.pos[0]-self.pos[0])**2 + (player.pos[1]-self.pos[1])**2)**0.5<self.chase_distance:
-            speed_factor=5
-        else:
-            speed_factor=1
+        # The shared proximity service has measured this frame already; measure here only without one
+        chasing = proximity.is_chasing(self) if proximity is not None else self.is_chasing(player)
+        speed_factor = CHASE_SPEED if chasing else WANDER_SPEED
+
+        # Follow the shared flow field around walls while it covers this tile
+        waypoint = flow_field.waypoint(*self.rect.center) if flow_field else None
+        if waypoint is not None:
+            # Head for the next tile's center; the cross axis lines the ghost up with the corridor
+            dx = waypoint[0] - self.rect.centerx
+            dy = waypoint[1] - self.rect.centery
+            self.velocity[0] = max(-speed_factor, min(speed_factor, dx))
+            self.velocity[1] = max(-speed_factor, min(speed_factor, dy))
+            return
 
 
         if player.pos[0]-self.pos[0]<0:
@@ -132,18 +136,11 @@ class Enemy(Character):
             current_sprite = self.sprite_variants[self.current_mask]
 
         # Apply facing direction
-        if not self.facing_right:
-            self.image = pygame.transform.flip(current_sprite, True, False)
-        else:
-            self.image = current_sprite.copy()
-
-    def update(self,player):
-        """Update player position."""
-
+        self.image = get_variant(current_sprite, flip_x=not self.facing_right)
 
-        self.pos += self.velocity
-        self.rect.topleft = self.pos
-        self.set_speed(player)
+    def update(self, player, flow_field=None, proximity=None):
+        """Pick this frame's velocity. The World moves the enemy with collision checks."""
+        self.set_speed(player, flow_field, proximity)
 
     def equip_mask(self, color):
         """Equip a mask and change sprite."""
@@ -197,21 +194,18 @@ class Door(pygame.sprite.Sprite):
         self.rect = self.image.get_rect(topleft=(x, y))
         self.door_id = door_id
         self.is_open = False
-        self.base_image = sprite_img.copy()
+        self.base_image = sprite_img
 
     def open_door(self):
         """Open the door - make it non-collidable."""
         self.is_open = True
         # Make door semi-transparent
-        transparent_image = self.base_image.copy()
-        transparent_image.set_alpha(100)
-        self.image = transparent_image
+        self.image = get_variant(self.base_image, alpha=GHOST_ALPHA)
 
     def close_door(self):
         """Close the door - make it solid again."""
         self.is_open = False
-        self.image = self.base_image.copy()
-        self.image.set_alpha(255)
+        self.image = self.base_image
 
 
 class Key(pygame.sprite.Sprite):
@@ -237,6 +231,7 @@ class Key(pygame.sprite.Sprite):
 
 class PressPlate(pygame.sprite.Sprite):
     """Pressure plate that triggers doors."""
+    _layer = 0  # Drawn under everything else
     is_pressed = False
     debouncing = False
     door_list = []
@@ -247,8 +242,7 @@ class PressPlate(pygame.sprite.Sprite):
         self.rect = self.image.get_rect(topleft=(x, y))
         self.plate_id = plate_id
         self.is_pressed = False
-        self.debouncing = debounce
-        self.counter=0
+        self.debouncing = debounce  # Stays down a moment after it is left (a trigger zone option)
     def press(self):
         self.is_pressed=True
     def depress(self):
@@ -262,30 +256,6 @@ class PressPlate(pygame.sprite.Sprite):
     def set_door_list(self,doors):
         self.door_list=doors
     
-    def update(self, boxes, player, time_delta=0.016):
-        """Check if box or player is on the plate using collision detection."""
-        currently_pressed = False
-        
-        # Check if any box is colliding with the plate
-        for box in boxes:
-            if self.rect.colliderect(box.rect):
-                currently_pressed = True
-                break
-        
-        # Check if player is colliding with the plate
-        if not currently_pressed and self.rect.colliderect(player.rect):
-            currently_pressed = True
-        
-        # Update pressed state
-        if currently_pressed and not self.is_pressed:
-            self.press()
-        elif not currently_pressed and self.is_pressed:
-            self.depress()
-
-
-
-
-
 
 
 class ArrowTrap(pygame.sprite.Sprite):
@@ -310,12 +280,13 @@ class GuillotineTrap(pygame.sprite.Sprite):
 
 class Spike(pygame.sprite.Sprite):
     """Spike trap that alternates between open and closed."""
+    _layer = 0  # Drawn under everything else
 
     def __init__(self, x, y, closed_img, open_img):
         super().__init__()
         self.closed_image = closed_img
         self.open_image = open_img
-        self.image = self.closed_image.copy()
+        self.image = self.closed_image
         self.rect = self.image.get_rect(topleft=(x, y))
         self.is_open = False
         self.time = 0
@@ -327,13 +298,12 @@ class Spike(pygame.sprite.Sprite):
 
         # Toggle state every 2 seconds
         state = int(self.time / self.toggle_interval) % 2
-        self.is_open = (state == 1)
+        is_open = (state == 1)
 
-        # Update image based on state
-        if self.is_open:
-            self.image = self.open_image.copy()
-        else:
-            self.image = self.closed_image.copy()
+        # Swap the image only when the state flips (the images are never modified, so no copy)
+        if is_open != self.is_open:
+            self.is_open = is_open
+            self.image = self.open_image if is_open else self.closed_image
 
 
 class Decoration(pygame.sprite.Sprite):
@@ -0,0 +1,202 @@
+"""Vectorized ghost simulation for levels with large hordes.
+
+In horde mode the positions, velocities and chase radii of every ghost live in
+NumPy arrays. Steering (flow field or straight line), tile collision and chase
+detection run as a handful of array operations per frame instead of per-ghost
+Python code. The Enemy sprites stay as thin views for rendering: each step
+writes the new position back into their rect and re-buckets them in the spatial
+hash, but their own update() is not called.
+
+The result matches the per-sprite path step for step. Ghosts are assumed to be
+no bigger than a tile (the loader makes them exactly one tile), so the tiles a
+ghost overlaps are the tiles under its four corners. Boxes and doors are rare,
+so they are not vectorized: a ghost that ends up on a tile touched by one is
+checked exactly, one at a time, like the per-sprite path does.
+
+Chase state comes from the same squared distances the steering uses, and is
+handed to the proximity service in one go.
+
+NumPy is optional. Without it HAVE_NUMPY is False and World falls back to the
+per-sprite path.
+"""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .entities import CHASE_SPEED, WANDER_SPEED
+
+HAVE_NUMPY = np is not None
+
+# Flow field step -> code stored per tile (0 means the field does not cover the tile)
+STEP_CODES = {(1, 0): 1, (-1, 0): 2, (0, 1): 3, (0, -1): 4, (0, 0): 5}
+FOLLOW_CODES = (1, 2, 3, 4)
+
+
+def _round_half_away(values):
+    """Round like pygame.Rect does when given a float coordinate."""
+    return np.copysign(np.floor(np.abs(values) + 0.5), values).astype(np.int64)
+
+
+class Horde:
+    """Array-backed state of the level's ghosts, stepped as a batch."""
+
+    def __init__(self, enemies, tilemap, spatial, dynamic_solids, collides):
+        if not HAVE_NUMPY:
+            raise RuntimeError("Horde mode needs NumPy")
+        self.enemies = enemies  # The level's enemy group; the sprites are the render views
+        self.tilemap = tilemap
+        self.spatial = spatial
+        self.dynamic_solids = dynamic_solids
+        self.collides = collides  # collides(rect) -> True if rect hits a wall or a closed dynamic solid
+        self.tile_size = tilemap.tile_size
+        count = tilemap.width * tilemap.height
+        self.step_codes = np.zeros(count, dtype=np.uint8)  # Tile index -> flow field step code
+        self.step_tiles = np.zeros(0, dtype=np.int64)  # Tiles with a non-zero code
+        self.field_version = None  # FlowField.rebuilds the codes were copied from
+        self.solid = None  # Tilemap layer the solid view was made from
+        self.solid_tiles = None
+        self.dynamic_tiles = np.zeros(count, dtype=bool)  # Tiles touched by a box or door
+        self.dynamic_dirty = True
+        self.sync()
+
+    def sync(self):
+        """Reload the arrays from the sprites, after ghosts were spawned or retired."""
+        sprites = self.sprites = list(self.enemies)
+        count = len(sprites)
+        self.pos = np.array([(sprite.pos.x, sprite.pos.y) for sprite in sprites], dtype=np.float64).reshape(count, 2)
+        self.velocity = np.array([(sprite.velocity.x, sprite.velocity.y) for sprite in sprites],
+                                 dtype=np.float64).reshape(count, 2)
+        self.chase_distance = np.array([sprite.chase_distance for sprite in sprites], dtype=np.float64)
+        self.size = np.array([sprite.rect.size for sprite in sprites], dtype=np.int64).reshape(count, 2)
+        if count and (self.size > self.tile_size).any():
+            raise ValueError("Horde mode needs ghosts no bigger than one tile")
+
+    def invalidate_solids(self):
+        """A box or door moved, appeared or went away: re-mark the tiles they touch."""
+        self.dynamic_dirty = True
+
+    def _refresh_dynamic_tiles(self):
+        tiles = self.dynamic_tiles
+        tiles[:] = False
+        tile_size, width, height = self.tile_size, self.tilemap.width, self.tilemap.height
+        for solid in self.dynamic_solids:
+            rect = solid.rect
+            col0, row0 = max(rect.left // tile_size, 0), max(rect.top // tile_size, 0)
+            col1 = min((rect.right - 1) // tile_size, width - 1)
+            row1 = min((rect.bottom - 1) // tile_size, height - 1)
+            for row in range(row0, row1 + 1):
+                tiles[row * width + col0:row * width + col1 + 1] = True
+        self.dynamic_dirty = False
+
+    def _refresh_field(self, flow_field):
+        if flow_field.rebuilds == self.field_version:
+            return
+        self.step_codes[self.step_tiles] = 0
+        steps = flow_field.steps
+        self.step_tiles = np.fromiter(steps.keys(), dtype=np.int64, count=len(steps))
+        self.step_codes[self.step_tiles] = np.fromiter((STEP_CODES[step] for step in steps.values()),
+                                                       dtype=np.uint8, count=len(steps))
+        self.field_version = flow_field.rebuilds
+
+    def _tile_hits(self, x, y, width, height):
+        """
+        For rects at integer (x, y) of the given sizes, return (hits a solid tile,
+        touches a box/door tile) per rect.
+        """
+        tilemap = self.tilemap
+        tile_size, map_width, map_height = self.tile_size, tilemap.width, tilemap.height
+        col0 = np.maximum(x // tile_size, 0)
+        row0 = np.maximum(y // tile_size, 0)
+        col1 = np.minimum((x + width - 1) // tile_size, map_width - 1)
+        row1 = np.minimum((y + height - 1) // tile_size, map_height - 1)
+        inside = (col0 <= col1) & (row0 <= row1)
+        # Clip so that rects off the map index safely; inside masks them out afterwards
+        col0, col1 = np.clip(col0, 0, map_width - 1), np.clip(col1, 0, map_width - 1)
+        row0, row1 = np.clip(row0, 0, map_height - 1), np.clip(row1, 0, map_height - 1)
+        corners = (row0 * map_width + col0, row0 * map_width + col1,
+                   row1 * map_width + col0, row1 * map_width + col1)
+        solid, dynamic = self.solid_tiles, self.dynamic_tiles
+        hits = solid[corners[0]] | solid[corners[1]] | solid[corners[2]] | solid[corners[3]]
+        near = dynamic[corners[0]] | dynamic[corners[1]] | dynamic[corners[2]] | dynamic[corners[3]]
+        return hits.astype(bool) & inside, near & inside
+
+    def _move_axis(self, axis):
+        """Move every ghost along one axis and undo the move for the ones that hit something."""
+        pos, velocity, size = self.pos, self.velocity, self.size
+        pos[:, axis] += velocity[:, axis]
+        rect_pos = _round_half_away(pos)
+        blocked, near = self._tile_hits(rect_pos[:, 0], rect_pos[:, 1], size[:, 0], size[:, 1])
+        # Exact check against boxes and doors, only for the ghosts next to one
+        for index in np.flatnonzero(near & ~blocked).tolist():
+            sprite = self.sprites[index]
+            rect = sprite.rect.copy()
+            rect.topleft = (int(rect_pos[index, 0]), int(rect_pos[index, 1]))
+            if self.collides(rect):
+                blocked[index] = True
+        pos[blocked, axis] -= velocity[blocked, axis]
+        velocity[blocked, axis] = 0
+
+    def step(self, player, flow_field=None, proximity=None):
+        """
+        Steer and move every ghost one frame. The distances measured before moving go to
+        proximity (a ProximityService), if given. Returns True if any ghost is chasing.
+        """
+        if not self.sprites:
+            if proximity is not None:
+                proximity.measure_arrays((), (), ())
+            return False
+        if self.tilemap.solid is not self.solid:
+            self.solid = self.tilemap.solid
+            self.solid_tiles = np.frombuffer(self.solid, dtype=np.uint8)
+        if self.dynamic_dirty:
+            self._refresh_dynamic_tiles()
+
+        pos, velocity = self.pos, self.velocity
+        player_x, player_y = player.pos.x, player.pos.y
+        chase_radius_sq = self.chase_distance * self.chase_distance
+
+        # Speed from the distance to the player before moving
+        dx, dy = player_x - pos[:, 0], player_y - pos[:, 1]
+        distance_sq = dx * dx + dy * dy
+        chasing = distance_sq < chase_radius_sq
+        if proximity is not None:
+            proximity.measure_arrays(self.sprites, distance_sq.tolist(), chasing.tolist())
+        speed = np.where(chasing, CHASE_SPEED, WANDER_SPEED).astype(np.float64)
+
+        # Straight-line steering: full speed toward the player on each axis, unchanged when level with it
+        velocity[:, 0] = np.where(dx != 0, np.sign(dx) * speed, velocity[:, 0])
+        velocity[:, 1] = np.where(dy != 0, np.sign(dy) * speed, velocity[:, 1])
+
+        if flow_field is not None:
+            self._refresh_field(flow_field)
+            tile_size, map_width, map_height = self.tile_size, self.tilemap.width, self.tilemap.height
+            rect_pos = _round_half_away(pos)
+            center_x = rect_pos[:, 0] + self.size[:, 0] // 2
+            center_y = rect_pos[:, 1] + self.size[:, 1] // 2
+            col, row = center_x // tile_size, center_y // tile_size
+            on_map = (col >= 0) & (col < map_width) & (row >= 0) & (row < map_height)
+            codes = np.where(on_map, self.step_codes[np.where(on_map, row * map_width + col, 0)], 0)
+            follow = np.isin(codes, FOLLOW_CODES)
+            if follow.any():
+                step_x = np.array((0, 1, -1, 0, 0, 0))[codes]
+                step_y = np.array((0, 0, 0, 1, -1, 0))[codes]
+                # Head for the next tile's center, clamped to the speed
+                to_x = (col + step_x) * tile_size + tile_size / 2 - center_x
+                to_y = (row + step_y) * tile_size + tile_size / 2 - center_y
+                velocity[follow, 0] = np.clip(to_x, -speed, speed)[follow]
+                velocity[follow, 1] = np.clip(to_y, -speed, speed)[follow]
+
+        self._move_axis(0)
+        self._move_axis(1)
+
+        # Write back into the sprites for rendering, pickups and streaming
+        rect_pos = _round_half_away(pos)
+        spatial = self.spatial
+        for sprite, (x, y), (rect_x, rect_y), (vx, vy) in zip(self.sprites, pos.tolist(), rect_pos.tolist(),
+                                                                velocity.tolist()):
+            sprite.pos.update(x, y)
+            sprite.velocity.update(vx, vy)
+            sprite.rect.topleft = (rect_x, rect_y)
+            spatial.move(sprite)
+        return bool(chasing.any())
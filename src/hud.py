@@ -0,0 +1,99 @@
+"""Retained-mode HUD.
+
+The HUD is a set of named text elements at fixed screen positions. Setting an
+element to the text it already shows costs a string comparison. Fonts are
+loaded once. Rendered text surfaces are cached by (text, size, color), so
+values that cycle (a mask name, a countdown) are rendered once each. All
+elements are composited onto one overlay surface, which is rebuilt only when
+some element's text changes. The overlay is therefore the same surface object
+from frame to frame, and the dirty-rect renderer sees an unchanged HUD as
+unchanged.
+"""
+from collections import OrderedDict
+
+import pygame
+
+DEFAULT_FONT_SIZE = 24
+DEFAULT_COLOR = (255, 255, 255)
+
+
+class TextElement:
+    """One line of HUD text."""
+
+    def __init__(self, position, size=DEFAULT_FONT_SIZE, color=DEFAULT_COLOR):
+        self.position = position  # Top-left on screen
+        self.size = size
+        self.color = color
+        self.text = ''
+
+
+class HUD:
+    """Named text elements composited onto a single cached overlay surface."""
+
+    def __init__(self, max_cached=256):
+        self.elements = OrderedDict()  # name -> TextElement, in draw order
+        self.fonts = {}  # size -> Font
+        self.text_cache = OrderedDict()  # (text, size, color) -> Surface, least recently used first
+        self.max_cached = max_cached
+        self._overlay = None  # (surface, top-left) or None when it has to be rebuilt
+
+    def add_text(self, name, position, text='', size=DEFAULT_FONT_SIZE, color=DEFAULT_COLOR):
+        """Add (or replace) a text element."""
+        element = TextElement(position, size, color)
+        element.text = text
+        self.elements[name] = element
+        self._overlay = None
+        return element
+
+    def remove(self, name):
+        if self.elements.pop(name, None) is not None:
+            self._overlay = None
+
+    def set_text(self, name, text):
+        """Change an element's text. Does nothing if the text is the same."""
+        element = self.elements[name]
+        if element.text != text:
+            element.text = text
+            self._overlay = None
+
+    def font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.Font(None, size)
+        return font
+
+    def render_text(self, text, size=DEFAULT_FONT_SIZE, color=DEFAULT_COLOR):
+        """Return the rendered surface for text, rendering it only the first time."""
+        key = (text, size, color)
+        surface = self.text_cache.get(key)
+        if surface is not None:
+            self.text_cache.move_to_end(key)
+            return surface
+        surface = self.text_cache[key] = self.font(size).render(text, True, color)
+        while len(self.text_cache) > self.max_cached:
+            self.text_cache.popitem(last=False)
+        return surface
+
+    def overlay(self):
+        """Return (surface, top-left) of the composited HUD, rebuilding it only after a change."""
+        if self._overlay is None:
+            self._overlay = self._composite()
+        return self._overlay
+
+    def _composite(self):
+        rendered = [(self.render_text(element.text, element.size, element.color), element.position)
+                    for element in self.elements.values() if element.text]
+        if not rendered:
+            return pygame.Surface((0, 0), pygame.SRCALPHA), (0, 0)
+        bounds = pygame.Rect(rendered[0][1], rendered[0][0].get_size())
+        bounds.unionall_ip([pygame.Rect(position, surface.get_size()) for surface, position in rendered])
+        overlay = pygame.Surface(bounds.size, pygame.SRCALPHA)
+        for surface, (x, y) in rendered:
+            # MAX onto the transparent overlay copies the text's pixels and alpha as they are,
+            # so the overlay blends onto the screen exactly like the text itself would
+            overlay.blit(surface, (x - bounds.x, y - bounds.y), special_flags=pygame.BLEND_RGBA_MAX)
+        return overlay, bounds.topleft
+
+    def draw(self, screen):
+        surface, position = self.overlay()
+        screen.blit(surface, position)
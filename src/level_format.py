@@ -0,0 +1,234 @@
+"""Compiled binary form of the mazes/*.csv levels.
+
+The CSVs stay the editable source of truth. The first load tokenizes a CSV into a
+LevelLayout: a tile-ID grid for static tiles plus a table of (token, col, row)
+entities. That layout is written to a .levelcache directory next to the CSV.
+Later loads read the compiled file directly as long as it is still fresh.
+It is fresh when the source mtime and size match. If only the mtime changed,
+a matching SHA-1 of the source also counts. map_layout reads the same file
+through mmap, so the tile grid of a huge level is paged in only where it is
+actually touched.
+
+File layout (little-endian):
+    header   magic, version, source mtime_ns, source size, source sha1,
+             width, height, token count, entity count
+    tokens   u8 length + utf-8 bytes, one per distinct entity token
+    tiles    width * height bytes of tile IDs
+    entities (u16 token index, u32 col, u32 row) per entity
+"""
+import hashlib
+import mmap
+import os
+import struct
+import threading
+
+from .tilemap import TILE_TOKENS
+
+MAGIC = b'MZLV'
+VERSION = 1
+CACHE_DIR_NAME = '.levelcache'
+
+_HEADER = struct.Struct('<4sHqQ20sIIHI')
+_ENTITY = struct.Struct('<HII')
+
+
+class LevelLayout:
+    """A parsed level: static tile grid plus the entities placed on it."""
+
+    def __init__(self, width, height, tiles, entities):
+        self.width = width
+        self.height = height
+        self.tiles = tiles  # bytearray (or read-only memoryview when mapped) of width * height tile IDs
+        self.entities = entities  # list of (token, col, row) in reading order
+
+
+def parse_level_lines(lines):
+    """Tokenize CSV rows (space-separated cells, empty or 'o' = nothing) into a LevelLayout."""
+    rows = []
+    entities = []
+    for row_idx, line in enumerate(lines):
+        cells = line.strip('\r\n').split(' ')
+        tile_row = bytearray(len(cells))
+        for col, cell in enumerate(cells):
+            cell = cell.strip()
+            if not cell or cell == 'o':
+                continue
+            tile_id = TILE_TOKENS.get(cell)
+            if tile_id is not None:
+                tile_row[col] = tile_id
+            else:
+                entities.append((cell, col, row_idx))
+        rows.append(tile_row)
+
+    width = max((len(row) for row in rows), default=0)
+    height = len(rows)
+    tiles = bytearray(width * height)
+    for row_idx, row in enumerate(rows):
+        start = row_idx * width
+        tiles[start:start + len(row)] = row
+    return LevelLayout(width, height, tiles, entities)
+
+
+def encode_layout(layout, mtime_ns=0, size=0, digest=b'\0' * 20):
+    """Serialize a LevelLayout (and the source stamp it was compiled from) to bytes."""
+    token_index = {}
+    for token, _, _ in layout.entities:
+        token_index.setdefault(token, len(token_index))
+
+    parts = [_HEADER.pack(MAGIC, VERSION, mtime_ns, size, digest, layout.width, layout.height,
+                          len(token_index), len(layout.entities))]
+    for token in token_index:
+        encoded = token.encode('utf-8')[:255]
+        parts.append(bytes((len(encoded),)) + encoded)
+    parts.append(bytes(layout.tiles))
+    parts.extend(_ENTITY.pack(token_index[token], col, row) for token, col, row in layout.entities)
+    return b''.join(parts)
+
+
+def read_header(data):
+    """Unpack the header. Raises ValueError if data is not a compiled level of this version."""
+    if len(data) < _HEADER.size:
+        raise ValueError("Compiled level is truncated")
+    magic, version, mtime_ns, size, digest, width, height, token_count, entity_count = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a compiled level of this version")
+    return {
+        'mtime_ns': mtime_ns, 'size': size, 'digest': digest,
+        'width': width, 'height': height,
+        'token_count': token_count, 'entity_count': entity_count,
+    }
+
+
+def decode_layout(data, copy_tiles=True):
+    """
+    Deserialize bytes written by encode_layout into a LevelLayout. With copy_tiles=False
+    the tile grid is a read-only memoryview into data instead of a bytearray copy.
+    """
+    header = read_header(data)
+    offset = _HEADER.size
+    tokens = []
+    for _ in range(header['token_count']):
+        length = data[offset]
+        tokens.append(bytes(data[offset + 1:offset + 1 + length]).decode('utf-8'))
+        offset += 1 + length
+
+    tile_count = header['width'] * header['height']
+    if copy_tiles:
+        tiles = bytearray(data[offset:offset + tile_count])
+    else:
+        tiles = memoryview(data)[offset:offset + tile_count].toreadonly()
+    offset += tile_count
+
+    entity_bytes = data[offset:offset + header['entity_count'] * _ENTITY.size]
+    if len(tiles) != tile_count or len(entity_bytes) != header['entity_count'] * _ENTITY.size:
+        raise ValueError("Compiled level is truncated")
+    entities = [(tokens[token_idx], col, row) for token_idx, col, row in _ENTITY.iter_unpack(entity_bytes)]
+    return LevelLayout(header['width'], header['height'], tiles, entities)
+
+
+def compiled_path(csv_path, cache_dir=None):
+    """Where the compiled form of csv_path lives (default: .levelcache next to the CSV)."""
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(csv_path)), CACHE_DIR_NAME)
+    return os.path.join(cache_dir, os.path.basename(csv_path) + '.bin')
+
+
+def _write_compiled(path, data):
+    """
+    Write atomically so a half-written file is never read back. The temp name is per thread,
+    as the preload worker and the main thread may compile the same level. Cache failures are
+    not fatal.
+    """
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: Could not write compiled level {path}: {e}")
+
+
+def compile_level(csv_path, cache_dir=None):
+    """Parse csv_path and write its compiled form. Returns the LevelLayout."""
+    with open(csv_path, 'rb') as f:
+        source = f.read()
+    stat = os.stat(csv_path)
+    layout = parse_level_lines(source.decode('utf-8', errors='replace').splitlines())
+    data = encode_layout(layout, stat.st_mtime_ns, stat.st_size, hashlib.sha1(source).digest())
+    _write_compiled(compiled_path(csv_path, cache_dir), data)
+    return layout
+
+
+def load_layout(csv_path, cache_dir=None):
+    """
+    Return the LevelLayout for csv_path, reading the compiled cache when it is fresh
+    and recompiling it otherwise. Raises FileNotFoundError if the CSV does not exist.
+    """
+    stat = os.stat(csv_path)
+    cache_path = compiled_path(csv_path, cache_dir)
+
+    data = None
+    header = None
+    try:
+        with open(cache_path, 'rb') as f:
+            data = f.read()
+        header = read_header(data)
+    except (OSError, ValueError):
+        data = None
+
+    if header is not None and header['mtime_ns'] == stat.st_mtime_ns and header['size'] == stat.st_size:
+        try:
+            return decode_layout(data)
+        except (ValueError, IndexError):
+            pass
+
+    with open(csv_path, 'rb') as f:
+        source = f.read()
+    digest = hashlib.sha1(source).digest()
+
+    if header is not None and header['digest'] == digest:
+        # Source was touched but not changed - just refresh the stamp
+        try:
+            layout = decode_layout(data)
+        except (ValueError, IndexError):
+            layout = None
+        if layout is not None:
+            _write_compiled(cache_path, encode_layout(layout, stat.st_mtime_ns, stat.st_size, digest))
+            return layout
+
+    layout = parse_level_lines(source.decode('utf-8', errors='replace').splitlines())
+    _write_compiled(cache_path, encode_layout(layout, stat.st_mtime_ns, stat.st_size, digest))
+    return layout
+
+
+def _is_fresh(cache_path, stat):
+    """Check the compiled file's stamp against the source's os.stat result."""
+    try:
+        with open(cache_path, 'rb') as f:
+            header = read_header(f.read(_HEADER.size))
+    except (OSError, ValueError):
+        return False
+    return header['mtime_ns'] == stat.st_mtime_ns and header['size'] == stat.st_size
+
+
+def map_layout(csv_path, cache_dir=None):
+    """
+    Return the LevelLayout for csv_path with its tile grid memory-mapped from the
+    compiled file, so the grid is paged in on demand instead of read up front.
+    The compiled file is refreshed first if it is stale. Falls back to a normal
+    in-memory load if the compiled file cannot be mapped.
+    """
+    stat = os.stat(csv_path)
+    cache_path = compiled_path(csv_path, cache_dir)
+    if not _is_fresh(cache_path, stat):
+        layout = load_layout(csv_path, cache_dir)
+        if not _is_fresh(cache_path, stat):
+            return layout  # Cache could not be written
+
+    try:
+        with open(cache_path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return decode_layout(data, copy_tiles=False)
+    except (OSError, ValueError, IndexError):
+        return load_layout(csv_path, cache_dir)
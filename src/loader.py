@@ -1,11 +1,24 @@
 import pygame
 import os
 
-from .entities import Wall, Player,Enemy,Door,Mask,Box,Endpoint,PressPlate, Spike, Key
+from .entities import Player,Enemy,Door,Mask,Box,Endpoint,PressPlate, Spike, Key
+from .tilemap import (TileMap, TILE_WALL, TILE_WALL_RED, TILE_WALL_GREEN, TILE_WALL_BLUE,
+                      TILE_WALL_YELLOW, TILE_END, TILE_DECORATION, find_tiles)
+from .spatial import SpatialHash
+from .render import StaticLayer, DrawOrder
+from .level_format import LevelLayout, load_layout, map_layout
+from .streaming import EntityStreamer, EntityRecord
+from .registry import EntityRegistry, parse_id_token
+from .variants import clear_variant_cache
 
 import random
 
 
+# Token -> color for the entity families that only differ by color
+MASK_COLORS = {'mr': 'red', 'mg': 'green', 'mb': 'blue'}
+ENEMY_COLORS = {'er': 'red', 'eg': 'green', 'eb': 'blue', 'ee': 'neutral'}
+BOX_COLORS = {'br': 'red', 'bg': 'green', 'bb': 'blue'}
+
 
 def load_placeholder_image(width, height, color):
     """Create a placeholder surface with a specific color."""
@@ -19,7 +32,13 @@ def load_placeholder_image(width, height, color):
     return surf
 
 
-def load_texture(filename, width, height, fallback_color):
+# Process-wide texture cache: (filename, width, height, fallback_color) -> Surface
+# Surfaces in here are shared by every level load and must never be modified in place;
+# mirrored and transparent versions come from variants.get_variant.
+_texture_cache = {}
+
+
+def _load_texture_from_disk(filename, width, height, fallback_color):
     """Load a texture from assets/images/ or create a placeholder."""
     asset_path = os.path.join(os.path.dirname(__file__), '..', 'assets', 'images', filename)
     
@@ -40,6 +59,33 @@ def load_texture(filename, width, height, fallback_color):
     return load_placeholder_image(width, height, fallback_color)
 
 
+def load_texture(filename, width, height, fallback_color):
+    """Load a texture from assets/images/ or create a placeholder. Each texture is loaded once per process."""
+    key = (filename, width, height, tuple(fallback_color))
+    texture = _texture_cache.get(key)
+    if texture is None:
+        texture = _texture_cache[key] = _load_texture_from_disk(filename, width, height, fallback_color)
+    return texture
+
+
+def invalidate_texture_cache(filename=None):
+    """
+    Forget cached textures so the next load reads them from disk again.
+    Drops every texture, or only the sizes/fallbacks cached for one filename.
+    """
+    if filename is None:
+        _texture_cache.clear()
+        clear_variant_cache()
+        return
+    for key in [key for key in _texture_cache if key[0] == filename]:
+        clear_variant_cache(_texture_cache.pop(key))
+
+
+def texture_cache_size():
+    """Return the number of cached textures."""
+    return len(_texture_cache)
+
+
 def create_asset_dict(tile_size):
     """Create a dictionary of images for all assets."""
     colors = {
@@ -83,22 +129,14 @@ def create_asset_dict(tile_size):
     
     # Boxes
     assets['br'] = load_texture('red_box.bmp', tile_size -4, tile_size - 4, (180, 50, 50))
+    assets['bg'] = load_texture('green_box.bmp', tile_size - 4, tile_size - 4, (50, 180, 50))
+    assets['bb'] = load_texture('blue_box.bmp', tile_size - 4, tile_size - 4, (50, 50, 180))
     
     # Doors and keys
-    assets['d1'] = load_texture('door.bmp', tile_size, tile_size, colors['purple'])
-    assets['d2'] = load_texture('door.bmp', tile_size, tile_size, colors['purple'])
-    assets['d3'] = load_texture('door.bmp', tile_size, tile_size, colors['purple'])
-    assets['d1o'] = load_texture('door.bmp', tile_size, tile_size, colors['purple'])
-    assets['d2o'] = load_texture('door.bmp', tile_size, tile_size, colors['purple'])
-    assets['d3o'] = load_texture('door.bmp', tile_size, tile_size, colors['purple'])
-    assets['k1'] = load_texture('image.bmp', tile_size, tile_size, colors['yellow'])
-    assets['k2'] = load_texture('image.bmp', tile_size, tile_size, colors['yellow'])
-    assets['k3'] = load_texture('image.bmp', tile_size, tile_size, colors['yellow'])
+    # One texture each, whatever the ID ('d7', 'd7o', 'k7')
+    assets['door'] = load_texture('door.bmp', tile_size, tile_size, colors['purple'])
+    assets['key'] = load_texture('image.bmp', tile_size, tile_size, colors['yellow'])
     assets['pr'] = load_texture('press.bmp', tile_size, tile_size, colors['white'])
-    assets['dk1'] = load_texture('door.bmp', tile_size, tile_size, colors['purple'])  # ADD THIS
-    assets['dk2'] = load_texture('door.bmp', tile_size, tile_size, colors['purple'])  # ADD THIS
-    assets['dk3'] = load_texture('door.bmp', tile_size, tile_size, colors['purple'])  # ADD THIS
-    assets['dp1'] = load_texture('door.bmp', tile_size, tile_size, colors['green'])   # ADD THIS
 
 
     # Traps
@@ -118,225 +156,195 @@ def create_asset_dict(tile_size):
     return assets
 
 
-def load_level(csv_path, tile_size=32):
+def new_level_groups(tile_size=32):
+    """Create the empty sprite groups and indexes that make up a loaded level."""
+    return {
+        'player': None,
+        'enemies': pygame.sprite.Group(),
+        'all_sprites': pygame.sprite.Group(),
+        'solid_sprites': pygame.sprite.Group(),
+        'masks': pygame.sprite.Group(),  # Mask pickups
+        'doors': pygame.sprite.Group(),
+        'keys': pygame.sprite.Group(),
+        'boxes': pygame.sprite.Group(),
+        'traps': pygame.sprite.Group(),
+        'endpoints': pygame.sprite.Group(),
+        'presses': pygame.sprite.Group(),
+        'records': [],  # EntityRecord per entity table row except the player, in table order
+        'registry': EntityRegistry(),  # Doors, keys and plates by ID
+        'dynamic_solids': pygame.sprite.Group(),  # Solids that are not static walls
+        'spatial': SpatialHash(tile_size * 2),  # Broadphase for dynamic and pickup entities
+    }
+
+
+def spawn_entity(level, cell, x, y, assets, tile_size=32):
+    """
+    Create the sprite for one level token at pixel position (x, y) and add it to
+    the level's groups. Returns the sprite, or None for unknown tokens.
+    """
+    sprite = None
+    entity_id = parse_id_token(cell)  # (kind, ID, suffix) for doors, keys and plates
+    
+    # Player
+    if cell == 'p':
+        sprite_variants = {
+            'red': assets['p_red'],
+            'green': assets['p_green'],
+            'blue': assets['p_blue']
+        }
+        sprite = Player(x + (tile_size - 24) // 2, y + (tile_size - 24) // 2, assets['p'], lives=3, sprite_variants=sprite_variants)
+        level['all_sprites'].add(sprite)
+        level['player'] = sprite
+    
+    # Masks
+    elif cell in MASK_COLORS:
+        sprite = Mask(x, y, assets[cell], MASK_COLORS[cell])
+        level['all_sprites'].add(sprite)
+        level['masks'].add(sprite)
+        level['spatial'].add(sprite)
+    
+    # Enemies (neutral enemies are not affected by masks)
+    elif cell in ENEMY_COLORS:
+        sprite = Enemy(x, y, assets[cell], ENEMY_COLORS[cell], lives=1)
+        level['all_sprites'].add(sprite)
+        level['enemies'].add(sprite)
+        level['spatial'].add(sprite)
+    
+    # Boxes, pushable while wearing the mask of their color
+    elif cell in BOX_COLORS:
+        sprite = Box(x, y, assets[cell], BOX_COLORS[cell])
+        level['all_sprites'].add(sprite)
+        level['solid_sprites'].add(sprite)
+        level['dynamic_solids'].add(sprite)
+        level['boxes'].add(sprite)
+        level['spatial'].add(sprite)
+    
+    # Key: opens every door with its ID
+    elif entity_id and entity_id[0] == 'key':
+        sprite = Key(x, y, assets['key'], entity_id[1])
+        level['all_sprites'].add(sprite)
+        level['keys'].add(sprite)
+        level['registry'].add(sprite)
+        level['spatial'].add(sprite)
+    
+    # Door (closed, or open with the 'o' suffix)
+    elif entity_id and entity_id[0] == 'door':
+        sprite = Door(x, y, assets['door'], entity_id[1])
+        if entity_id[2] == 'o':
+            sprite.open_door()
+        level['all_sprites'].add(sprite)
+        level['solid_sprites'].add(sprite)
+        level['dynamic_solids'].add(sprite)
+        level['doors'].add(sprite)
+        level['registry'].add(sprite)
+        level['spatial'].add(sprite)
+    
+    # Pressure plate: toggles every door with its ID (debounced with the 'd' suffix)
+    elif entity_id and entity_id[0] == 'plate':
+        sprite = PressPlate(x, y, assets['pr'], entity_id[1], debounce=entity_id[2] == 'd')
+        level['all_sprites'].add(sprite)
+        level['presses'].add(sprite)
+        level['registry'].add(sprite)
+        level['spatial'].add(sprite)
+    
+    # Spike traps (guillotine right with alternating animation)
+    elif cell == 'tgr':
+        sprite = Spike(x, y, assets['tgr_closed'], assets['tgr_open'])
+        level['all_sprites'].add(sprite)
+        level['traps'].add(sprite)
+        level['spatial'].add(sprite)
+    
+    # Endpoint
+    elif cell == 'end':
+        sprite = Endpoint(x, y, assets['end'])
+        level['all_sprites'].add(sprite)
+        level['endpoints'].add(sprite)
+    
+    return sprite
+
+
+def load_level(csv_path, tile_size=32, layout=None, tilemap=None, rng=None, streaming=False):
     """
     Load a level from a CSV file and create sprite groups.
-    The CSV uses space-separated values with spaces as empty cells.
+    The CSV uses space-separated values with spaces as empty cells. It is read
+    through the compiled level cache (see level_format); pass an already parsed
+    LevelLayout (and optionally its TileMap, see preload) to skip that step.
+    Pass a seeded random.Random as rng to make the level's random choices reproducible.
+    With streaming=True the tile grid is memory-mapped and no wall sprites are made;
+    entities are created near the player by the level's EntityStreamer (see streaming).
     
     Returns:
         dict with keys: 'player', 'enemies', 'all_sprites', 'solid_sprites', 
-                       'mask_sprites', 'entities' (dict mapping color to sprite lists)
+                       'masks' (mask pickups),
+                       'tilemap' (static walls as a TileMap), 'dynamic_solids' (doors and boxes),
+                       'spatial' (SpatialHash of enemies, boxes, doors, plates, keys and masks),
+                       'static_layer' (walls, endpoints and decorations baked into chunks),
+                       'dynamic_sprites' (everything that still has to be drawn per sprite),
+                       'registry' (EntityRegistry: doors, keys and plates by ID, kept in sync
+                                   as sprites die),
+                       'streamer' (EntityStreamer in streaming mode, otherwise None)
     """
-    all_sprites = pygame.sprite.Group()
-    solid_sprites = pygame.sprite.Group()
-    mask_sprites = pygame.sprite.Group()  # Colored sprites affected by masks
-    doors = pygame.sprite.Group()
-    keys = pygame.sprite.Group()
-    plates = pygame.sprite.Group()
-    boxes = pygame.sprite.Group()
-    traps = pygame.sprite.Group()
-    decorations = pygame.sprite.Group()
-    endpoints = pygame.sprite.Group()
-    enemies=pygame.sprite.Group()
+    level = new_level_groups(tile_size)
 
     # Create asset placeholders
     assets = create_asset_dict(tile_size)
+    cobweb_seed = (rng or random).getrandbits(32)  # Picks which neutral walls get cobwebs
     
-    player = None
+    if layout is None:
+        try:
+            layout = map_layout(csv_path) if streaming else load_layout(csv_path)
+        except FileNotFoundError:
+            print(f"Error: Could not find level file at {csv_path}")
+            layout = LevelLayout(0, 0, bytearray(), [])
     
-    try:
-        with open(csv_path, 'r') as f:
-            for row_idx, line in enumerate(f):
-                x_counter = 0
-                line = line.strip('\n')  # Remove newline
-                tiles = line.split(' ')  # Split by spaces
-                
-                for cell in tiles:
-                    cell = cell.strip()
-                    
-                    x = x_counter * tile_size
-                    y = row_idx * tile_size
-                    
-                    # Empty space
-                    if not cell or cell == 'o':
-                        x_counter += 1
-                        continue
-                    
-                    # Player
-                    if cell == 'p':
-                        sprite_variants = {
-                            'red': assets['p_red'],
-                            'green': assets['p_green'],
-                            'blue': assets['p_blue']
-                        }
-                        player = Player(x + (tile_size - 24) // 2, y + (tile_size - 24) // 2, assets['p'], lives=3, sprite_variants=sprite_variants)
-                        all_sprites.add(player)
-                    
-                    # Neutral wall
-                    elif cell == 'w':
-                        # 5% chance for cobweb wall
-                        if random.random() < 0.05:
-                            wall_img = assets['w_cobweb']
-                        else:
-                            wall_img = assets['w_normal']
-                            
-                        wall = Wall(x, y, wall_img, tile_size)
-                        all_sprites.add(wall)
-                        solid_sprites.add(wall)
-                    
-                    # Red wall
-                    elif cell == 'wr':
-                        wall = Wall(x, y, assets['wr'], tile_size, color='red')
-                        wall.color = 'red'
-                        all_sprites.add(wall)
-                        solid_sprites.add(wall)
-                        mask_sprites.add(wall)
-                    
-                    # Green wall
-                    elif cell == 'wg':
-                        wall = Wall(x, y, assets['wg'], tile_size, color='green')
-                        wall.color = 'green'
-                        all_sprites.add(wall)
-                        solid_sprites.add(wall)
-                        mask_sprites.add(wall)
-                    
-                    # Blue wall
-                    elif cell == 'wb':
-                        wall = Wall(x, y, assets['wb'], tile_size, color='blue')
-                        wall.color = 'blue'
-                        all_sprites.add(wall)
-                        solid_sprites.add(wall)
-                        mask_sprites.add(wall)
-                    
-                    # Yellow wall
-                    elif cell == 'wy':
-                        wall = Wall(x, y, assets['wy'], tile_size, color='yellow')
-                        wall.color = 'yellow'
-                        all_sprites.add(wall)
-                        solid_sprites.add(wall)
-                    
-                    # Red mask
-                    elif cell == 'mr':
-                        mask_obj = Mask(x, y, assets['mr'], 'red')
-                        all_sprites.add(mask_obj)
-                    
-                    # Green mask
-                    elif cell == 'mg':
-                        mask_obj = Mask(x, y, assets['mg'], 'green')
-                        all_sprites.add(mask_obj)
-                    
-                    # Blue mask
-                    elif cell == 'mb':
-                        mask_obj = Mask(x, y, assets['mb'], 'blue')
-                        all_sprites.add(mask_obj)
-                    
-                    # Red enemy
-                    elif cell == 'er':
-                        enemy = Enemy(x, y, assets['er'], 'red', lives=1)
-                        all_sprites.add(enemy)
-                        enemies.add(enemy)
-                        mask_sprites.add(enemy)
-                    
-                    # Green enemy
-                    elif cell == 'eg':
-                        enemy = Enemy(x, y, assets['eg'], 'green', lives=1)
-                        all_sprites.add(enemy)
-                        enemies.add(enemy)
-                        mask_sprites.add(enemy)
-                    
-                    # Blue enemy
-                    elif cell == 'eb':
-                        enemy = Enemy(x, y, assets['eb'], 'blue', lives=1)
-                        all_sprites.add(enemy)
-                        enemies.add(enemy)
-                        mask_sprites.add(enemy)
-                        all_sprites.add(enemy)
-                        enemies.add(enemy)
-                        mask_sprites.add(enemy)
-                    
-                    # Neutral enemy
-                    elif cell == 'ee':
-                        enemy = Enemy(x, y, assets['ee'], 'neutral', lives=1)
-                        all_sprites.add(enemy)
-                        enemies.add(enemy)
-                    
-                    # Red box
-                    elif cell == 'br':
-                        box = Box(x, y, assets['br'], 'red')
-                        all_sprites.add(box)
-                        solid_sprites.add(box)
-                        boxes.add(box)
-                        mask_sprites.add(box)
-                    
-                    # # Door 1
-                    # elif cell == 'd1':
-                    #     door = Door(x, y, assets['d1'], 1)
-                    #     all_sprites.add(door)
-                    #     solid_sprites.add(door)
-                    #     doors.add(door)
-                    
-                    # Key 1, 2, 3
-                    elif cell in ['k1', 'k2', 'k3']:
-                        key_id = int(cell[1])
-                        key = Key(x, y, assets[cell], key_id)
-                        all_sprites.add(key)
-                        keys.add(key)
-                    
-                    # Door
-                    elif cell in ['d1', 'd2', 'd3']:
-                        door_id = int(cell[1])
-                        door = Door(x, y, assets[cell], door_id)
-                        all_sprites.add(door)
-                        solid_sprites.add(door)
-                        doors.add(door)
-                        print("Added closed door")
-                    elif cell in ['d1o', 'd2o', 'd3o']:
-                        door_id = int(cell[1])
-                        door = Door(x, y, assets[cell], door_id)
-                        door.open_door()
-                        all_sprites.add(door)
-                        solid_sprites.add(door)
-                        doors.add(door)
-                    
-                    # Pressure plate 1 not debounce
-                    elif cell in ['p1','p2','p3']:
-                        plate = PressPlate(x, y, assets['pr'], int(cell[1]))
-                        all_sprites.add(plate)
-                        plates.add(plate)
-                    elif cell in ['p1d', 'p2d', 'p3d']:
-                        plate = PressPlate(x, y, assets['pr'], int(cell[1]),debounce=True)
-                        all_sprites.add(plate)
-                        plates.add(plate)
-                    
-                    
-                    # Spike traps (guillotine right with alternating animation)
-                    elif cell == 'tgr':
-                        spike = Spike(x, y, assets['tgr_closed'], assets['tgr_open'])
-                        all_sprites.add(spike)
-                        traps.add(spike)
-
-                    # Endpoint
-                    elif cell == 'end':
-                        endpoint = Endpoint(x, y, assets['end'])
-                        all_sprites.add(endpoint)
-                        endpoints.add(endpoint)
-                    
-                    x_counter += 1
+    tiles = layout.tiles
+    width = layout.width
+    streamer = None
+    # Endpoints are the only grid tiles with a sprite (for their trigger zone); walls and
+    # decorations are drawn by the StaticLayer and collide through the TileMap
+    for index in find_tiles(tiles, TILE_END):
+        row, col = divmod(index, width)
+        spawn_entity(level, 'end', col * tile_size, row * tile_size, assets, tile_size)
+    if streaming:
+        # Only the player and the endpoints exist up front; the rest streams in by chunk
+        streamed = []
+        for cell, col, row in layout.entities:
+            if cell == 'p':
+                spawn_entity(level, cell, col * tile_size, row * tile_size, assets, tile_size)
+            else:
+                streamed.append((cell, col, row))
+        streamer = EntityStreamer(
+            level, streamed,
+            lambda cell, x, y: spawn_entity(level, cell, x, y, assets, tile_size),
+            tile_size)
+        level['records'] = streamer.records
+    else:
+        for cell, col, row in layout.entities:
+            x, y = col * tile_size, row * tile_size
+            sprite = spawn_entity(level, cell, x, y, assets, tile_size)
+            if cell != 'p':
+                record = EntityRecord(cell, x, y, None)
+                record.sprite = sprite
+                level['records'].append(record)
     
-    except FileNotFoundError:
-        print(f"Error: Could not find level file at {csv_path}")
+    if tilemap is None:
+        tilemap = TileMap(layout.width, layout.height, tile_size, layout.tiles)
     
-    return {
-        'player': player,
-        'enemies': enemies,
-        'all_sprites': all_sprites,
-        'solid_sprites': solid_sprites,
-        'mask_sprites': mask_sprites,
-        'doors': doors,
-        'keys': keys,
-        'boxes': boxes,
-        'traps': traps,
-        'decorations': decorations,
-        'endpoints': endpoints,
-        'presses': plates,
-    }
\ No newline at end of file
+    # Bake everything that never moves into chunks; the rest is drawn per sprite
+    tile_images = {
+        TILE_WALL: assets['w_normal'],
+        TILE_WALL_RED: assets['wr'],
+        TILE_WALL_GREEN: assets['wg'],
+        TILE_WALL_BLUE: assets['wb'],
+        TILE_WALL_YELLOW: assets['wy'],
+        TILE_END: assets['end'],
+        TILE_DECORATION: assets['dec'],
+    }
+    level['tilemap'] = tilemap
+    level['static_layer'] = StaticLayer(tilemap, tile_images, assets['w_cobweb'], cobweb_seed)
+    level['dynamic_sprites'] = DrawOrder(
+        sprite for sprite in level['all_sprites'] if not isinstance(sprite, Endpoint)
+    )
+    level['streamer'] = streamer
+    
+    return level
@@ -0,0 +1,202 @@
+"""Seeded procedural maze levels in the CSV token format.
+
+Mazes are carved with the sidewinder algorithm, which works one row at a time.
+Each cell row is decided from a random draw plus the row above it. Generation
+therefore streams: memory stays O(width) and time is linear in the tile count.
+Rows can be written straight to disk with write_level. They can also be fed to
+the loader without building the file text, via generate_layout.
+
+A sidewinder maze is a spanning tree. After every row, all cells carved so far
+are connected, so the player ('p', top-left cell) always has a path to 'end'
+(bottom-right cell). Content is placed so that it never breaks that path:
+  - Gates: every passage opening north out of a gate row is a door ('d1', 'd2', ...).
+    The matching key is placed above that row, in the part of the maze that is
+    reachable once the previous gates are open.
+  - Colored walls ('wr'/'wg'/'wb') only replace walls. Masks ('mr'/'mg'/'mb')
+    can only open shortcuts.
+  - Boxes ('br') and pressure plates ('p1'..) only go in dead ends, never on a
+    through passage. Plates toggle the gate doors as an optional shortcut.
+  - Ghosts ('er') and spike traps ('tgr') go in open cells. They cost lives but
+    never wall anything off.
+"""
+import argparse
+import random
+
+from .level_format import parse_level_lines
+
+WALL_TOKENS = ('wr', 'wg', 'wb')
+MASK_TOKENS = ('mr', 'mg', 'mb')
+
+
+def maze_size(width, height):
+    """Cell columns and rows of a maze that fits in width x height tiles (walls between cells)."""
+    cols, rows = (width - 1) // 2, (height - 1) // 2
+    if cols < 2 or rows < 2:
+        raise ValueError(f"A maze needs at least 5x5 tiles, got {width}x{height}")
+    return cols, rows
+
+
+def _carve_row(rng, cols, first):
+    """
+    Sidewinder step for one cell row. Returns (east, north): east[c] opens the wall
+    between cells c and c+1, north[c] opens the wall above cell c.
+    """
+    east = bytearray(cols)
+    north = bytearray(cols)
+    if first:
+        # The top row has nothing to connect north to, so it is one long corridor
+        east[:cols - 1] = b'\1' * (cols - 1)
+        return east, north
+    run_start = 0
+    last = cols - 1
+    random_value = rng.random
+    for col in range(cols):
+        if col < last and random_value() < 0.5:
+            east[col] = 1
+        else:
+            # Close the run and connect it north from one of its cells
+            north[run_start + int(random_value() * (col - run_start + 1))] = 1
+            run_start = col + 1
+    return east, north
+
+
+def _gate_rows(rows, gates):
+    """Cell rows whose north openings become doors, evenly spread down the maze."""
+    result = []
+    for gate in range(1, gates + 1):
+        row = max(1, gate * rows // (gates + 1))
+        if not result or row > result[-1]:
+            result.append(row)
+    return result
+
+
+def _place_keys(rng, cols, gate_rows):
+    """One key per gate, somewhere above its gate row and below the previous one."""
+    keys = {}
+    top = 0
+    for gate_id, gate_row in enumerate(gate_rows, start=1):
+        while True:
+            cell = (rng.randrange(top, gate_row), rng.randrange(cols))
+            if cell != (0, 0) and cell not in keys:
+                break
+        keys[cell] = f'k{gate_id}'
+        top = gate_row
+    return keys
+
+
+def generate_level_lines(width, height, seed=None, gates=1, colored=0.1, masks=0.01, ghosts=0.01,
+                         spikes=0.01, boxes=0.1, plates=0.05):
+    """
+    Yield the rows of a width x height tile level (rounded down to odd sizes) as CSV lines.
+    The densities are per-cell probabilities: colored for each interior wall, masks/ghosts/spikes
+    for each open cell, boxes/plates for each dead end. The same arguments always yield the same level.
+    """
+    if gates < 0:
+        raise ValueError("gates must not be negative")
+    cols, rows = maze_size(width, height)
+    rng = random.Random(seed)
+    random_value = rng.random
+
+    gate_rows = _gate_rows(rows, gates)
+    gate_doors = {row: f'd{gate_id}' for gate_id, row in enumerate(gate_rows, start=1)}
+    keys = _place_keys(rng, cols, gate_rows)
+    end_cell = (rows - 1, cols - 1)
+
+    open_items = ((masks, MASK_TOKENS), (ghosts, ('er',)), (spikes, ('tgr',)))
+    dead_end_items = ((boxes, ('br',)),
+                      (plates, tuple(f'p{gate_id}' for gate_id in range(1, len(gate_rows) + 1))))
+
+    def wall():
+        if random_value() < colored:
+            return WALL_TOKENS[int(random_value() * 3)]
+        return 'w'
+
+    def pick(items):
+        roll = random_value()
+        for density, tokens in items:
+            if roll < density and tokens:
+                return tokens[int(random_value() * len(tokens))]
+            roll -= density
+        return 'o'
+
+    def cell_token(row, col, degree):
+        cell = (row, col)
+        if cell == (0, 0):
+            return 'p'
+        if cell == end_cell:
+            return 'end'
+        if cell in keys:
+            return keys[cell]
+        return pick(dead_end_items if degree == 1 else open_items)
+
+    tile_width = 2 * cols + 1
+    border = ' '.join(['w'] * tile_width)
+    yield border
+
+    # Rows are emitted one behind the carving: a cell only knows whether it is a
+    # dead end once the row below has decided whether to open north into it
+    east, north = _carve_row(rng, cols, True)
+    for row in range(rows):
+        below = _carve_row(rng, cols, False) if row + 1 < rows else None
+        south = below[1] if below else bytearray(cols)
+
+        if row > 0:
+            door = gate_doors.get(row, 'o')
+            cells = ['w']
+            for col in range(cols):
+                cells.append(door if north[col] else wall())
+                cells.append('w')
+            yield ' '.join(cells)
+
+        cells = ['w']
+        for col in range(cols):
+            degree = east[col] + north[col] + south[col] + (col > 0 and east[col - 1])
+            cells.append(cell_token(row, col, degree))
+            if col == cols - 1:
+                cells.append('w')
+            else:
+                cells.append('o' if east[col] else wall())
+        yield ' '.join(cells)
+
+        if below:
+            east, north = below
+    yield border
+
+
+def write_level(path, width, height, seed=None, **options):
+    """Stream a generated level to path. Returns the path."""
+    with open(path, 'w') as f:
+        for line in generate_level_lines(width, height, seed, **options):
+            f.write(line)
+            f.write('\n')
+    return path
+
+
+def generate_layout(width, height, seed=None, **options):
+    """Generate a level straight into a LevelLayout, ready for loader.load_level(..., layout=...)."""
+    return parse_level_lines(generate_level_lines(width, height, seed, **options))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a maze level CSV")
+    parser.add_argument('output', help="CSV file to write")
+    parser.add_argument('--size', default='61x41', help="Level size in tiles, WIDTHxHEIGHT")
+    parser.add_argument('--seed', type=int, help="Seed (random if omitted)")
+    parser.add_argument('--gates', type=int, default=1, help="Key-locked door rows (at most one per cell row)")
+    parser.add_argument('--colored', type=float, default=0.1, help="Chance of an interior wall being colored")
+    parser.add_argument('--masks', type=float, default=0.01, help="Masks per open cell")
+    parser.add_argument('--ghosts', type=float, default=0.01, help="Ghosts per open cell")
+    parser.add_argument('--spikes', type=float, default=0.01, help="Spike traps per open cell")
+    parser.add_argument('--boxes', type=float, default=0.1, help="Boxes per dead end")
+    parser.add_argument('--plates', type=float, default=0.05, help="Pressure plates per dead end")
+    args = parser.parse_args()
+
+    width, height = (int(value) for value in args.size.lower().split('x'))
+    seed = args.seed if args.seed is not None else random.randrange(2**32)
+    write_level(args.output, width, height, seed, gates=args.gates, colored=args.colored, masks=args.masks,
+                ghosts=args.ghosts, spikes=args.spikes, boxes=args.boxes, plates=args.plates)
+    print(f"Wrote {args.output} (seed {seed})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Background preparation of upcoming levels.
+
+Parsing a level (compiled cache or CSV) and building its TileMap does not touch
+pygame, so it can run on a worker thread while the current level is played.
+When the level is actually needed only the sprite and surface work is left
+for the main thread.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from .level_format import load_layout, map_layout
+from .tilemap import TileMap
+
+
+def prepare_level(csv_path, tile_size=32, mapped=False):
+    """Parse a level (memory-mapping its tile grid if mapped) and build its TileMap. Safe to call from any thread."""
+    layout = map_layout(csv_path) if mapped else load_layout(csv_path)
+    tilemap = TileMap(layout.width, layout.height, tile_size, layout.tiles)
+    return layout, tilemap
+
+
+class LevelPreloader:
+    """Prepares levels on a single worker thread and hands them over on request."""
+
+    def __init__(self, tile_size=32, mapped=False):
+        self.tile_size = tile_size
+        self.mapped = mapped
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='level-preload')
+        self.pending = {}  # absolute csv path -> Future of (layout, tilemap)
+
+    def request(self, csv_path):
+        """Start preparing csv_path in the background (no-op if already requested)."""
+        key = os.path.abspath(csv_path)
+        if key not in self.pending:
+            self.pending[key] = self.executor.submit(prepare_level, csv_path, self.tile_size, self.mapped)
+
+    def take(self, csv_path):
+        """
+        Return the prepared (layout, tilemap) for csv_path, waiting for the worker
+        if it is still busy. Returns None if it was never requested or failed.
+        """
+        future = self.pending.pop(os.path.abspath(csv_path), None)
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"Warning: Could not preload {csv_path}: {e}")
+            return None
+
+    def cancel(self):
+        """Drop every pending preparation that has not started yet."""
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,150 @@
+"""Per-phase frame profiler.
+
+The game loop calls begin_frame(), then mark('phase') after each phase, then
+end_frame(). Each mark charges the time since the previous mark to that phase.
+Finished frames go into a ring buffer. From there they can be summarized
+(average, p95, worst frame), drawn as an overlay, or exported as CSV/JSON.
+While disabled every call returns immediately, so the hooks can stay in the
+hot path.
+"""
+import csv
+import json
+import math
+import time
+from collections import deque
+
+import pygame
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers (0.0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(fraction * len(ordered) - 1e-9)  # 1-based; the epsilon absorbs float error in the product
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+class FrameProfiler:
+    """Collects per-phase timings for the last `history` frames."""
+
+    def __init__(self, history=600, enabled=False):
+        self.enabled = enabled
+        self.frames = deque(maxlen=history)  # (frame number, total seconds, {phase: seconds})
+        self.phase_names = []  # In first-seen order, for stable overlay/export columns
+        self.worst = None  # Worst frame seen since the last reset, same shape as frames entries
+        self.frame_number = 0
+        self._frame_start = 0.0
+        self._last_mark = 0.0
+        self._current = None
+        self._overlay = None
+        self._overlay_frame = -1
+        self._font = None
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        self._current = None
+
+    def toggle(self):
+        self.set_enabled(not self.enabled)
+
+    def reset(self):
+        self.frames.clear()
+        self.worst = None
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self._frame_start = now
+        self._last_mark = now
+        self._current = {}
+
+    def mark(self, phase):
+        """Charge the time since the previous mark (or frame start) to phase."""
+        if not self.enabled or self._current is None:
+            return
+        now = time.perf_counter()
+        self._current[phase] = self._current.get(phase, 0.0) + now - self._last_mark
+        self._last_mark = now
+
+    def end_frame(self):
+        if not self.enabled or self._current is None:
+            return
+        total = time.perf_counter() - self._frame_start
+        self.frame_number += 1
+        for phase in self._current:
+            if phase not in self.phase_names:
+                self.phase_names.append(phase)
+        entry = (self.frame_number, total, self._current)
+        self.frames.append(entry)
+        if self.worst is None or total > self.worst[1]:
+            self.worst = entry
+        self._current = None
+
+    def summary(self):
+        """Return {phase: (average, p95, max)} in seconds, plus a 'frame' entry for whole frames."""
+        result = {}
+        for phase in self.phase_names:
+            values = [phases.get(phase, 0.0) for _, _, phases in self.frames]
+            if values:
+                result[phase] = (sum(values) / len(values), percentile(values, 0.95), max(values))
+        totals = [total for _, total, _ in self.frames]
+        if totals:
+            result['frame'] = (sum(totals) / len(totals), percentile(totals, 0.95), max(totals))
+        return result
+
+    def overlay(self, refresh_every=30):
+        """Return the per-phase table (ms) as a surface. The text is rebuilt every refresh_every frames."""
+        if self._overlay is None or self.frame_number - self._overlay_frame >= refresh_every:
+            self._overlay = self._render_overlay()
+            self._overlay_frame = self.frame_number
+        return self._overlay
+
+    def draw_overlay(self, screen, position=(10, 10), refresh_every=30):
+        """Draw the per-phase table onto screen."""
+        screen.blit(self.overlay(refresh_every), position)
+
+    def _render_overlay(self):
+        if self._font is None:
+            self._font = pygame.font.Font(None, 20)
+        lines = [f"{'phase':<12}{'avg':>8}{'p95':>8}{'max':>8}"]
+        for phase, (avg, p95, worst) in self.summary().items():
+            lines.append(f"{phase:<12}{avg * 1000:>8.2f}{p95 * 1000:>8.2f}{worst * 1000:>8.2f}")
+        if self.worst is not None:
+            frame_number, total, phases = self.worst
+            slowest = max(phases, key=phases.get) if phases else '-'
+            lines.append(f"worst #{frame_number}: {total * 1000:.2f} ms ({slowest})")
+
+        rendered = [self._font.render(line, True, (255, 255, 0)) for line in lines]
+        width = max(surface.get_width() for surface in rendered) + 10
+        height = sum(surface.get_height() for surface in rendered) + 10
+        overlay = pygame.Surface((width, height), pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 180))
+        y = 5
+        for surface in rendered:
+            overlay.blit(surface, (5, y))
+            y += surface.get_height()
+        return overlay
+
+    def export(self, path):
+        """Write the buffered frames to path as CSV (default) or JSON (.json), in milliseconds."""
+        if path.endswith('.json'):
+            data = {
+                'phases': self.phase_names,
+                'frames': [{'frame': number, 'total_ms': total * 1000,
+                            'phases_ms': {phase: value * 1000 for phase, value in phases.items()}}
+                           for number, total, phases in self.frames],
+                'summary_ms': {phase: {'avg': avg * 1000, 'p95': p95 * 1000, 'max': worst * 1000}
+                               for phase, (avg, p95, worst) in self.summary().items()},
+            }
+            with open(path, 'w') as f:
+                json.dump(data, f, indent=1)
+        else:
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['frame', 'total_ms'] + self.phase_names)
+                for number, total, phases in self.frames:
+                    writer.writerow([number, f"{total * 1000:.4f}"] +
+                                    [f"{phases.get(phase, 0.0) * 1000:.4f}" for phase in self.phase_names])
+        return path
@@ -0,0 +1,89 @@
+"""Player-to-ghost proximity, measured once per frame and shared.
+
+Every step the World measures the squared distance from the player to each
+ghost, before the ghosts steer, and works out which ghosts are inside their
+chase radius. Ghosts read their chase state from here instead of computing the
+distance themselves. Listeners hear about changes only:
+  - chase listeners get (enemy, True) when a ghost starts chasing and
+    (enemy, False) when it stops (or leaves the level);
+  - alert listeners get True when the first ghost starts chasing and False
+    when the last one stops. SoundManager.on_chase_change switches the music
+    this way.
+
+within() answers "which ghosts are within R of this point" through the level's
+spatial hash, so it only looks at ghosts in nearby cells.
+"""
+import math
+
+import pygame
+
+from .entities import Enemy
+
+
+class ProximityService:
+    """Squared player distances and chase state of the current level's ghosts."""
+
+    def __init__(self, spatial=None):
+        self.spatial = spatial  # The current level's SpatialHash, for within()
+        self.distance_sq = {}  # Enemy -> squared distance to the player this frame
+        self.chasing = set()  # Enemies inside their chase radius this frame
+        self.chase_listeners = []
+        self.alert_listeners = []
+
+    def add_chase_listener(self, listener):
+        """Call listener(enemy, chasing) every time one ghost starts or stops chasing."""
+        self.chase_listeners.append(listener)
+
+    def add_alert_listener(self, listener):
+        """Call listener(chasing) when the first ghost starts chasing and when the last one stops."""
+        self.alert_listeners.append(listener)
+
+    def measure(self, player, enemies):
+        """Measure every ghost against the player's position and update the chase state."""
+        player_x, player_y = player.pos.x, player.pos.y
+        distance_sq = self.distance_sq = {}
+        chasing = set()
+        for enemy in enemies:
+            dx = player_x - enemy.pos.x
+            dy = player_y - enemy.pos.y
+            distance = distance_sq[enemy] = dx * dx + dy * dy
+            if distance < enemy.chase_distance * enemy.chase_distance:
+                chasing.add(enemy)
+        self.set_chasing(chasing)
+
+    def measure_arrays(self, enemies, distance_sq, chasing):
+        """Take measurements already made in bulk (horde mode): per-enemy sequences in the same order."""
+        self.distance_sq = dict(zip(enemies, distance_sq))
+        self.set_chasing({enemy for enemy, chases in zip(enemies, chasing) if chases})
+
+    def set_chasing(self, chasing):
+        """Replace the set of chasing ghosts and tell the listeners what changed."""
+        previous = self.chasing
+        self.chasing = chasing
+        if chasing == previous:
+            return
+        for listener in self.chase_listeners:
+            for enemy in previous - chasing:
+                listener(enemy, False)
+            for enemy in chasing - previous:
+                listener(enemy, True)
+        if bool(chasing) != bool(previous):
+            for listener in self.alert_listeners:
+                listener(bool(chasing))
+
+    def is_chasing(self, enemy):
+        return enemy in self.chasing
+
+    def within(self, x, y, radius):
+        """Return the ghosts whose position is within radius of (x, y)."""
+        if self.spatial is None:
+            return []
+        radius_sq = radius * radius
+        left, top = math.floor(x - radius), math.floor(y - radius)
+        area = pygame.Rect(left, top, math.ceil(x + radius) - left + 1, math.ceil(y + radius) - top + 1)
+        result = []
+        for enemy in self.spatial.query(area, Enemy):
+            dx, dy = enemy.pos.x - x, enemy.pos.y - y
+            if dx * dx + dy * dy <= radius_sq:
+                result.append(enemy)
+        return result
@@ -0,0 +1,75 @@
+"""Box push physics.
+
+The boxes the pusher would run into (its rect moved by the full push) are
+found once, through the level's spatial hash, which also serves as the box
+occupancy index. They are then pushed one axis at a time, like player
+movement, so a diagonal push moves a box diagonally where both axes are free.
+A box moves if the tile grid is free where
+it is going and every box in its way can be pushed along too. This forms a
+chain, up to max_chain boxes long. Closed doors, boxes of another color and
+walls stop the whole chain, so a row of boxes either moves together or not at
+all.
+
+push() returns the boxes that moved, so callers can react only to them.
+"""
+from .entities import Box, Door
+
+MAX_CHAIN = 16  # Longest row of boxes one push can move
+
+
+class PushSolver:
+    """Moves boxes pushed by the player against the tile grid and the other dynamic solids."""
+
+    def __init__(self, tilemap, spatial, dynamic_solids, max_chain=MAX_CHAIN):
+        self.tilemap = tilemap
+        self.spatial = spatial
+        self.dynamic_solids = dynamic_solids
+        self.max_chain = max_chain
+
+    def push(self, pusher_rect, dx, dy, color):
+        """
+        Push the boxes of the given mask color that pusher_rect would run into when moved
+        by (dx, dy). Returns the list of boxes that moved.
+        """
+        if color is None:
+            return []
+        hit = [box for box in self.spatial.query(pusher_rect.move(dx, dy), Box) if box in self.dynamic_solids]
+        moved = {}  # Boxes moved on either axis, in the order they moved
+        for step_x, step_y in ((dx, 0), (0, dy)):
+            if hit and (step_x or step_y):
+                moved.update(self._push_axis(hit, step_x, step_y, color))
+        return list(moved)
+
+    def _push_axis(self, hit, dx, dy, color):
+        """Push the boxes hit along one axis. Returns the boxes moved, as a dict in the order they moved."""
+        pushed = {}
+        for box in hit:
+            if box in pushed:
+                continue  # Already moved by an earlier chain on this axis
+            chain = {}  # Boxes to move, in the order they were reached
+            if self._collect(box, dx, dy, color, chain):
+                for other in chain:
+                    other.pos.x += dx
+                    other.pos.y += dy
+                    other.rect.topleft = (other.pos.x, other.pos.y)
+                    self.spatial.move(other)
+                pushed.update(chain)
+        return pushed
+
+    def _collect(self, box, dx, dy, color, chain):
+        """Add box and every box it would shove into chain. Returns False if any of them cannot move."""
+        if box.color != color or len(chain) >= self.max_chain:
+            return False
+        target = box.rect.move(dx, dy)
+        if self.tilemap.collides(target):
+            return False
+        chain[box] = None
+        for other in self.spatial.query(target, (Box, Door)):
+            if other is box or other in chain or other not in self.dynamic_solids:
+                continue
+            if isinstance(other, Door):
+                if not other.is_open:
+                    return False
+            elif other.on_off and not self._collect(other, dx, dy, color, chain):
+                return False
+        return True
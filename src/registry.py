@@ -0,0 +1,83 @@
+"""ID index of a level's interactive entities.
+
+Doors, keys and plates are linked by number: key k7 opens every door d7, plate
+p7 toggles them. Level tokens carry any positive ID ('d12', 'd12o', 'k12',
+'p12', 'p12d'). The EntityRegistry is a sprite group that files every door,
+key and plate under its (kind, ID) when it is added. Because it is a group,
+sprite.kill() takes a sprite out of the index as well. Lookups are dict reads.
+
+A lookup returns the index's own bucket: a dict of sprites that stays current
+as entities come and go (streaming included). Iterate it, never modify it.
+Looking up an ID with no bucket yet returns an empty tuple and creates
+nothing; World.link_plates runs again when streaming brings new doors.
+"""
+import re
+
+import pygame
+
+from .entities import Door, Key, PressPlate
+
+# Door, key and plate tokens: kind letter, ID, optional suffix ('o' = open door, 'd' = debounced plate)
+_ID_TOKEN = re.compile(r'([dkp])([1-9][0-9]*)([od]?)$')
+_KINDS = {'d': 'door', 'k': 'key', 'p': 'plate'}
+_SUFFIXES = {'d': ('', 'o'), 'k': ('',), 'p': ('', 'd')}
+
+# Entity class -> (kind, attribute holding its ID)
+ID_ATTRIBUTES = ((Door, 'door', 'door_id'), (Key, 'key', 'key_id'), (PressPlate, 'plate', 'plate_id'))
+
+
+def parse_id_token(token):
+    """Return (kind, ID, suffix) for a door, key or plate token, or None for any other token."""
+    match = _ID_TOKEN.match(token)
+    if match is None:
+        return None
+    letter, number, suffix = match.groups()
+    if suffix not in _SUFFIXES[letter]:
+        return None
+    return _KINDS[letter], int(number), suffix
+
+
+class EntityRegistry(pygame.sprite.Group):
+    """Sprite group indexed by (kind, ID)."""
+
+    def __init__(self, *sprites):
+        self.by_id = {}  # (kind, ID) -> dict of sprites (insertion ordered)
+        super().__init__(*sprites)
+
+    @staticmethod
+    def id_of(sprite):
+        """Return (kind, ID) for doors, keys and plates, otherwise None."""
+        for cls, kind, attribute in ID_ATTRIBUTES:
+            if isinstance(sprite, cls):
+                return kind, getattr(sprite, attribute)
+        return None
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        entity_id = self.id_of(sprite)
+        if entity_id is not None:
+            self.by_id.setdefault(entity_id, {})[sprite] = None
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        entity_id = self.id_of(sprite)
+        if entity_id is not None:
+            self.by_id.get(entity_id, {}).pop(sprite, None)
+
+    def find(self, kind, entity_id):
+        """Live bucket of the entities of kind ('door', 'key', 'plate') with entity_id, or ()."""
+        return self.by_id.get((kind, entity_id), ())
+
+    def doors(self, door_id):
+        return self.find('door', door_id)
+
+    def keys(self, key_id):
+        return self.find('key', key_id)
+
+    def plates(self, plate_id):
+        return self.find('plate', plate_id)
+
+    def ids(self, kind):
+        """Sorted IDs of kind that currently have entities."""
+        return sorted(entity_id for (bucket_kind, entity_id), bucket in self.by_id.items()
+                      if bucket_kind == kind and bucket)
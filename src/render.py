@@ -0,0 +1,378 @@
+"""Rendering helpers.
+
+Camera and draw_world are the render pass shared by main.py and the benchmarks.
+Only sprites inside the camera rect are drawn (found through the spatial hash),
+and they go to the screen in a single Surface.blits() call.
+StaticLayer bakes the tiles that never move (neutral walls, colored walls,
+endpoints, decorations) into cached chunk surfaces straight from the TileMap,
+so a frame blits a handful of chunks instead of hundreds of wall sprites.
+"""
+import pygame
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from .entities import Player, Enemy, Box, Mask, Key, GHOST_ALPHA
+from .tilemap import TILE_EMPTY, TILE_WALL, MASK_WALLS
+from .variants import get_variant
+
+BACKGROUND_COLOR = (20, 20, 30)
+CHUNK_TILES = 16  # Chunk edge length in tiles
+DEFAULT_LAYER = 1  # Draw layer of sprite classes without a _layer (traps/plates are 0, the player 2)
+
+# Sprites that change rect.y during play and so may have to move in the draw order
+MOVING_SPRITES = (Player, Enemy, Box, Mask, Key)
+
+# Colored wall tile ID -> mask color that ghosts it
+COLORED_TILES = {tile_id: color for color, tile_id in MASK_WALLS.items()}
+
+
+def is_cobweb(seed, col, row):
+    """Deterministically pick ~5% of neutral walls to draw with cobwebs."""
+    h = (col * 73856093) ^ (row * 19349663) ^ seed
+    return (h * 2654435761 & 0xffffffff) % 100 < 5
+
+
+class StaticLayer:
+    """
+    Static tiles baked into chunk surfaces.
+
+    Chunks are baked the first time they come into view and kept in a small LRU
+    cache. A chunk that contains colored walls is re-baked only when the mask
+    state differs from the one it was baked with.
+    """
+
+    def __init__(self, tilemap, tile_images, cobweb_image=None, cobweb_seed=0,
+                 chunk_tiles=CHUNK_TILES, max_chunks=64):
+        self.tilemap = tilemap
+        self.tile_images = tile_images  # tile ID -> surface
+        self.cobweb_image = cobweb_image
+        self.cobweb_seed = cobweb_seed
+        self.chunk_tiles = chunk_tiles
+        self.chunk_size = chunk_tiles * tilemap.tile_size
+        self.max_chunks = max_chunks
+        self.mask = None
+        self.chunks = OrderedDict()  # (chunk_x, chunk_y) -> (surface or None, baked mask, has colored walls)
+        self.ghost_images = {}
+        for tile_id in COLORED_TILES:
+            if tile_id in tile_images:
+                self.ghost_images[tile_id] = get_variant(tile_images[tile_id], alpha=GHOST_ALPHA)
+
+    def set_mask(self, color):
+        """Remember the mask state; chunks with colored walls re-bake lazily on their next draw."""
+        self.mask = color
+
+    def tile_image(self, tile_id, col, row):
+        """Return the surface to bake for a tile under the current mask."""
+        if tile_id == TILE_WALL and self.cobweb_image is not None and is_cobweb(self.cobweb_seed, col, row):
+            return self.cobweb_image
+        if tile_id in COLORED_TILES and COLORED_TILES[tile_id] == self.mask:
+            return self.ghost_images.get(tile_id)
+        return self.tile_images.get(tile_id)
+
+    def _bake(self, chunk_x, chunk_y):
+        """Bake one chunk. Returns (surface or None if it has no static tiles, has colored walls)."""
+        tilemap = self.tilemap
+        tiles = tilemap.tiles
+        ts = tilemap.tile_size
+        col0 = chunk_x * self.chunk_tiles
+        row0 = chunk_y * self.chunk_tiles
+        col1 = min(col0 + self.chunk_tiles, tilemap.width)
+        row1 = min(row0 + self.chunk_tiles, tilemap.height)
+
+        surface = None
+        has_colored = False
+        for row in range(row0, row1):
+            start = row * tilemap.width
+            for col in range(col0, col1):
+                tile_id = tiles[start + col]
+                if tile_id == TILE_EMPTY:
+                    continue
+                image = self.tile_image(tile_id, col, row)
+                if image is None:
+                    continue
+                if surface is None:
+                    surface = pygame.Surface((self.chunk_size, self.chunk_size))
+                    try:
+                        surface = surface.convert()
+                    except pygame.error:
+                        # Fallback if no display mode set
+                        pass
+                    surface.fill(BACKGROUND_COLOR)
+                has_colored = has_colored or tile_id in COLORED_TILES
+                surface.blit(image, ((col - col0) * ts, (row - row0) * ts))
+        return surface, has_colored
+
+    def get_chunk(self, chunk_x, chunk_y):
+        """Return the baked surface for a chunk (or None if it is empty), baking it if needed."""
+        key = (chunk_x, chunk_y)
+        entry = self.chunks.get(key)
+        if entry is not None and (not entry[2] or entry[1] == self.mask):
+            self.chunks.move_to_end(key)
+            return entry[0]
+        surface, has_colored = self._bake(chunk_x, chunk_y)
+        self.chunks[key] = (surface, self.mask, has_colored)
+        self.chunks.move_to_end(key)
+        while len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+        return surface
+
+    def draw(self, screen, view_rect, area=None):
+        """
+        Blit the chunks overlapping view_rect (world coordinates) onto screen.
+        Pass area (world coordinates, inside view_rect) to only blit the chunks under it.
+        """
+        size = self.chunk_size
+        area = area or view_rect
+        max_x = (self.tilemap.width - 1) // self.chunk_tiles
+        max_y = (self.tilemap.height - 1) // self.chunk_tiles
+        chunk_x0 = max(area.left // size, 0)
+        chunk_y0 = max(area.top // size, 0)
+        chunk_x1 = min((area.right - 1) // size, max_x)
+        chunk_y1 = min((area.bottom - 1) // size, max_y)
+        for chunk_y in range(chunk_y0, chunk_y1 + 1):
+            for chunk_x in range(chunk_x0, chunk_x1 + 1):
+                surface = self.get_chunk(chunk_x, chunk_y)
+                if surface is not None:
+                    screen.blit(surface, (chunk_x * size - view_rect.x, chunk_y * size - view_rect.y))
+
+
+class Camera:
+    """Camera that follows the player."""
+    def __init__(self, width, height):
+        self.camera = pygame.Rect(0, 0, width, height)
+        self.width = width
+        self.height = height
+
+    def apply(self, entity):
+        """Apply camera offset to an entity's rect."""
+        return entity.rect.move(-self.camera.x, -self.camera.y)
+
+    def update(self, target):
+        """Update camera to follow target (player)."""
+        # Center camera on target
+        x = target.rect.centerx - self.width // 2
+        y = target.rect.centery - self.height // 2
+
+        # Clamp camera to level bounds (prevent black borders)
+        x = max(0, x)
+        y = max(0, y)
+
+        self.camera.x = x
+        self.camera.y = y
+
+
+class DrawOrder(pygame.sprite.Group):
+    """
+    A sprite group that keeps its sprites in draw order: by layer, then by rect.y,
+    then by the order they were added. The layer is read once, when a sprite is
+    added, from its class's _layer. Each frame resort() only repositions the
+    sprites that can move and whose rect.y actually changed, with a bisect insert.
+    """
+
+    def __init__(self, *sprites):
+        self.order = []  # Sprites in draw order
+        self.keys = []  # (layer, y, sequence) parallel to order
+        self.sort_keys = {}  # sprite -> its key in keys
+        self.movers = {}  # Sprites that can move (insertion ordered)
+        self.sequence = 0
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite)
+        key = (getattr(sprite, '_layer', DEFAULT_LAYER), sprite.rect.y, self.sequence)
+        self.sequence += 1
+        index = bisect_right(self.keys, key)
+        self.keys.insert(index, key)
+        self.order.insert(index, sprite)
+        self.sort_keys[sprite] = key
+        if isinstance(sprite, MOVING_SPRITES):
+            self.movers[sprite] = None
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        index = bisect_left(self.keys, self.sort_keys.pop(sprite))
+        del self.keys[index]
+        del self.order[index]
+        self.movers.pop(sprite, None)
+
+    def resort(self, sprites=None):
+        """
+        Move the sprites whose rect.y changed since the last call to their new place.
+        Pass the sprites about to be drawn to leave off-screen movers for later.
+        """
+        keys = self.keys
+        order = self.order
+        sort_keys = self.sort_keys
+        movers = self.movers
+        for sprite in (movers if sprites is None else sprites):
+            if sprite not in movers:
+                continue
+            key = sort_keys[sprite]
+            y = sprite.rect.y
+            if y == key[1]:
+                continue
+            index = bisect_left(keys, key)
+            del keys[index]
+            del order[index]
+            key = (key[0], y, key[2])
+            index = bisect_right(keys, key)
+            keys.insert(index, key)
+            order.insert(index, sprite)
+            sort_keys[sprite] = key
+
+    def in_order(self, sprites):
+        """Return sprites (a subset of this group) in draw order."""
+        if len(sprites) * 8 >= len(self.order):
+            # Most of the group is wanted: walking the maintained order beats sorting
+            wanted = set(sprites)
+            return [sprite for sprite in self.order if sprite in wanted]
+        return sorted(sprites, key=self.sort_keys.__getitem__)
+
+
+def visible_sprites(world, view_rect):
+    """
+    Return the dynamic sprites that overlap view_rect (world coordinates).
+    Every dynamic sprite except the player lives in the level's spatial hash,
+    so this costs the cells under the view, not the size of the level.
+    """
+    dynamic_sprites = world.dynamic_sprites
+    sprites = [sprite for sprite in world.spatial.query(view_rect) if sprite in dynamic_sprites]
+    player = world.player
+    if player is not None and player in dynamic_sprites and view_rect.colliderect(player.rect):
+        sprites.append(player)
+    return sprites
+
+
+def sprites_to_draw(world, view_rect):
+    """The sprites overlapping view_rect, by layer then Y position."""
+    draw_order = world.dynamic_sprites
+    sprites = visible_sprites(world, view_rect)
+    draw_order.resort(sprites)
+    return draw_order.in_order(sprites)
+
+
+def draw_world(screen, world, camera, profiler=None):
+    """Draw the world's static layer and sprites as seen through camera (HUD not included)."""
+    screen.fill(BACKGROUND_COLOR)
+    view = camera.camera
+
+    # Static walls, endpoints and decorations come pre-baked in chunks
+    world.static_layer.draw(screen, view)
+    if profiler:
+        profiler.mark('static')
+
+    # Only sprites on screen, by layer then Y position
+    sprites = sprites_to_draw(world, view)
+    if profiler:
+        profiler.mark('cull')
+
+    # One blits() call with plain offset tuples instead of a Rect per sprite
+    offset_x, offset_y = view.x, view.y
+    screen.blits([(sprite.image, (sprite.rect.x - offset_x, sprite.rect.y - offset_y)) for sprite in sprites],
+                 doreturn=False)
+    if profiler:
+        profiler.mark('blit')
+
+
+def merge_rects(rects):
+    """Union overlapping rects so no area is redrawn twice."""
+    merged = []
+    for rect in rects:
+        rect = rect.copy()
+        index = rect.collidelist(merged)
+        while index >= 0:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+class DirtyRenderer:
+    """
+    Draws a frame by repainting only the screen areas that changed since the last one.
+
+    A sprite area is dirty when the sprite appeared, disappeared, moved, or got a
+    different image object. Spikes flipping, doors opening and mask swaps all
+    replace the image. Overlays (HUD, profiler) are dirty when their surface or
+    position changes, and are re-blitted wherever something under them was
+    repainted. Scrolling, a mask change (which re-bakes the static layer) or a
+    new level falls back to a full redraw.
+    """
+
+    def __init__(self, full_redraw_fraction=0.5):
+        self.full_redraw_fraction = full_redraw_fraction  # Dirty share of the screen that triggers a full redraw
+        self.drawn = {}  # sprite -> (image, screen rect) as of the last frame
+        self.drawn_overlays = []  # (surface, screen rect) as of the last frame
+        self.view = None
+        self.static_layer = None
+        self.mask = None
+
+    def invalidate(self):
+        """Force a full redraw on the next frame."""
+        self.view = None
+
+    def draw(self, screen, world, camera, overlays=(), profiler=None):
+        """
+        Draw the world plus overlays, a list of (surface, position) drawn on top.
+        Returns the rects to pass to pygame.display.update(), or None after a full
+        redraw, when the whole screen has to be flipped.
+        """
+        view = camera.camera
+        static_layer = world.static_layer
+        offset_x, offset_y = view.x, view.y
+        sprites = sprites_to_draw(world, view)
+        entries = [(sprite, sprite.image, pygame.Rect(sprite.rect.x - offset_x, sprite.rect.y - offset_y,
+                                                      sprite.rect.width, sprite.rect.height))
+                   for sprite in sprites]
+        overlays = [(surface, surface.get_rect(topleft=position)) for surface, position in overlays]
+        if profiler:
+            profiler.mark('cull')
+
+        full = (self.view != view.topleft or self.static_layer is not static_layer
+                or self.mask != static_layer.mask)
+        dirty = []
+        if not full:
+            drawn = self.drawn
+            for sprite, image, rect in entries:
+                previous = drawn.pop(sprite, None)
+                if previous is None:
+                    dirty.append(rect)
+                elif previous[0] is not image or previous[1] != rect:
+                    dirty.append(previous[1])
+                    dirty.append(rect)
+            dirty.extend(rect for _, rect in drawn.values())  # No longer drawn
+            if len(overlays) != len(self.drawn_overlays) or any(
+                    surface is not old_surface or rect != old_rect
+                    for (surface, rect), (old_surface, old_rect) in zip(overlays, self.drawn_overlays)):
+                dirty.extend(rect for _, rect in self.drawn_overlays)
+                dirty.extend(rect for _, rect in overlays)
+            screen_rect = screen.get_rect()
+            dirty = merge_rects(rect.clip(screen_rect) for rect in dirty if rect.colliderect(screen_rect))
+            area = sum(rect.width * rect.height for rect in dirty)
+            full = area > self.full_redraw_fraction * screen_rect.width * screen_rect.height
+
+        self.drawn = {sprite: (image, rect) for sprite, image, rect in entries}
+        self.drawn_overlays = overlays
+        self.view = view.topleft
+        self.static_layer = static_layer
+        self.mask = static_layer.mask
+
+        if full:
+            screen.fill(BACKGROUND_COLOR)
+            static_layer.draw(screen, view)
+            screen.blits([(image, rect) for _, image, rect in entries], doreturn=False)
+            screen.blits(overlays, doreturn=False)
+            if profiler:
+                profiler.mark('blit')
+            return None
+
+        for area in dirty:
+            screen.set_clip(area)
+            screen.fill(BACKGROUND_COLOR, area)
+            static_layer.draw(screen, view, area.move(offset_x, offset_y))
+            screen.blits([(image, rect) for _, image, rect in entries if rect.colliderect(area)], doreturn=False)
+            screen.blits([overlay for overlay in overlays if overlay[1].colliderect(area)], doreturn=False)
+        screen.set_clip(None)
+        if profiler:
+            profiler.mark('blit')
+        return dirty
@@ -0,0 +1,141 @@
+"""Deterministic input recording and replay.
+
+A run is reproducible when it uses a fixed timestep, a seeded World (which
+seeds the loader and the sound manager), the same simulation mode (streaming,
+horde) and the same per-frame inputs. The recorder stores one byte of input per
+frame after a small header that holds the seed and mode. A replay feeds those
+bytes back into a fresh World built from the header, as fast as it can be stepped.
+
+Frame byte: bits 0-3 = left, right, up, down held
+            bits 4-6 = mask press (0 none, 1 red, 2 green, 3 blue, 4 unequip)
+            bit 7    = reload press
+"""
+import struct
+
+from .world import World, Inputs
+
+MAGIC = b'MZRP'
+VERSION = 2
+DEFAULT_FPS = 60
+
+# magic, version, fps, start level, seed, frame count, final state digest, mode flags
+_HEADER = struct.Struct('<4sHHHQI16sH')
+
+# Mode flags: World options that change the simulation
+FLAG_STREAMING = 1
+FLAG_HORDE = 2
+
+MASK_CODES = {'red': 1, 'green': 2, 'blue': 3}
+MASK_BY_CODE = {code: color for color, code in MASK_CODES.items()}
+UNEQUIP_CODE = 4
+
+
+def encode_flags(streaming=False, horde=False):
+    return (streaming and FLAG_STREAMING) | (horde and FLAG_HORDE)
+
+
+def encode_inputs(inputs):
+    """Pack one frame of Inputs into a byte value."""
+    value = (inputs.left and 1) | (inputs.right and 2) | (inputs.up and 4) | (inputs.down and 8)
+    if inputs.equip in MASK_CODES:
+        value |= MASK_CODES[inputs.equip] << 4
+    elif inputs.unequip:
+        value |= UNEQUIP_CODE << 4
+    if inputs.reload:
+        value |= 0x80
+    return value
+
+
+def decode_inputs(value):
+    """Unpack a frame byte into Inputs."""
+    mask_code = (value >> 4) & 0x7
+    return Inputs(left=bool(value & 1), right=bool(value & 2), up=bool(value & 4), down=bool(value & 8),
+                  equip=MASK_BY_CODE.get(mask_code), unequip=mask_code == UNEQUIP_CODE,
+                  reload=bool(value & 0x80))
+
+
+class InputRecorder:
+    """Streams per-frame inputs to a replay file."""
+
+    def __init__(self, path, seed, start_level=0, fps=DEFAULT_FPS, streaming=False, horde=False):
+        self.path = path
+        self.seed = seed
+        self.start_level = start_level
+        self.fps = fps
+        self.flags = encode_flags(streaming, horde)
+        self.frames = 0
+        self.file = open(path, 'wb')
+        self.file.write(_HEADER.pack(MAGIC, VERSION, fps, start_level, seed, 0, b'\0' * 16, self.flags))
+
+    def record(self, inputs):
+        self.file.write(bytes((encode_inputs(inputs),)))
+        self.frames += 1
+
+    def close(self, final_digest=''):
+        """Finish the file, storing the frame count and the final World.state_digest() for verification."""
+        if self.file.closed:
+            return
+        self.file.seek(0)
+        self.file.write(_HEADER.pack(MAGIC, VERSION, self.fps, self.start_level, self.seed, self.frames,
+                                     final_digest.encode('ascii')[:16].ljust(16, b'\0'), self.flags))
+        self.file.close()
+
+
+class Replay:
+    """A loaded replay file."""
+
+    def __init__(self, fps, start_level, seed, frames, final_digest, flags=0):
+        self.fps = fps
+        self.start_level = start_level
+        self.seed = seed
+        self.frames = frames  # bytes, one per frame
+        self.final_digest = final_digest
+        self.streaming = bool(flags & FLAG_STREAMING)
+        self.horde = bool(flags & FLAG_HORDE)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < _HEADER.size:
+            raise ValueError(f"{path} is not a replay file")
+        magic, version, fps, start_level, seed, frame_count, digest, flags = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a replay file of this version")
+        frames = data[_HEADER.size:]
+        if frame_count:
+            frames = frames[:frame_count]  # A run that crashed mid-recording has no count; keep what is there
+        return cls(fps, start_level, seed, frames, digest.rstrip(b'\0').decode('ascii'), flags)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def world_args(self):
+        """The World arguments that reproduce the recorded run."""
+        return {'start_level': self.start_level, 'seed': self.seed, 'streaming': self.streaming, 'horde': self.horde}
+
+    def inputs(self):
+        """Yield the Inputs for every recorded frame."""
+        for value in self.frames:
+            yield decode_inputs(value)
+
+
+def play_replay(replay, world=None, on_frame=None, **world_args):
+    """
+    Step a World through every frame of a replay with a fixed timestep, at full speed.
+    Without a world, one is built from the replay's header (plus world_args).
+    on_frame(world) is called after each step. Returns the World.
+    """
+    if world is None:
+        world = World(**{**replay.world_args(), **world_args})
+    dt = 1.0 / replay.fps
+    profiler = world.profiler
+    for inputs in replay.inputs():
+        if not world.running:
+            break
+        profiler.begin_frame()
+        world.step(inputs, dt)
+        profiler.end_frame()
+        if on_frame:
+            on_frame(world)
+    return world
@@ -0,0 +1,95 @@
+"""Uniform-grid spatial hash for entities that move or can be picked up.
+
+Sprites are bucketed by the grid cells their rect overlaps. Callers re-bucket a
+sprite with move() after changing its rect, and ask "what overlaps this rect"
+with query(), so lookups cost only the entities in nearby cells instead of the
+whole level.
+"""
+
+
+class SpatialHash:
+    """Buckets sprites into square cells keyed by (cell_x, cell_y)."""
+
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}  # (cell_x, cell_y) -> dict of sprites (insertion ordered)
+        self.sprite_cells = {}  # sprite -> (cx0, cy0, cx1, cy1) it is bucketed in
+
+    def __len__(self):
+        return len(self.sprite_cells)
+
+    def __contains__(self, sprite):
+        return sprite in self.sprite_cells
+
+    def _cell_range(self, rect):
+        """Return the inclusive range of cells covered by rect."""
+        size = self.cell_size
+        return (rect.left // size, rect.top // size,
+                (rect.right - 1) // size, (rect.bottom - 1) // size)
+
+    def _insert(self, sprite, cell_range):
+        cx0, cy0, cx1, cy1 = cell_range
+        cells = self.cells
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is None:
+                    bucket = cells[(cx, cy)] = {}
+                bucket[sprite] = None
+        self.sprite_cells[sprite] = cell_range
+
+    def _evict(self, sprite, cell_range):
+        cx0, cy0, cx1, cy1 = cell_range
+        cells = self.cells
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is not None:
+                    bucket.pop(sprite, None)
+                    if not bucket:
+                        del cells[(cx, cy)]
+
+    def add(self, *sprites):
+        """Insert sprites using their current rect."""
+        for sprite in sprites:
+            if sprite in self.sprite_cells:
+                self.move(sprite)
+            else:
+                self._insert(sprite, self._cell_range(sprite.rect))
+
+    def remove(self, *sprites):
+        """Remove sprites from the hash (ignores sprites that are not in it)."""
+        for sprite in sprites:
+            cell_range = self.sprite_cells.pop(sprite, None)
+            if cell_range is not None:
+                self._evict(sprite, cell_range)
+
+    def move(self, sprite):
+        """Re-bucket a sprite after its rect changed. Cheap when it stays in the same cells."""
+        old_range = self.sprite_cells.get(sprite)
+        if old_range is None:
+            return
+        new_range = self._cell_range(sprite.rect)
+        if new_range != old_range:
+            self._evict(sprite, old_range)
+            self._insert(sprite, new_range)
+
+    def query(self, rect, kind=None):
+        """
+        Return sprites whose rect overlaps rect, in insertion order.
+        Optionally only those that are instances of kind (a class or tuple of classes).
+        """
+        cx0, cy0, cx1, cy1 = self._cell_range(rect)
+        cells = self.cells
+        found = {}
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    found.update(bucket)
+        return [sprite for sprite in found
+                if (kind is None or isinstance(sprite, kind)) and rect.colliderect(sprite.rect)]
+
+    def clear(self):
+        self.cells.clear()
+        self.sprite_cells.clear()
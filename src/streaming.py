@@ -0,0 +1,188 @@
+"""Chunk streaming of level entities.
+
+In streaming mode the loader creates almost no sprites up front. Walls,
+endpoints and decorations exist only in the TileMap and the StaticLayer.
+Everything else is kept as a small EntityRecord, filed under the chunk it
+sits in. Every step the World passes in the area the camera shows around the
+player. Chunks within a margin of that area get their sprites created. Sprites
+that end up more than one chunk further out are retired back into records.
+
+A record remembers what its sprite changed: where a box or ghost was left,
+whether a door is open or unlocked, whether a plate is held down, where a
+spike is in its cycle, and whether a key, mask or ghost is gone. A chunk that
+comes back looks exactly as it was left. Retired entities are not simulated,
+except that spikes keep their phase against the level clock (time), so they
+come back in step with the spikes that stayed loaded.
+
+Eager levels keep records too, one per entity with its sprite attached, so
+World.state_digest can read both modes the same way.
+"""
+from .entities import Box, Door, Enemy, PressPlate, Spike
+from .registry import parse_id_token
+from .render import CHUNK_TILES
+
+STREAM_MARGIN = 1  # Chunks beyond the view whose entities are live
+
+
+
+class EntityRecord:
+    """Persistent state of one streamed entity, live or not."""
+
+    __slots__ = ('token', 'x', 'y', 'home', 'sprite', 'removed', 'door_open', 'unlocked', 'pressed', 'phase')
+
+    def __init__(self, token, x, y, home):
+        self.token = token
+        self.x = x
+        self.y = y
+        self.home = home  # Chunk whose record list holds this record
+        self.sprite = None  # The live sprite, or None while retired
+        self.removed = False  # Picked up or killed: never spawned again
+        self.door_open = token.endswith('o')
+        self.unlocked = False  # Opened by its key: no longer solid at all
+        self.pressed = False
+        self.phase = 0.0  # Spike time minus the level clock
+
+    def capture(self, level, clock=0.0):
+        """Copy the live sprite's state into the record."""
+        sprite = self.sprite
+        if isinstance(sprite, (Box, Enemy)):
+            self.x, self.y = sprite.pos.x, sprite.pos.y
+        elif isinstance(sprite, Door):
+            self.door_open = sprite.is_open
+            self.unlocked = sprite not in level['dynamic_solids']
+        elif isinstance(sprite, PressPlate):
+            self.pressed = sprite.is_pressed
+        elif isinstance(sprite, Spike):
+            self.phase = sprite.time - clock
+
+    def is_gone(self):
+        return self.removed or (self.sprite is not None and not self.sprite.alive())
+
+
+class EntityStreamer:
+    """Creates and retires the sprites of a level's entities by chunk."""
+
+    def __init__(self, level, entities, spawn, tile_size, chunk_tiles=CHUNK_TILES, margin=STREAM_MARGIN):
+        self.level = level
+        self.spawn = spawn  # spawn(token, x, y) -> sprite added to the level's groups, or None
+        self.chunk_size = chunk_tiles * tile_size
+        self.margin = margin
+        self.chunks = {}  # (chunk_x, chunk_y) -> records homed in that chunk
+        self.live = []  # Records that currently have a sprite
+        self.active = set()  # Chunks whose records have been spawned
+        self.doors = {}  # Door ID -> records of the doors with that ID
+        self.records = []  # Every record, in entity table order
+        self.time = 0.0  # Level clock, advanced by the World as spikes are
+        for token, col, row in entities:
+            x, y = col * tile_size, row * tile_size
+            home = self.chunk_of(x, y)
+            record = EntityRecord(token, x, y, home)
+            self.records.append(record)
+            self.chunks.setdefault(home, []).append(record)
+            parsed = parse_id_token(token)
+            if parsed is not None and parsed[0] == 'door':
+                self.doors.setdefault(parsed[1], []).append(record)
+
+    def __len__(self):
+        return sum(len(records) for records in self.chunks.values())
+
+    def chunk_of(self, x, y):
+        size = self.chunk_size
+        return int(x) // size, int(y) // size
+
+    def _chunk_range(self, view_rect, margin):
+        size = self.chunk_size
+        return (view_rect.left // size - margin, view_rect.top // size - margin,
+                (view_rect.right - 1) // size + margin, (view_rect.bottom - 1) // size + margin)
+
+    def update(self, view_rect):
+        """
+        Spawn the entities of chunks near view_rect (world coordinates) and retire
+        the ones that drifted out of range. Returns True if any sprite came or went.
+        """
+        changed = False
+        keep_x0, keep_y0, keep_x1, keep_y1 = self._chunk_range(view_rect, self.margin + 1)
+
+        still_live = []
+        for record in self.live:
+            sprite = record.sprite
+            if not sprite.alive():
+                # Picked up, or killed by the game
+                record.sprite = None
+                record.removed = True
+                self.chunks[record.home].remove(record)
+                changed = True
+                continue
+            chunk = self.chunk_of(sprite.rect.x, sprite.rect.y)
+            if keep_x0 <= chunk[0] <= keep_x1 and keep_y0 <= chunk[1] <= keep_y1:
+                still_live.append(record)
+            else:
+                self._retire(record, chunk)
+                changed = True
+        self.live = still_live
+        self.active = {chunk for chunk in self.active
+                       if keep_x0 <= chunk[0] <= keep_x1 and keep_y0 <= chunk[1] <= keep_y1}
+
+        chunk_x0, chunk_y0, chunk_x1, chunk_y1 = self._chunk_range(view_rect, self.margin)
+        for chunk_y in range(chunk_y0, chunk_y1 + 1):
+            for chunk_x in range(chunk_x0, chunk_x1 + 1):
+                chunk = (chunk_x, chunk_y)
+                if chunk in self.active:
+                    continue
+                self.active.add(chunk)
+                for record in self.chunks.get(chunk, ()):
+                    if record.sprite is None:
+                        changed = self._spawn(record) or changed
+        return changed
+
+    def _spawn(self, record):
+        sprite = self.spawn(record.token, record.x, record.y)
+        if sprite is None:
+            return False
+        level = self.level
+        if isinstance(sprite, Door):
+            if record.door_open and not sprite.is_open:
+                sprite.open_door()
+            elif not record.door_open and sprite.is_open:
+                sprite.close_door()
+            if record.unlocked:
+                level['solid_sprites'].remove(sprite)
+                level['dynamic_solids'].remove(sprite)
+        elif isinstance(sprite, PressPlate):
+            sprite.is_pressed = record.pressed
+        elif isinstance(sprite, Spike):
+            sprite.time = record.phase + self.time
+            sprite.update(0)
+        level['dynamic_sprites'].add(sprite)
+        record.sprite = sprite
+        self.live.append(record)
+        return True
+
+    def _retire(self, record, chunk):
+        """Store the sprite's state in its record, drop the sprite and re-file the record under chunk."""
+        sprite = record.sprite
+        record.capture(self.level, self.time)
+        if sprite in self.level['spatial']:
+            self.level['spatial'].remove(sprite)
+        sprite.kill()
+        record.sprite = None
+        if chunk != record.home:
+            self.chunks[record.home].remove(record)
+            self.chunks.setdefault(chunk, []).append(record)
+            record.home = chunk
+
+    def advance(self, dt):
+        self.time += dt
+
+    def toggle_doors(self, door_id):
+        """A plate toggled door_id: flip the retired doors too, since they are not linked to it."""
+        for record in self.doors.get(door_id, ()):
+            if record.sprite is None:
+                record.door_open = not record.door_open
+
+    def unlock_doors(self, door_id):
+        """The key for door_id was picked up: open the retired doors for good."""
+        for record in self.doors.get(door_id, ()):
+            if record.sprite is None:
+                record.door_open = True
+                record.unlocked = True
@@ -0,0 +1,152 @@
+"""Compact tile grid for the static parts of a level.
+
+Walls never move, so instead of testing a mover against every wall sprite we
+keep a flat grid of tile IDs and look up only the tiles under the mover's rect.
+Each mask color gets its own solidity layer, built the first time that mask is
+worn; equipping a mask again just switches which layer is active.
+
+The grid may be a memory-mapped view (streaming mode). It is only ever read in
+SCAN_BLOCK sized slices, so it is never copied whole.
+"""
+
+# Tile IDs stored in the grid (one byte per tile)
+TILE_EMPTY = 0
+TILE_WALL = 1
+TILE_WALL_RED = 2
+TILE_WALL_GREEN = 3
+TILE_WALL_BLUE = 4
+TILE_WALL_YELLOW = 5
+TILE_END = 6
+TILE_DECORATION = 7
+
+# CSV tokens that map straight onto a tile ID
+TILE_TOKENS = {
+    'w': TILE_WALL,
+    'wr': TILE_WALL_RED,
+    'wg': TILE_WALL_GREEN,
+    'wb': TILE_WALL_BLUE,
+    'wy': TILE_WALL_YELLOW,
+    'end': TILE_END,
+    'dec': TILE_DECORATION,
+}
+
+# Mask states a player can be in (None = no mask)
+MASK_COLORS = (None, 'red', 'green', 'blue')
+
+# Colored walls turn ghostly (passable) while the matching mask is worn
+MASK_WALLS = {
+    'red': TILE_WALL_RED,
+    'green': TILE_WALL_GREEN,
+    'blue': TILE_WALL_BLUE,
+}
+
+SOLID_TILES = (TILE_WALL, TILE_WALL_RED, TILE_WALL_GREEN, TILE_WALL_BLUE, TILE_WALL_YELLOW)
+
+SCAN_BLOCK = 1 << 16  # Tiles copied at a time when scanning or translating the grid
+
+
+def find_tiles(tiles, tile_id):
+    """Yield the index of every tile_id in the grid, scanning it block by block."""
+    needle = bytes((tile_id,))
+    for start in range(0, len(tiles), SCAN_BLOCK):
+        block = bytes(tiles[start:start + SCAN_BLOCK])
+        index = block.find(needle)
+        while index >= 0:
+            yield start + index
+            index = block.find(needle, index + 1)
+
+
+def _solidity_table(mask):
+    """Build a 256-byte translation table: tile ID -> 1 if solid under mask."""
+    table = bytearray(256)
+    for tile_id in SOLID_TILES:
+        table[tile_id] = 1
+    if mask in MASK_WALLS:
+        table[MASK_WALLS[mask]] = 0
+    return bytes(table)
+
+
+class TileMap:
+    """Grid of tile IDs with a lazily built solidity layer per mask color."""
+
+    def __init__(self, width, height, tile_size, tiles=None):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.tiles = tiles if tiles is not None else bytearray(width * height)
+        self.layers = {}
+        self.mask = None
+        self.solid = None
+        self.build_layers()
+
+    @classmethod
+    def from_rows(cls, rows, tile_size):
+        """Create a tilemap from a list of per-row tile ID sequences (rows may differ in length)."""
+        width = max((len(row) for row in rows), default=0)
+        height = len(rows)
+        tiles = bytearray(width * height)
+        for row_idx, row in enumerate(rows):
+            start = row_idx * width
+            tiles[start:start + len(row)] = row
+        return cls(width, height, tile_size, tiles)
+
+    def build_layers(self):
+        """Drop the cached solidity layers (after the tiles changed) and rebuild the active one."""
+        self.layers = {}
+        self.solid = self.layer(self.mask)
+
+    def layer(self, mask):
+        """The solidity layer for mask (1 = solid), built on first use."""
+        if mask not in MASK_WALLS:
+            mask = None
+        layer = self.layers.get(mask)
+        if layer is None:
+            table = _solidity_table(mask)
+            tiles = self.tiles
+            layer = bytearray(len(tiles))
+            for start in range(0, len(tiles), SCAN_BLOCK):
+                layer[start:start + SCAN_BLOCK] = bytes(tiles[start:start + SCAN_BLOCK]).translate(table)
+            self.layers[mask] = layer
+        return layer
+
+    def set_mask(self, color):
+        """Switch the active solidity layer to match the player's mask."""
+        if color == self.mask:
+            return
+        self.mask = color
+        self.solid = self.layer(color)
+
+    def get_tile(self, col, row):
+        """Return the tile ID at (col, row), or TILE_EMPTY outside the map."""
+        if 0 <= col < self.width and 0 <= row < self.height:
+            return self.tiles[row * self.width + col]
+        return TILE_EMPTY
+
+    def is_solid(self, col, row):
+        """Check the active layer. Tiles outside the map are never solid."""
+        if 0 <= col < self.width and 0 <= row < self.height:
+            return self.solid[row * self.width + col] == 1
+        return False
+
+    def tile_range(self, rect):
+        """Return (col0, row0, col1, row1) of tiles overlapped by rect, clamped to the map."""
+        ts = self.tile_size
+        col0 = max(rect.left // ts, 0)
+        row0 = max(rect.top // ts, 0)
+        col1 = min((rect.right - 1) // ts, self.width - 1)
+        row1 = min((rect.bottom - 1) // ts, self.height - 1)
+        return col0, row0, col1, row1
+
+    def collides(self, rect):
+        """Check whether rect overlaps any solid tile in the active layer."""
+        if rect.width <= 0 or rect.height <= 0:
+            return False
+        col0, row0, col1, row1 = self.tile_range(rect)
+        solid = self.solid
+        width = self.width
+        for row in range(row0, row1 + 1):
+            start = row * width
+            for index in range(start + col0, start + col1 + 1):
+                if solid[index]:
+                    return True
+        return False
@@ -0,0 +1,174 @@
+"""Trigger zones: enter/stay/exit events for things that react to being stood on.
+
+Plates, keys, spikes and endpoints register a zone once, over the tiles their
+rect covers. Movers (the player, boxes) register as occupants. After a mover
+moves, the World calls move(mover). If the set of tiles under the mover is
+unchanged, that is one tuple comparison. Otherwise the zones on the tiles it
+left and the tiles it reached are compared. The per-frame cost therefore
+follows the movers, not the number of triggers.
+
+Zones report by state, not per occupant:
+  - on_enter(zone, occupant): the zone went from empty to occupied;
+  - on_stay(zone, occupant): an occupant moved or arrived while the zone stayed occupied;
+  - on_exit(zone, occupant): the last occupant left.
+A zone with debounce=N stays occupied for N frames after it empties. It only
+fires on_exit if nothing came back in that time, so a box or player wobbling
+on its edge does not flicker it. tick() counts those frames down, once per step.
+
+Zones are tile based. An occupant's footprint is the tiles its rect overlaps,
+which matches rect overlap exactly for tile-sized zones.
+"""
+
+
+class TriggerZone:
+    """Tiles that fire callbacks as occupants of the given kinds come and go."""
+
+    def __init__(self, owner, tiles, kinds, on_enter=None, on_stay=None, on_exit=None, debounce=0):
+        self.owner = owner  # The sprite the zone belongs to
+        self.tiles = tiles  # (col0, row0, col1, row1), inclusive
+        self.kinds = kinds  # Class or tuple of classes whose instances count as occupants
+        self.on_enter = on_enter
+        self.on_stay = on_stay
+        self.on_exit = on_exit
+        self.debounce = debounce  # Frames the zone must stay empty before on_exit fires
+        self.occupants = set()  # Occupants on the zone's tiles right now
+        self.occupied = False  # Debounced state: True from on_enter until on_exit
+
+
+class TriggerSystem:
+    """Tile index of trigger zones plus the footprints of the movers that can set them off."""
+
+    def __init__(self, tile_size):
+        self.tile_size = tile_size
+        self.zones = {}  # Owner -> TriggerZone
+        self.tile_zones = {}  # (col, row) -> zones covering that tile
+        self.footprints = {}  # Occupant -> (col0, row0, col1, row1) it was last seen on
+        self.releasing = {}  # Zone -> frames left before its debounced on_exit
+
+    def __len__(self):
+        return len(self.zones)
+
+    def __contains__(self, owner):
+        return owner in self.zones
+
+    def footprint(self, rect):
+        size = self.tile_size
+        return rect.left // size, rect.top // size, (rect.right - 1) // size, (rect.bottom - 1) // size
+
+    def _zones_on(self, tiles, occupant):
+        col0, row0, col1, row1 = tiles
+        found = {}  # Ordered, so callbacks fire in registration order
+        tile_zones = self.tile_zones
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                for zone in tile_zones.get((col, row), ()):
+                    if isinstance(occupant, zone.kinds):
+                        found[zone] = None
+        return found
+
+    def add_zone(self, owner, rect, kinds, on_enter=None, on_stay=None, on_exit=None, debounce=0):
+        """Register a zone over the tiles under rect. Occupants already there enter it right away."""
+        self.remove_zone(owner)
+        tiles = self.footprint(rect)
+        zone = self.zones[owner] = TriggerZone(owner, tiles, kinds, on_enter, on_stay, on_exit, debounce)
+        col0, row0, col1, row1 = tiles
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                self.tile_zones.setdefault((col, row), []).append(zone)
+        for occupant, footprint in self.footprints.items():
+            if isinstance(occupant, kinds) and zone in self._zones_on(footprint, occupant):
+                self._enter(zone, occupant)
+        return zone
+
+    def remove_zone(self, owner):
+        """Forget owner's zone, without firing any callback."""
+        zone = self.zones.pop(owner, None)
+        if zone is None:
+            return
+        col0, row0, col1, row1 = zone.tiles
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                zones = self.tile_zones[(col, row)]
+                zones.remove(zone)
+                if not zones:
+                    del self.tile_zones[(col, row)]
+        self.releasing.pop(zone, None)
+
+    def zone(self, owner):
+        return self.zones.get(owner)
+
+    def add_occupant(self, occupant):
+        """Start tracking a mover, entering the zones it already stands in."""
+        if occupant in self.footprints:
+            self.move(occupant)
+            return
+        footprint = self.footprints[occupant] = self.footprint(occupant.rect)
+        for zone in self._zones_on(footprint, occupant):
+            self._enter(zone, occupant)
+
+    def remove_occupant(self, occupant):
+        """Stop tracking a mover (retired or killed); it leaves every zone it was in."""
+        footprint = self.footprints.pop(occupant, None)
+        if footprint is not None:
+            for zone in self._zones_on(footprint, occupant):
+                self._leave(zone, occupant)
+
+    def move(self, occupant):
+        """Re-check a mover after its rect changed. Costs a comparison while it stays on the same tiles."""
+        old = self.footprints.get(occupant)
+        if old is None:
+            return
+        new = self.footprint(occupant.rect)
+        if new == old:
+            return
+        self.footprints[occupant] = new
+        old_zones = self._zones_on(old, occupant)
+        new_zones = self._zones_on(new, occupant)
+        for zone in old_zones:
+            if zone not in new_zones:
+                self._leave(zone, occupant)
+        for zone in new_zones:
+            if zone in old_zones:
+                if zone.on_stay:
+                    zone.on_stay(zone, occupant)
+            else:
+                self._enter(zone, occupant)
+
+    def _enter(self, zone, occupant):
+        zone.occupants.add(occupant)
+        if zone.occupied:
+            # Already occupied (or still releasing): nothing new as far as the zone is concerned
+            self.releasing.pop(zone, None)
+            if zone.on_stay:
+                zone.on_stay(zone, occupant)
+            return
+        zone.occupied = True
+        if zone.on_enter:
+            zone.on_enter(zone, occupant)
+
+    def _leave(self, zone, occupant):
+        zone.occupants.discard(occupant)
+        if zone.occupants:
+            return
+        if zone.debounce:
+            self.releasing[zone] = (zone.debounce, occupant)
+            return
+        zone.occupied = False
+        if zone.on_exit:
+            zone.on_exit(zone, occupant)
+
+    def tick(self):
+        """Advance debounced releases by one frame, firing on_exit for zones that stayed empty."""
+        if not self.releasing:
+            return
+        released = []
+        for zone, (frames, occupant) in list(self.releasing.items()):
+            if frames > 1:
+                self.releasing[zone] = (frames - 1, occupant)
+            else:
+                del self.releasing[zone]
+                released.append((zone, occupant))
+        for zone, occupant in released:
+            zone.occupied = False
+            if zone.on_exit:
+                zone.on_exit(zone, occupant)
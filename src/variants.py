@@ -0,0 +1,55 @@
+"""Process-wide cache of sprite variants.
+
+A variant is a base surface drawn mirrored and/or with a surface alpha: a
+character facing left, an open door, the ghosted colored-wall tiles that
+StaticLayer bakes. Variants are made the first time they are asked for and
+then shared by every sprite and every level load. Changing state is then a reference swap instead of a copy. Base surfaces
+and variants must never be modified in place.
+
+The base surface itself is the cache key, so a variant lives exactly as long
+as its entry (and keeps its base alive). Bases come from the texture cache,
+so the number of entries stays bounded by the number of assets.
+"""
+import pygame
+
+# (base surface, flip_x, alpha) -> Surface
+_variant_cache = {}
+
+
+def _make_variant(base, flip_x, alpha):
+    surface = pygame.transform.flip(base, True, False) if flip_x else base.copy()
+    if alpha is not None:
+        surface.set_alpha(alpha)
+    return surface
+
+
+def get_variant(base, flip_x=False, alpha=None):
+    """
+    Return base mirrored horizontally (flip_x) and/or with a surface alpha, building it once.
+    With no change requested, base itself is returned.
+    """
+    if not flip_x and alpha is None:
+        return base
+    key = (base, flip_x, alpha)
+    surface = _variant_cache.get(key)
+    if surface is None:
+        surface = _variant_cache[key] = _make_variant(base, flip_x, alpha)
+    return surface
+
+
+def clear_variant_cache(base=None):
+    """Drop every cached variant, or only the variants of one base surface."""
+    if base is None:
+        _variant_cache.clear()
+        return
+    for key in [key for key in _variant_cache if key[0] is base]:
+        del _variant_cache[key]
+
+
+def variant_cache_size():
+    """Return (number of cached variants, bytes of pixel data they hold)."""
+    size = 0
+    for surface in _variant_cache.values():
+        width, height = surface.get_size()
+        size += width * height * surface.get_bytesize()
+    return len(_variant_cache), size
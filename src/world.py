@@ -0,0 +1,509 @@
+"""Headless game simulation.
+
+World owns the current level's sprite groups and the level index, and advances
+the game with step(inputs, dt). It never draws and never reads the keyboard,
+so it runs under the SDL dummy video driver at whatever speed the caller
+steps it. main.py is a thin interactive front end over it.
+"""
+import hashlib
+import os
+import random
+import struct
+
+import pygame
+
+from .entities import Mask, Box, Door, Enemy, Player, Spike, Endpoint
+from .horde import Horde, HAVE_NUMPY
+from .loader import load_level
+from .pathfinding import FlowField
+from .preload import LevelPreloader
+from .profiler import FrameProfiler
+from .proximity import ProximityService
+from .push import PushSolver
+from .triggers import TriggerSystem
+
+TILE_SIZE = 32
+VIEW_SIZE = (1800, 960)  # Area around the player that streaming keeps live, matches the window
+LEVELS_DIR = os.path.join(os.path.dirname(__file__), '..', 'mazes')
+PLATE_DEBOUNCE_FRAMES = 15  # Frames a debounced plate ('p1d'..) stays down after it is left
+
+# Level list - order matters
+LEVELS = [
+    '_tutorial_0.csv',
+    '_tutorial_1.csv',
+    '_tutorial_2.csv',
+    '_wall_level_1.csv',
+    '_tutorial_spike_1.csv',
+    '_tutorial_spike_2.csv',
+    '_level_1.csv',
+    '_level_2.csv',
+    '_tutorial_ghost_0.csv',
+    '_tutorial_ghost.csv',
+    'tutorial_box.csv',
+    'maze_level_2.csv',
+    'maze_level_3.csv',
+    'maze_level_4.csv',
+    'maze_level_omri1.csv',
+    'maze_level_omri2.csv',
+    'ghost_boss.csv',
+    'you_win.csv'
+]
+
+# Level data keys that World exposes as attributes
+LEVEL_KEYS = ('player', 'all_sprites', 'solid_sprites', 'masks', 'endpoints',
+              'doors', 'keys', 'enemies', 'traps', 'presses', 'boxes', 'tilemap', 'dynamic_solids', 'spatial',
+              'static_layer', 'dynamic_sprites', 'streamer', 'registry', 'records')
+
+
+def init_headless():
+    """Set up pygame for a World without a window (dummy video driver, 1x1 display for surface conversion)."""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.display.init()
+    if pygame.display.get_surface() is None:
+        pygame.display.set_mode((1, 1))
+
+
+class Inputs:
+    """Player input for one step: held arrow directions plus one-shot mask/reload presses."""
+
+    def __init__(self, left=False, right=False, up=False, down=False, equip=None, unequip=False, reload=False):
+        self.left = left
+        self.right = right
+        self.up = up
+        self.down = down
+        self.equip = equip  # Mask color to put on this step, or None
+        self.unequip = unequip
+        self.reload = reload
+
+    @classmethod
+    def from_keys(cls, pressed, **presses):
+        """Build inputs from pygame.key.get_pressed() plus this frame's key presses."""
+        return cls(left=bool(pressed[pygame.K_LEFT]), right=bool(pressed[pygame.K_RIGHT]),
+                   up=bool(pressed[pygame.K_UP]), down=bool(pressed[pygame.K_DOWN]), **presses)
+
+
+def check_aabb_collision(rect1, rect2):
+    """Check if two rects overlap (AABB collision)."""
+    return rect1.colliderect(rect2)
+
+
+def collides_with_solid(rect, tilemap, solids, spatial, ignore=None):
+    """Check rect against the static tile grid, then against the dynamic solids near it."""
+    if tilemap.collides(rect):
+        return True
+    for solid in spatial.query(rect, (Box, Door)):
+        if solid is ignore or solid not in solids:
+            continue
+        if hasattr(solid, 'on_off') and not solid.on_off:
+            continue
+        if hasattr(solid, 'is_open') and solid.is_open:
+            continue  # Skip open doors
+        return True
+    return False
+
+
+def resolve_collision(player, tilemap, solids, spatial):
+    """
+    Resolve player collision with static walls (tilemap) and dynamic solids.
+    Player stops when hitting a solid sprite.
+    Handles X and Y collisions separately so player can slide along walls.
+    """
+    # Move on X axis and check collision
+    player.pos.x += player.velocity.x
+    player.rect.x = player.pos.x
+
+    if collides_with_solid(player.rect, tilemap, solids, spatial):
+        # Undo X movement
+        player.pos.x -= player.velocity.x
+        player.rect.x = player.pos.x
+        player.velocity.x = 0
+
+    # Move on Y axis and check collision
+    player.pos.y += player.velocity.y
+    player.rect.y = player.pos.y
+
+    if collides_with_solid(player.rect, tilemap, solids, spatial):
+        # Undo Y movement
+        player.pos.y -= player.velocity.y
+        player.rect.y = player.pos.y
+        player.velocity.y = 0
+
+
+class World:
+    """The game state for one play session: the level list, the current level and its sprites."""
+
+    def __init__(self, levels=None, levels_dir=LEVELS_DIR, tile_size=TILE_SIZE, sound_manager=None,
+                 start_level=0, preload=True, seed=None, profiler=None, streaming=False, view_size=VIEW_SIZE,
+                 horde=False):
+        self.seed = seed
+        self.profiler = profiler or FrameProfiler()  # Disabled unless the caller enables it
+        self.rng = random.Random(seed)  # Every random choice in the simulation goes through this
+        self.levels = list(levels) if levels is not None else list(LEVELS)
+        self.levels_dir = levels_dir
+        self.tile_size = tile_size
+        self.sound_manager = sound_manager
+        self.streaming = streaming  # Create entity sprites only near the player (see streaming)
+        self.view_size = view_size
+        if horde and not HAVE_NUMPY:
+            print("Warning: horde mode needs NumPy, simulating ghosts one by one")
+        self.horde_mode = horde and HAVE_NUMPY  # Step ghosts as NumPy arrays (see horde)
+        self.horde = None
+        # Chase state shared by the ghosts; the chase music follows its alerts
+        self.proximity = ProximityService()
+        if sound_manager:
+            self.proximity.add_alert_listener(sound_manager.on_chase_change)
+        self.preloader = LevelPreloader(tile_size, mapped=streaming) if preload else None
+        self.level_index = start_level
+        self.level = None
+        self.running = True  # False once the last level is beaten
+        self.frame = 0
+        self.enemy_collisions = 0
+        self.any_enemy_chasing = False
+        self.flow_field = None
+        self.push_solver = None
+        self.moved_boxes = []  # Boxes pushed this step
+        self.triggers = None
+        self.toggled_plates = {}  # Plate -> pressed state before this step's trigger events
+        self.picked_keys = []  # Keys the player reached this step
+        self.underfoot = set()  # Spikes and endpoints whose zone the player is in
+        for key in LEVEL_KEYS:
+            setattr(self, key, None)
+        self.load_level(start_level)
+
+    def level_path(self, index):
+        """Path of the level CSV at index in the level list (None past the end)."""
+        if index >= len(self.levels):
+            return None
+        return os.path.join(self.levels_dir, self.levels[index])
+
+    def play_sound(self, name):
+        if self.sound_manager:
+            self.sound_manager.play_sound(name)
+
+    def load_level(self, index):
+        """Load a level by its index in the level list, then start preparing the one after it."""
+        level_path = self.level_path(index)
+        if level_path is None:
+            return False
+
+        # Use the background-prepared layout and tile grid if there is one
+        prepared = self.preloader.take(level_path) if self.preloader else None
+        if prepared:
+            level_data = load_level(level_path, self.tile_size, layout=prepared[0], tilemap=prepared[1], rng=self.rng,
+                                    streaming=self.streaming)
+        else:
+            level_data = load_level(level_path, self.tile_size, rng=self.rng, streaming=self.streaming)
+
+        next_path = self.level_path(index + 1)
+        if self.preloader and next_path is not None:
+            self.preloader.request(next_path)
+
+        self.level_index = index
+        self.level = level_data
+        for key in LEVEL_KEYS:
+            setattr(self, key, level_data[key])
+        self.enemy_collisions = 0
+        self.flow_field = FlowField(self.tilemap, blocked=self.closed_door_tiles)
+        self.proximity.spatial = self.spatial
+        self.push_solver = PushSolver(self.tilemap, self.spatial, self.dynamic_solids)
+        self.moved_boxes = []
+        self.triggers = TriggerSystem(self.tile_size)
+        self.toggled_plates = {}
+        self.picked_keys = []
+        self.underfoot = set()
+        self.horde = Horde(self.enemies, self.tilemap, self.spatial, self.dynamic_solids,
+                           self.collides_with_solid) if self.horde_mode else None
+        if self.player:
+            self.player.add_mask_listener(self.on_mask_change)
+        self.stream()
+        self.link_plates()
+        self.sync_triggers()
+        return True
+
+    def on_mask_change(self, old_color, new_color):
+        """
+        The player's mask changed: switch the tilemap's solidity layer and the static layer's
+        ghosted walls. Nothing runs while the mask stays put.
+        """
+        self.tilemap.set_mask(new_color)
+        self.static_layer.set_mask(new_color)
+        self.flow_field.invalidate()
+
+    def collides_with_solid(self, rect):
+        return collides_with_solid(rect, self.tilemap, self.dynamic_solids, self.spatial)
+
+    def closed_door_tiles(self):
+        """Tile indexes of the doors that currently block movement, for the flow field."""
+        tile_size, width = self.tile_size, self.tilemap.width
+        return {(door.rect.y // tile_size) * width + door.rect.x // tile_size
+                for door in self.doors if not door.is_open and door in self.dynamic_solids}
+
+    def link_plates(self):
+        """
+        Link pressure plates to the registry's bucket of doors with their ID. The bucket is
+        live, so doors that die or stream in later are followed. Runs again when streaming
+        changes the entities, for plates whose first door has only just appeared.
+        """
+        registry = self.registry
+        for press in self.presses:
+            press.set_door_list(registry.doors(press.plate_id))
+
+    def sync_triggers(self):
+        """
+        Register trigger zones for the plates, keys, spikes and endpoints that are new, and the
+        player and boxes as occupants. Drop the ones that are gone. Runs on load and when
+        streaming changes the entities, never per frame.
+        """
+        triggers = self.triggers
+        for occupant in [occupant for occupant in triggers.footprints if not occupant.alive()]:
+            triggers.remove_occupant(occupant)
+        for owner in [owner for owner in triggers.zones if not owner.alive()]:
+            triggers.remove_zone(owner)
+            self.underfoot.discard(owner)
+
+        for press in self.presses:
+            if press not in triggers:
+                zone = triggers.add_zone(press, press.rect, (Player, Box), on_enter=self.on_plate_change,
+                                         on_exit=self.on_plate_change,
+                                         debounce=PLATE_DEBOUNCE_FRAMES if press.debouncing else 0)
+                # A streamed-in plate comes back in its stored state; line it up with what is on it now
+                self.on_plate_change(zone, None)
+        for key in self.keys:
+            if key not in triggers:
+                # The zone sits on the key's tile, not on the bobbing sprite
+                triggers.add_zone(key, pygame.Rect((key.x, key.base_y), key.rect.size), Player,
+                                  on_enter=self.on_key_enter)
+        for sprite in list(self.traps) + list(self.endpoints):
+            if isinstance(sprite, (Spike, Endpoint)) and sprite not in triggers:
+                triggers.add_zone(sprite, sprite.rect, Player, on_enter=self.on_underfoot_enter,
+                                  on_exit=self.on_underfoot_exit)
+
+        for occupant in [self.player, *self.boxes]:
+            if occupant is not None and occupant not in triggers.footprints:
+                triggers.add_occupant(occupant)
+
+    def on_plate_change(self, zone, occupant):
+        """Trigger event: press or release a plate to match its zone. The doors follow in step()."""
+        plate = zone.owner
+        if plate.is_pressed != zone.occupied:
+            self.toggled_plates.setdefault(plate, plate.is_pressed)
+            if zone.occupied:
+                plate.press()
+            else:
+                plate.depress()
+
+    def on_key_enter(self, zone, occupant):
+        self.picked_keys.append(zone.owner)
+
+    def on_underfoot_enter(self, zone, occupant):
+        self.underfoot.add(zone.owner)
+
+    def on_underfoot_exit(self, zone, occupant):
+        self.underfoot.discard(zone.owner)
+
+    def stream(self):
+        """In streaming mode, spawn and retire entities for the view centered on the player."""
+        if self.streamer is None or self.player is None:
+            return
+        width, height = self.view_size
+        # Same placement as Camera.update
+        view = pygame.Rect(max(0, self.player.rect.centerx - width // 2),
+                           max(0, self.player.rect.centery - height // 2), width, height)
+        if self.streamer.update(view):
+            self.link_plates()
+            self.sync_triggers()
+            if self.horde:
+                self.horde.sync()
+                self.horde.invalidate_solids()
+
+    def next_level(self):
+        """Load the next level. Returns False when there are no more levels."""
+        if not self.load_level(self.level_index + 1):
+            # No more levels
+            print("You beat all levels! Congratulations!")
+            self.running = False
+            return False
+        print(f"Level {self.level_index + 1} loaded!")
+        return True
+
+    def reload_level(self):
+        """Reload the current level from scratch."""
+        if not self.load_level(self.level_index):
+            print("Error: Could not reload level!")
+            return False
+        print(f"Level {self.level_index + 1} reloaded!")
+        return True
+
+    def handle_mask_pickup(self):
+        """Check if player touches a mask and equip it."""
+        for mask_obj in self.spatial.query(self.player.rect, Mask):
+            self.player.equip_mask(mask_obj.color)
+            self.play_sound('button')
+            self.spatial.remove(mask_obj)
+            mask_obj.kill()
+
+    def handle_key_pickup(self):
+        """Collect the keys the player reached this step and open the corresponding doors."""
+        picked, self.picked_keys = self.picked_keys, []
+        for key in picked:
+            if not key.alive():
+                continue
+            # Open the doors with the key's ID
+            for door in self.registry.doors(key.key_id):
+                door.open_door()
+                self.play_sound('drag')  # Play random drag sound
+                # Remove door from the solids so it's not collidable
+                self.solid_sprites.remove(door)
+                self.dynamic_solids.remove(door)
+            if self.streamer:
+                self.streamer.unlock_doors(key.key_id)
+            self.flow_field.invalidate()
+            self.triggers.remove_zone(key)
+            self.spatial.remove(key)
+            key.kill()
+
+    def push_boxes(self):
+        """Player can push boxes (and rows of them) if wearing the matching color mask."""
+        player = self.player
+        self.moved_boxes = self.push_solver.push(player.rect, player.velocity.x, player.velocity.y,
+                                                 player.current_mask)
+        for box in self.moved_boxes:
+            self.triggers.move(box)
+        if self.moved_boxes and self.horde:
+            self.horde.invalidate_solids()
+
+    def apply_inputs(self, inputs):
+        """Apply one-shot presses (mask switches, reload) and set the player's velocity."""
+        if inputs.reload:
+            self.reload_level()
+        player = self.player
+        if inputs.equip:
+            player.equip_mask(inputs.equip)
+        elif inputs.unequip:
+            player.unequip_mask()
+        player.set_direction(inputs.right - inputs.left, inputs.down - inputs.up)
+
+    def step(self, inputs, dt):
+        """Advance the simulation by one frame of dt seconds."""
+        if not self.running or not self.player:
+            return
+        self.frame += 1
+        profiler = self.profiler
+        self.stream()
+        # Count down debounced plates before anything moves, so a plate left this step
+        # starts its countdown next step
+        self.triggers.tick()
+        profiler.mark('stream')
+        self.apply_inputs(inputs)
+        player = self.player
+        profiler.mark('input')
+
+        # Check for box pushing
+        self.push_boxes()
+        profiler.mark('boxes')
+
+        # Move and check collision (handles both X and Y separately)
+        resolve_collision(player, self.tilemap, self.dynamic_solids, self.spatial)
+        self.triggers.move(player)
+        profiler.mark('collision')
+
+        # Check for mask pickup (mask effects follow through on_mask_change)
+        self.handle_mask_pickup()
+
+        # Animate masks with bobbing motion
+        for mask in self.masks:
+            mask.update(dt)
+            self.spatial.move(mask)
+
+        # Animate keys with bobbing motion
+        for key in self.keys:
+            key.update(dt)
+            self.spatial.move(key)
+        profiler.mark('masks')
+
+        # Pressure plates were pressed and released by trigger events as the player and boxes
+        # moved; toggle the doors of the ones that changed state over the step
+        toggled, self.toggled_plates = self.toggled_plates, {}
+        for press, was_pressed in toggled.items():
+            if press.is_pressed != was_pressed and press.alive():
+                press.change_doors()
+                if self.streamer:
+                    self.streamer.toggle_doors(press.plate_id)
+                self.flow_field.invalidate()
+                self.play_sound('drag')
+        profiler.mark('plates')
+
+        # Update enemies. They all steer by one flow field, which is only rebuilt when the
+        # player changes tile or passability changes. Chase state is measured once, up front,
+        # by the proximity service; its alerts switch the chase music.
+        flow_field = self.flow_field
+        proximity = self.proximity
+        if self.enemies:
+            flow_field.update(*player.rect.center)
+        if self.horde:
+            self.horde.step(player, flow_field, proximity)
+        else:
+            proximity.measure(player, self.enemies)
+            for enemy in self.enemies:
+                enemy.update(player, flow_field, proximity)
+                resolve_collision(enemy, self.tilemap, self.dynamic_solids, self.spatial)
+                self.spatial.move(enemy)
+        self.any_enemy_chasing = bool(proximity.chasing)
+
+        # Enemy contact - only the enemies bucketed around the player are tested
+        self.enemy_collisions += len(self.spatial.query(player.rect, Enemy))
+        profiler.mark('enemies')
+        if self.enemy_collisions > 50:
+            self.play_sound('hurt')
+            self.reload_level()
+            return
+
+        # Animate spikes
+        for trap in self.traps:
+            if trap.__class__.__name__ == 'Spike':
+                was_open = trap.is_open
+                trap.update(dt)
+                # Play trap sound when spike activates
+                if trap.is_open and not was_open:
+                    self.play_sound('trap')
+        if self.streamer:
+            self.streamer.advance(dt)
+        profiler.mark('spikes')
+
+        # Check for key pickup and door opening
+        self.handle_key_pickup()
+
+        # Check for spike collision (only the spikes the player is standing in)
+        if any(isinstance(sprite, Spike) and sprite.is_open for sprite in self.underfoot):
+            self.play_sound('hurt')
+            self.reload_level()
+            return
+
+        # Check for level completion
+        if any(isinstance(sprite, Endpoint) for sprite in self.underfoot):
+            self.next_level()
+        profiler.mark('triggers')
+
+    def state_digest(self):
+        """
+        Short hash of the simulation state, for checking that a replay reproduced a run.
+        Entities are read through their records in entity table order, retired ones
+        included, so the digest does not depend on what streaming has loaded.
+        """
+        digest = hashlib.sha1(struct.pack('<ii', self.level_index, self.frame))
+        for record in self.records or ():
+            if record.is_gone():
+                digest.update(b'-')
+                continue
+            if record.sprite is not None:
+                record.capture(self.level, self.streamer.time if self.streamer else 0.0)
+            digest.update(struct.pack('<dd???', record.x, record.y, record.door_open, record.unlocked,
+                                      record.pressed))
+        if self.player:
+            digest.update(struct.pack('<dd', self.player.pos.x, self.player.pos.y))
+            digest.update(str(self.player.current_mask).encode())
+        return digest.hexdigest()[:16]
+
+    def shutdown(self):
+        if self.preloader:
+            self.preloader.shutdown()
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+from src.world import World, init_headless  # noqa: E402
+
+
+@pytest.fixture(scope='session', autouse=True)
+def headless():
+    init_headless()
+
+
+@pytest.fixture
+def make_world(tmp_path):
+    """Build a World from level rows (space-separated tokens, one string per row)."""
+    def make(rows, **world_args):
+        path = tmp_path / 'level.csv'
+        path.write_text('\n'.join(rows) + '\n')
+        return World(levels=[path.name], levels_dir=str(tmp_path), preload=False, seed=1, **world_args)
+    return make
@@ -0,0 +1,40 @@
+import importlib.util
+import os
+
+import pytest
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks',
+                          'run_benchmarks.py')
+
+
+@pytest.fixture(scope='module')
+def bench():
+    spec = importlib.util.spec_from_file_location('run_benchmarks', BENCHMARKS)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_synthetic_level_has_border_spawn_and_end(bench, tmp_path):
+    path = tmp_path / 'bench.csv'
+    bench.generate_synthetic_level(str(path), 20, ghosts=0.05, seed=1)
+    rows = [line.split() for line in path.read_text().splitlines()]
+    assert len(rows) == 20 and all(len(row) == 20 for row in rows)
+    assert set(rows[0]) == set(rows[-1]) == {'w'}
+    assert rows[1][1] == 'p' and rows[18][18] == 'end'
+    assert {cell for row in rows[1:4] for cell in row[1:4]} <= {'p', 'o'}
+    assert any('er' in row for row in rows)
+
+
+def test_compare_to_baseline_flags_regressions_only(bench, capsys):
+    baseline = {'cases': [{'name': 'a', 'status': 'ok', 'frame_mean_ms': 1.0, 'peak_rss_mb': 100},
+                          {'name': 'b', 'status': 'ok', 'frame_mean_ms': 1.0},
+                          {'name': 'c', 'status': 'failed'}]}
+    results = {'cases': [{'name': 'a', 'status': 'ok', 'frame_mean_ms': 1.05, 'peak_rss_mb': 150},
+                         {'name': 'b', 'status': 'timeout'},
+                         {'name': 'c', 'status': 'ok', 'frame_mean_ms': 9.0},
+                         {'name': 'new', 'status': 'ok', 'frame_mean_ms': 9.0}]}
+    assert bench.compare_to_baseline(results, baseline, tolerance=0.1) == 2
+    out = capsys.readouterr().out
+    assert 'a peak_rss_mb' in out and 'REGRESSION b: timeout' in out
+    assert 'frame_mean_ms' not in out
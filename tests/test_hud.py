@@ -0,0 +1,48 @@
+import pygame
+import pytest
+
+from src.hud import HUD
+
+
+@pytest.fixture(autouse=True)
+def fonts():
+    pygame.font.init()
+
+
+def test_overlay_is_reused_until_a_text_changes():
+    hud = HUD()
+    hud.add_text('lives', (10, 10), 'Lives: 3')
+    hud.add_text('mask', (10, 40), 'Mask: none')
+    surface, position = hud.overlay()
+    assert position == (10, 10)
+    hud.set_text('lives', 'Lives: 3')
+    assert hud.overlay()[0] is surface
+    hud.set_text('lives', 'Lives: 2')
+    assert hud.overlay()[0] is not surface
+
+
+def test_rendered_text_is_cached_and_bounded():
+    hud = HUD(max_cached=2)
+    first = hud.render_text('a')
+    assert hud.render_text('a') is first
+    hud.render_text('b')
+    hud.render_text('c')
+    assert list(hud.text_cache) == [('b', 24, (255, 255, 255)), ('c', 24, (255, 255, 255))]
+    assert hud.render_text('a') is not first
+
+
+def test_overlay_draws_like_the_text_itself():
+    hud = HUD()
+    hud.add_text('score', (5, 5), 'Score 12', color=(255, 200, 0))
+    composited = pygame.Surface((200, 40))
+    hud.draw(composited)
+    direct = pygame.Surface((200, 40))
+    direct.blit(hud.render_text('Score 12', color=(255, 200, 0)), (5, 5))
+    assert pygame.image.tobytes(composited, 'RGB') == pygame.image.tobytes(direct, 'RGB')
+
+
+def test_empty_hud_draws_nothing():
+    hud = HUD()
+    hud.add_text('blank', (0, 0))
+    surface, _ = hud.overlay()
+    assert surface.get_size() == (0, 0)
@@ -0,0 +1,112 @@
+import os
+import threading
+
+import pytest
+
+from src import level_format
+from src.level_format import compiled_path, load_layout, map_layout, read_header
+from src.tilemap import TILE_END, TILE_WALL
+
+LEVEL = 'w w w\nw p end\nw w w\n'
+
+
+@pytest.fixture
+def csv(tmp_path):
+    path = tmp_path / 'level.csv'
+    path.write_text(LEVEL)
+    return path
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    """Count calls to the CSV tokenizer."""
+    calls = []
+    parse = level_format.parse_level_lines
+
+    def counting(lines):
+        calls.append(None)
+        return parse(lines)
+    monkeypatch.setattr(level_format, 'parse_level_lines', counting)
+    return calls
+
+
+def set_mtime(path, mtime_ns):
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_first_load_compiles_then_reads_the_cache(csv, parses):
+    layout = load_layout(str(csv))
+    assert os.path.exists(compiled_path(str(csv)))
+    assert len(parses) == 1
+    cached = load_layout(str(csv))
+    assert len(parses) == 1
+    assert (cached.width, cached.height, bytes(cached.tiles), cached.entities) == \
+        (layout.width, layout.height, bytes(layout.tiles), layout.entities)
+    assert cached.entities == [('p', 1, 1)]
+    assert cached.tiles[5] == TILE_END and cached.tiles[0] == TILE_WALL
+
+
+def test_edited_source_is_recompiled(csv, parses):
+    load_layout(str(csv))
+    csv.write_text(LEVEL.replace('p end', 'p er end'))
+    layout = load_layout(str(csv))
+    assert len(parses) == 2
+    assert layout.entities == [('p', 1, 1), ('er', 2, 1)]
+
+
+def test_same_size_edit_is_caught_by_the_digest(csv, parses):
+    load_layout(str(csv))
+    mtime = os.stat(csv).st_mtime_ns
+    csv.write_text(LEVEL.replace('p end', 'p w w'.ljust(len('p end'))))
+    set_mtime(csv, mtime + 10**9)
+    layout = load_layout(str(csv))
+    assert len(parses) == 2
+    assert layout.entities == [('p', 1, 1)]
+
+
+def test_touched_source_refreshes_the_stamp_without_parsing(csv, parses):
+    load_layout(str(csv))
+    mtime = os.stat(csv).st_mtime_ns + 10**9
+    set_mtime(csv, mtime)
+    load_layout(str(csv))
+    assert len(parses) == 1
+    with open(compiled_path(str(csv)), 'rb') as f:
+        assert read_header(f.read())['mtime_ns'] == mtime
+
+
+def test_corrupt_cache_is_rebuilt(csv, parses):
+    load_layout(str(csv))
+    with open(compiled_path(str(csv)), 'wb') as f:
+        f.write(b'junk')
+    assert load_layout(str(csv)).entities == [('p', 1, 1)]
+    assert len(parses) == 2
+    assert load_layout(str(csv)).entities == [('p', 1, 1)]
+    assert len(parses) == 2
+
+
+def test_mapped_layout_matches_and_refreshes_stale_cache(csv):
+    load_layout(str(csv))
+    csv.write_text(LEVEL.replace('p end', 'p er end'))
+    mapped = map_layout(str(csv))
+    assert mapped.entities == [('p', 1, 1), ('er', 2, 1)]
+    assert bytes(mapped.tiles) == bytes(load_layout(str(csv)).tiles)
+
+
+def test_threads_writing_the_same_level_do_not_collide(csv, monkeypatch, capsys):
+    # Hold both writers between writing their temp file and renaming it, as the preload
+    # worker and the main thread could be
+    barrier = threading.Barrier(2, timeout=5)
+    replace = os.replace
+
+    def paused_replace(src, dst):
+        barrier.wait()
+        replace(src, dst)
+    monkeypatch.setattr(os, 'replace', paused_replace)
+    threads = [threading.Thread(target=level_format.compile_level, args=(str(csv),)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert 'Warning' not in capsys.readouterr().out
+    assert os.listdir(os.path.dirname(compiled_path(str(csv)))) == ['level.csv.bin']
+    assert load_layout(str(csv)).entities == [('p', 1, 1)]
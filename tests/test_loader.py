@@ -0,0 +1,53 @@
+import pygame
+import pytest
+
+from src import loader
+from src.loader import create_asset_dict, invalidate_texture_cache, load_texture
+from src.world import Inputs
+
+ROWS = [
+    'w w w w w w',
+    'w p k1 d1 end w',
+    'w w w w w w',
+]
+
+
+@pytest.fixture
+def image_loads(monkeypatch):
+    """Record every texture read from disk."""
+    loads = []
+    load = pygame.image.load
+
+    def recording(path, *args):
+        loads.append(path)
+        return load(path, *args)
+    monkeypatch.setattr(loader.pygame.image, 'load', recording)
+    return loads
+
+
+def test_asset_dict_reuses_cached_textures(image_loads):
+    invalidate_texture_cache()
+    first = create_asset_dict(32)
+    assert image_loads
+    image_loads.clear()
+    second = create_asset_dict(32)
+    assert image_loads == []
+    assert all(second[name] is first[name] for name in first if isinstance(first[name], pygame.Surface))
+
+
+def test_reload_reads_no_textures(make_world, image_loads):
+    world = make_world(ROWS)
+    image_loads.clear()
+    world.step(Inputs(reload=True), 1 / 60)
+    assert world.frame == 1 and world.player is not None
+    assert image_loads == []
+
+
+def test_invalidating_one_file_reloads_only_it(image_loads):
+    door = load_texture('door.bmp', 32, 32, (200, 50, 200))
+    wall = load_texture('Wall_normal.bmp', 32, 32, (255, 255, 255))
+    invalidate_texture_cache('door.bmp')
+    image_loads.clear()
+    assert load_texture('door.bmp', 32, 32, (200, 50, 200)) is not door
+    assert load_texture('Wall_normal.bmp', 32, 32, (255, 255, 255)) is wall
+    assert len(image_loads) == 1 and image_loads[0].endswith('door.bmp')
@@ -0,0 +1,38 @@
+import pygame
+
+from src.entities import Player
+from src.world import Inputs
+
+ROWS = [
+    'w w w w w w',
+    'w p o wr end w',
+    'w w w w w w',
+]
+
+
+def test_player_raises_mask_events_on_change_only():
+    player = Player(0, 0, pygame.Surface((24, 24)))
+    events = []
+    player.add_mask_listener(lambda old, new: events.append((old, new)))
+    player.equip_mask('red')
+    player.equip_mask('red')
+    player.equip_mask('blue')
+    player.unequip_mask()
+    player.unequip_mask()
+    assert events == [(None, 'red'), ('red', 'blue'), ('blue', None)]
+
+
+def test_mask_change_switches_solidity_and_static_layer(make_world):
+    world = make_world(ROWS)
+    changes = []
+    world.player.add_mask_listener(lambda old, new: changes.append(new))
+    assert world.tilemap.is_solid(3, 1)
+    world.step(Inputs(equip='red'), 1 / 60)
+    assert not world.tilemap.is_solid(3, 1)
+    assert world.static_layer.mask == 'red'
+    for _ in range(30):
+        world.step(Inputs(), 1 / 60)  # Idle frames: no mask work
+    assert changes == ['red']
+    world.step(Inputs(unequip=True), 1 / 60)
+    assert world.tilemap.is_solid(3, 1) and world.static_layer.mask is None
+    assert changes == ['red', None]
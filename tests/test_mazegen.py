@@ -0,0 +1,27 @@
+import sys
+
+from src import mazegen
+
+
+def tokens(path):
+    return [cell for line in open(path) for cell in line.split()]
+
+
+def run(monkeypatch, *argv):
+    monkeypatch.setattr(sys, 'argv', ['mazegen', *argv])
+    mazegen.main()
+
+
+def test_cli_passes_mask_and_plate_densities(tmp_path, monkeypatch):
+    none, many = tmp_path / 'none.csv', tmp_path / 'many.csv'
+    run(monkeypatch, str(none), '--size', '41x21', '--seed', '3', '--masks', '0', '--plates', '0')
+    run(monkeypatch, str(many), '--size', '41x21', '--seed', '3', '--masks', '0.2', '--plates', '1')
+    assert not [cell for cell in tokens(none) if cell in ('mr', 'mg', 'mb') or cell.startswith('p1')]
+    assert any(cell in ('mr', 'mg', 'mb') for cell in tokens(many))
+    assert any(cell.startswith('p1') for cell in tokens(many))
+
+
+def test_same_seed_same_level():
+    first = list(mazegen.generate_level_lines(31, 21, seed=5))
+    assert first == list(mazegen.generate_level_lines(31, 21, seed=5))
+    assert first != list(mazegen.generate_level_lines(31, 21, seed=6))
@@ -0,0 +1,76 @@
+from src.pathfinding import FlowField
+from src.tilemap import TILE_WALL, TileMap
+
+TILE = 32
+
+# A wall splits the room; the only way through is the gap in the bottom row
+ROWS = [
+    'wwwwwww',
+    'w..w..w',
+    'w..w..w',
+    'w.....w',
+    'wwwwwww',
+]
+
+
+def tilemap():
+    return TileMap.from_rows([[TILE_WALL if c == 'w' else 0 for c in row] for row in ROWS], TILE)
+
+
+def center(col, row):
+    return col * TILE + TILE / 2, row * TILE + TILE / 2
+
+
+def walk(field, start, limit=50):
+    """Follow the field's waypoints from a tile center; returns the tiles visited."""
+    path = [start]
+    point = center(*start)
+    for _ in range(limit):
+        point = field.waypoint(*point)
+        if point is None:
+            return path
+        path.append(field.tile_at(*point))
+    raise AssertionError('field did not lead to the target')
+
+
+def test_waypoints_lead_around_the_wall():
+    tiles = tilemap()
+    field = FlowField(tiles)
+    field.update(*center(5, 1))
+    path = walk(field, (1, 1))
+    assert path[-1] == (5, 1)
+    assert not any(tiles.is_solid(col, row) for col, row in path)
+    assert (3, 3) in path  # Through the gap
+    assert len(path) - 1 == 8  # Shortest route: 2 down, 4 across, 2 up
+
+
+def test_waypoint_steps_to_a_neighbouring_tile():
+    field = FlowField(tilemap())
+    field.update(*center(5, 1))
+    assert field.waypoint(*center(2, 1)) == center(2, 2)  # Away from the player, toward the gap
+    assert field.waypoint(*center(5, 1)) is None  # Already on the target
+
+
+def test_blocked_tiles_cut_the_route():
+    tiles = tilemap()
+    gap = 3 * tiles.width + 3
+    field = FlowField(tiles, blocked=lambda: {gap})
+    field.update(*center(5, 1))
+    assert field.waypoint(*center(1, 1)) is None
+
+
+def test_rebuilds_only_when_target_or_passability_changes():
+    field = FlowField(tilemap())
+    assert field.update(*center(5, 1))
+    assert not field.update(5 * TILE + 1, 1 * TILE + 1)  # Same tile
+    field.invalidate()
+    assert field.update(*center(5, 1))
+    assert field.update(*center(4, 2))
+    assert field.rebuilds == 3
+
+
+def test_max_distance_limits_the_field():
+    field = FlowField(tilemap(), max_distance=4)
+    field.update(*center(5, 1))
+    assert field.waypoint(*center(1, 1)) is None
+    assert field.waypoint(*center(4, 3)) is not None
@@ -0,0 +1,38 @@
+import os
+
+from src.preload import LevelPreloader
+from src.world import World
+
+LEVEL = 'w w w w\nw p end w\nw w w w\n'
+
+
+def write_levels(tmp_path, count):
+    names = []
+    for index in range(count):
+        name = f'level{index}.csv'
+        (tmp_path / name).write_text(LEVEL)
+        names.append(name)
+    return names
+
+
+def test_world_plays_the_level_prepared_in_the_background(tmp_path):
+    world = World(levels=write_levels(tmp_path, 2), levels_dir=str(tmp_path), seed=1)
+    try:
+        future = world.preloader.pending[os.path.abspath(str(tmp_path / 'level1.csv'))]
+        _, prepared_tilemap = future.result(timeout=5)
+        assert world.next_level()
+        assert world.tilemap is prepared_tilemap
+        assert world.preloader.pending == {}  # Nothing after the last level
+    finally:
+        world.shutdown()
+
+
+def test_take_without_request_or_after_failure_returns_none(tmp_path, capsys):
+    preloader = LevelPreloader()
+    try:
+        assert preloader.take(str(tmp_path / 'never.csv')) is None
+        preloader.request(str(tmp_path / 'missing.csv'))
+        assert preloader.take(str(tmp_path / 'missing.csv')) is None
+        assert 'Could not preload' in capsys.readouterr().out
+    finally:
+        preloader.shutdown()
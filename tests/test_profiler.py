@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from src import profiler as profiler_module
+from src.profiler import FrameProfiler, percentile
+
+
+class Clock:
+    """Stands in for time.perf_counter; advance() moves it by milliseconds."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, ms):
+        self.now += ms / 1000
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(profiler_module.time, 'perf_counter', clock)
+    return clock
+
+
+def run_frames(profiler, clock, physics_ms):
+    for ms in physics_ms:
+        profiler.begin_frame()
+        clock.advance(1)
+        profiler.mark('input')
+        clock.advance(ms)
+        profiler.mark('physics')
+        profiler.end_frame()
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.95) == 95
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 1.0) == 100
+    assert percentile(list(range(1, 21)), 0.95) == 19
+    assert percentile([7], 0.95) == 7
+    assert percentile([], 0.95) == 0.0
+
+
+def test_summary_reports_average_p95_and_worst(clock):
+    profiler = FrameProfiler(enabled=True)
+    run_frames(profiler, clock, range(1, 101))
+    summary = profiler.summary()
+    avg, p95, worst = summary['physics']
+    assert avg == pytest.approx(0.0505)
+    assert p95 == pytest.approx(0.095)
+    assert worst == pytest.approx(0.100)
+    assert summary['input'] == pytest.approx((0.001, 0.001, 0.001))
+    assert summary['frame'][2] == pytest.approx(0.101)
+    assert profiler.worst[0] == 100
+    assert profiler.phase_names == ['input', 'physics']
+
+
+def test_ring_buffer_keeps_the_last_frames(clock):
+    profiler = FrameProfiler(history=10, enabled=True)
+    run_frames(profiler, clock, range(1, 31))
+    assert len(profiler.frames) == 10
+    assert profiler.summary()['physics'][0] == pytest.approx(0.0255)
+
+
+def test_disabled_profiler_records_nothing(clock):
+    profiler = FrameProfiler()
+    run_frames(profiler, clock, [5, 5])
+    assert not profiler.frames and profiler.summary() == {}
+
+
+def test_export(tmp_path, clock):
+    profiler = FrameProfiler(enabled=True)
+    run_frames(profiler, clock, [2, 4])
+    with open(profiler.export(str(tmp_path / 'trace.json'))) as f:
+        data = json.load(f)
+    assert data['phases'] == ['input', 'physics']
+    assert [frame['phases_ms']['physics'] for frame in data['frames']] == pytest.approx([2, 4])
+    with open(profiler.export(str(tmp_path / 'trace.csv'))) as f:
+        rows = f.read().splitlines()
+    assert rows[0] == 'frame,total_ms,input,physics'
+    assert len(rows) == 3
@@ -0,0 +1,51 @@
+import pygame
+
+from src.entities import Enemy
+from src.proximity import ProximityService
+from src.spatial import SpatialHash
+
+SURFACE = pygame.Surface((32, 32))
+
+
+class Target:
+    def __init__(self, x, y):
+        self.pos = pygame.math.Vector2(x, y)
+
+
+def ghosts(*xs):
+    return [Enemy(x, 0, SURFACE, 'red') for x in xs]
+
+
+def test_chase_events_fire_on_change_only():
+    near, far = ghosts(100, 1000)
+    service = ProximityService()
+    events, alerts = [], []
+    service.add_chase_listener(lambda enemy, chasing: events.append((enemy, chasing)))
+    service.add_alert_listener(alerts.append)
+    player = Target(0, 0)
+    service.measure(player, [near, far])
+    service.measure(player, [near, far])
+    assert events == [(near, True)]
+    assert service.distance_sq[far] == 1000 * 1000
+    player.pos.x = 2000
+    service.measure(player, [near, far])
+    assert events == [(near, True), (near, False)]
+    assert alerts == [True, False]
+
+
+def test_chase_radius_is_exclusive():
+    ghost, = ghosts(0)
+    service = ProximityService()
+    service.measure(Target(ghost.chase_distance, 0), [ghost])
+    assert not service.is_chasing(ghost)
+    service.measure(Target(ghost.chase_distance - 1, 0), [ghost])
+    assert service.is_chasing(ghost)
+
+
+def test_within_uses_the_spatial_hash():
+    spatial = SpatialHash(64)
+    inside, edge, outside = ghosts(30, 100, 300)
+    spatial.add(inside, edge, outside)
+    service = ProximityService(spatial)
+    assert set(service.within(0, 0, 100)) == {inside, edge}
+    assert ProximityService().within(0, 0, 100) == []
@@ -0,0 +1,92 @@
+import pygame
+import pytest
+
+from src.entities import Box, Door
+from src.push import PushSolver
+from src.spatial import SpatialHash
+from src.tilemap import TILE_WALL, TileMap
+
+TILE = 32
+SURFACE = pygame.Surface((TILE, TILE))
+
+
+@pytest.fixture
+def room():
+    """A 12x4 room with walls all round; returns a function that places entities and a solver."""
+    inside = [TILE_WALL] + [0] * 10 + [TILE_WALL]
+    rows = [[TILE_WALL] * 12, inside, inside, [TILE_WALL] * 12]
+    tilemap = TileMap.from_rows(rows, TILE)
+    spatial = SpatialHash(64)
+    solids = pygame.sprite.Group()
+
+    def place(*sprites, max_chain=16):
+        solids.add(*sprites)
+        spatial.add(*sprites)
+        return PushSolver(tilemap, spatial, solids, max_chain)
+    return place
+
+
+def boxes(*cols, color='red'):
+    return [Box(col * TILE, TILE, SURFACE, color) for col in cols]
+
+
+def pusher(col):
+    return pygame.Rect(col * TILE, TILE, TILE, TILE)
+
+
+def cols(sprites):
+    return [sprite.rect.x / TILE for sprite in sprites]
+
+
+def test_chain_moves_together(room):
+    row = boxes(3, 4, 5)
+    solver = room(*row)
+    moved = solver.push(pusher(2), 4, 0, 'red')
+    assert set(moved) == set(row)
+    assert [box.rect.x for box in row] == [3 * TILE + 4, 4 * TILE + 4, 5 * TILE + 4]
+
+
+def test_chain_blocked_by_wall_does_not_move(room):
+    row = boxes(8, 9, 10)
+    solver = room(*row)
+    assert solver.push(pusher(7), 4, 0, 'red') == []
+    assert cols(row) == [8, 9, 10]
+
+
+def test_chain_blocked_by_other_color(room):
+    row = boxes(3, 4) + boxes(5, color='green')
+    solver = room(*row)
+    assert solver.push(pusher(2), 4, 0, 'red') == []
+    assert cols(row) == [3, 4, 5]
+
+
+def test_chain_blocked_by_closed_door_until_it_opens(room):
+    row = boxes(3, 4)
+    door = Door(5 * TILE, TILE, SURFACE, 1)
+    solver = room(*row, door)
+    assert solver.push(pusher(2), 4, 0, 'red') == []
+    door.is_open = True
+    assert set(solver.push(pusher(2), 4, 0, 'red')) == set(row)
+
+
+def test_chain_longer_than_max_chain_is_blocked(room):
+    row = boxes(3, 4, 5)
+    solver = room(*row, max_chain=2)
+    assert solver.push(pusher(2), 4, 0, 'red') == []
+    assert cols(row) == [3, 4, 5]
+
+
+def test_wrong_mask_or_no_mask_pushes_nothing(room):
+    row = boxes(3)
+    solver = room(*row)
+    assert solver.push(pusher(2), 4, 0, 'blue') == []
+    assert solver.push(pusher(2), 4, 0, None) == []
+    assert cols(row) == [3]
+
+
+def test_diagonal_push_moves_on_both_axes(room):
+    row = boxes(3)
+    solver = room(*row)
+    rect = pygame.Rect(2 * TILE + 8, TILE - 8, TILE, TILE)
+    assert solver.push(rect, 4, 4, 'red') == row
+    assert row[0].rect.topleft == (3 * TILE + 4, TILE + 4)
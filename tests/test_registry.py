@@ -0,0 +1,65 @@
+import pygame
+import pytest
+
+from src.entities import Door, Key
+from src.registry import EntityRegistry, parse_id_token
+from src.world import Inputs
+
+SURFACE = pygame.Surface((32, 32))
+
+
+@pytest.mark.parametrize('token, parsed', [
+    ('d1', ('door', 1, '')),
+    ('d12', ('door', 12, '')),
+    ('d12o', ('door', 12, 'o')),
+    ('k12', ('key', 12, '')),
+    ('p40', ('plate', 40, '')),
+    ('p40d', ('plate', 40, 'd')),
+])
+def test_parse_id_token(token, parsed):
+    assert parse_id_token(token) == parsed
+
+
+@pytest.mark.parametrize('token', ['d0', 'd012', 'k12o', 'd12d', 'p12o', 'dec', 'w', 'end', 'd', 'x12'])
+def test_parse_id_token_rejects_other_tokens(token):
+    assert parse_id_token(token) is None
+
+
+def test_registry_keeps_ids_apart():
+    registry = EntityRegistry()
+    door1, door12 = Door(0, 0, SURFACE, 1), Door(32, 0, SURFACE, 12)
+    key12 = Key(64, 0, SURFACE, 12)
+    registry.add(door1, door12, key12)
+    assert list(registry.doors(12)) == [door12]
+    assert list(registry.doors(1)) == [door1]
+    assert list(registry.keys(12)) == [key12]
+    assert registry.ids('door') == [1, 12]
+
+
+def test_registry_lookups_follow_kill_and_create_nothing():
+    registry = EntityRegistry()
+    door = Door(0, 0, SURFACE, 12)
+    registry.add(door)
+    door.kill()
+    assert not registry.doors(12)
+    assert registry.ids('door') == []
+    assert registry.doors(99) == ()
+    assert ('door', 99) not in registry.by_id
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_two_digit_key_opens_only_its_doors(make_world, streaming):
+    world = make_world([
+        'w w w w w w w w w',
+        'w p k12 o d12 d1 d12 end w',
+        'w o o o o o o o w',
+        'w w w w w w w w w',
+    ], streaming=streaming)
+    doors12, doors1 = list(world.registry.doors(12)), list(world.registry.doors(1))
+    assert len(doors12) == 2 and len(doors1) == 1
+    for _ in range(60):
+        world.step(Inputs(right=True), 1 / 60)
+        if all(door.is_open for door in doors12):
+            break
+    assert all(door.is_open for door in doors12)
+    assert not doors1[0].is_open
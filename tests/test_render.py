@@ -0,0 +1,177 @@
+import pygame
+
+from src.entities import Box
+from src.render import (BACKGROUND_COLOR, Camera, DirtyRenderer, DrawOrder, StaticLayer, draw_world,
+                        visible_sprites)
+from src.tilemap import TILE_WALL, TILE_WALL_RED, TileMap
+from src.world import Inputs
+
+TILE = 32
+GREY, RED = (100, 100, 100), (200, 50, 50)
+SURFACE = pygame.Surface((TILE, TILE))
+
+
+def tile_images():
+    images = {}
+    for tile_id, color in ((TILE_WALL, GREY), (TILE_WALL_RED, RED)):
+        images[tile_id] = pygame.Surface((TILE, TILE))
+        images[tile_id].fill(color)
+    return images
+
+
+def layer(rows, **options):
+    return StaticLayer(TileMap.from_rows(rows, TILE), tile_images(), chunk_tiles=2, **options)
+
+
+def test_chunks_bake_their_tiles():
+    static = layer([[TILE_WALL, 0], [0, TILE_WALL_RED]])
+    screen = pygame.Surface((2 * TILE, 2 * TILE))
+    static.draw(screen, screen.get_rect())
+    assert screen.get_at((5, 5))[:3] == GREY
+    assert screen.get_at((TILE + 5, TILE + 5))[:3] == RED
+    assert screen.get_at((TILE + 5, 5))[:3] != GREY
+
+
+def test_empty_chunks_have_no_surface():
+    static = layer([[0, 0, TILE_WALL, 0]])
+    assert static.get_chunk(0, 0) is None
+    assert static.get_chunk(1, 0) is not None
+
+
+def test_only_chunks_with_colored_walls_rebake_on_mask_change():
+    static = layer([[TILE_WALL, 0, TILE_WALL_RED, 0]])
+    neutral, colored = static.get_chunk(0, 0), static.get_chunk(1, 0)
+    static.set_mask('red')
+    assert static.get_chunk(0, 0) is neutral
+    ghosted = static.get_chunk(1, 0)
+    assert ghosted is not colored
+    assert static.get_chunk(1, 0) is ghosted  # Baked once per mask state
+
+
+def test_chunk_cache_is_bounded():
+    static = layer([[TILE_WALL] * 8], max_chunks=2)
+    for chunk_x in range(4):
+        static.get_chunk(chunk_x, 0)
+    assert list(static.chunks) == [(2, 0), (3, 0)]
+
+
+WIDE_LEVEL = [
+    'w w w w w w w w w w w w w w w w w w w w w w w w w w w w w w',
+    'w p br o k1 o o o o o o o o o o o o o o o o o o o o o o d1 end w',
+    'w o o o o o o o o o o o o o o o o o o o o o o o o o o o er w',
+    'w w w w w w w w w w w w w w w w w w w w w w w w w w w w w w',
+]
+
+
+def test_culling_keeps_only_sprites_in_view(make_world):
+    world = make_world(WIDE_LEVEL)
+    view = pygame.Rect(0, 0, 8 * TILE, 4 * TILE)
+    visible = visible_sprites(world, view)
+    assert world.player in visible
+    assert all(view.colliderect(sprite.rect) for sprite in visible)
+    off_screen = [sprite for sprite in world.dynamic_sprites if not view.colliderect(sprite.rect)]
+    assert off_screen and not set(off_screen) & set(visible)
+
+
+def test_culled_draw_matches_drawing_everything(make_world):
+    world = make_world(WIDE_LEVEL)
+    camera = Camera(8 * TILE, 4 * TILE)
+    camera.update(world.player)
+    culled = pygame.Surface(camera.camera.size)
+    draw_world(culled, world, camera)
+    everything = pygame.Surface(camera.camera.size)
+    everything.fill(BACKGROUND_COLOR)
+    world.static_layer.draw(everything, camera.camera)
+    for sprite in world.dynamic_sprites.in_order(list(world.dynamic_sprites)):
+        everything.blit(sprite.image, camera.apply(sprite))
+    assert pygame.image.tobytes(culled, 'RGB') == pygame.image.tobytes(everything, 'RGB')
+
+
+class Flat(pygame.sprite.Sprite):
+    _layer = 0
+
+    def __init__(self, y):
+        super().__init__()
+        self.rect = pygame.Rect(0, y, TILE, TILE)
+
+
+def test_draw_order_is_layer_then_y_then_insertion():
+    box_low, box_high = Box(0, 50, SURFACE, 'red'), Box(0, 10, SURFACE, 'red')
+    plate, tie = Flat(90), Box(0, 50, SURFACE, 'red')
+    order = DrawOrder(box_low, box_high, plate, tie)
+    assert order.order == [plate, box_high, box_low, tie]
+
+
+def test_resort_moves_only_the_movers_that_changed():
+    boxes = [Box(0, y, SURFACE, 'red') for y in (0, 20, 40)]
+    plate = Flat(30)
+    order = DrawOrder(plate, *boxes)
+    boxes[0].rect.y = 60
+    plate.rect.y = 100  # Not a mover: keeps its place
+    order.resort()
+    assert order.order == [plate, boxes[1], boxes[2], boxes[0]]
+    boxes[2].rect.y = 80
+    order.resort([boxes[1]])  # Only re-check what is about to be drawn
+    assert order.order == [plate, boxes[1], boxes[2], boxes[0]]
+    order.resort()
+    assert order.order == [plate, boxes[1], boxes[0], boxes[2]]
+
+
+def test_in_order_and_removal():
+    boxes = [Box(0, y, SURFACE, 'red') for y in range(0, 400, 20)]
+    order = DrawOrder(*reversed(boxes))
+    assert order.in_order([boxes[7], boxes[2]]) == [boxes[2], boxes[7]]
+    assert order.in_order(boxes[::-1]) == boxes
+    boxes[3].kill()
+    assert boxes[3] not in order.order and len(order.keys) == len(boxes) - 1
+
+
+def full_frame(world, camera, overlays=()):
+    screen = pygame.Surface(camera.camera.size)
+    draw_world(screen, world, camera)
+    screen.blits(overlays, doreturn=False)
+    return pygame.image.tobytes(screen, 'RGB')
+
+
+def test_dirty_renderer_repaints_only_what_changed(make_world):
+    world = make_world(WIDE_LEVEL)
+    camera = Camera(30 * TILE, 4 * TILE)  # Whole level in view, so the camera never scrolls
+    screen = pygame.Surface(camera.camera.size)
+    renderer = DirtyRenderer()
+    assert renderer.draw(screen, world, camera) is None  # First frame is a full redraw
+    assert renderer.draw(screen, world, camera) == []  # Nothing changed
+    key = next(iter(world.keys))
+    old_rect = key.rect.copy()
+    key.rect.y += 3
+    world.spatial.move(key)
+    dirty = renderer.draw(screen, world, camera)
+    assert dirty and all(rect.colliderect(old_rect) or rect.colliderect(key.rect) for rect in dirty)
+    assert pygame.image.tobytes(screen, 'RGB') == full_frame(world, camera)
+
+
+def test_dirty_renderer_matches_full_frames_while_playing(make_world):
+    world = make_world(WIDE_LEVEL)
+    camera = Camera(30 * TILE, 4 * TILE)
+    screen = pygame.Surface(camera.camera.size)
+    renderer = DirtyRenderer()
+    hud = pygame.Surface((40, 10))
+    hud.fill((255, 255, 0))
+    partial = 0
+    for frame in range(40):
+        world.step(Inputs(right=frame < 20, down=frame >= 20), 1 / 60)
+        partial += renderer.draw(screen, world, camera, overlays=[(hud, (4, 4))]) is not None
+        assert pygame.image.tobytes(screen, 'RGB') == full_frame(world, camera, [(hud, (4, 4))])
+    assert partial > 30
+
+
+def test_scrolling_or_a_mask_change_redraws_everything(make_world):
+    world = make_world(WIDE_LEVEL)
+    camera = Camera(8 * TILE, 4 * TILE)
+    screen = pygame.Surface(camera.camera.size)
+    renderer = DirtyRenderer()
+    renderer.draw(screen, world, camera)
+    camera.camera.x += 1
+    assert renderer.draw(screen, world, camera) is None
+    world.static_layer.set_mask('red')
+    assert renderer.draw(screen, world, camera) is None
+    assert renderer.draw(screen, world, camera) == []
@@ -0,0 +1,86 @@
+import itertools
+import random
+
+import pytest
+
+from src.mazegen import write_level
+from src.replay import InputRecorder, Replay, decode_inputs, encode_inputs, play_replay
+from src.world import Inputs, World
+
+
+def scripted_inputs(frames, seed=3):
+    """Held directions that change every 20 frames, with the odd mask press."""
+    rng = random.Random(seed)
+    held = Inputs()
+    for frame in range(frames):
+        if frame % 20 == 0:
+            held = Inputs(**{name: rng.random() < 0.45 for name in ('left', 'right', 'up', 'down')})
+        if frame % 97 == 5:
+            yield Inputs(left=held.left, right=held.right, up=held.up, down=held.down,
+                         equip=rng.choice(('red', 'green', 'blue', None)))
+        else:
+            yield held
+
+
+@pytest.fixture
+def maze(tmp_path):
+    return write_level(str(tmp_path / 'maze.csv'), 41, 31, seed=7, gates=1, ghosts=0.02, masks=0.05)
+
+
+def record(path, maze, frames, **modes):
+    world = World(levels=[maze], levels_dir='', preload=False, seed=11, **modes)
+    recorder = InputRecorder(path, world.seed, **modes)
+    for inputs in scripted_inputs(frames):
+        recorder.record(inputs)
+        world.step(inputs, 1 / recorder.fps)
+    recorder.close(world.state_digest())
+    return world
+
+
+def test_inputs_round_trip():
+    for left, right, up, down, reload in itertools.product((False, True), repeat=5):
+        for equip, unequip in ((None, False), ('red', False), ('green', False), ('blue', False), (None, True)):
+            inputs = Inputs(left, right, up, down, equip, unequip, reload)
+            decoded = decode_inputs(encode_inputs(inputs))
+            assert (decoded.left, decoded.right, decoded.up, decoded.down, decoded.equip, decoded.unequip,
+                    decoded.reload) == (left, right, up, down, equip, unequip, reload)
+
+
+@pytest.mark.parametrize('modes', [{}, {'streaming': True}])
+def test_replay_reproduces_the_recorded_digest(tmp_path, maze, modes):
+    path = str(tmp_path / 'run.rpl')
+    recorded = record(path, maze, 600, **modes)
+    replay = Replay.load(path)
+    assert len(replay) == 600
+    assert replay.seed == 11 and replay.streaming == modes.get('streaming', False)
+    world = play_replay(replay, levels=[maze], levels_dir='', preload=False)
+    assert world.streaming == replay.streaming
+    assert world.frame == recorded.frame
+    assert world.state_digest() == replay.final_digest == recorded.state_digest()
+
+
+def test_other_inputs_give_another_digest(tmp_path, maze):
+    path = str(tmp_path / 'run.rpl')
+    record(path, maze, 300)
+    replay = Replay.load(path)
+    replay.frames = bytes(encode_inputs(Inputs(right=True)) for _ in replay.frames)
+    world = play_replay(replay, levels=[maze], levels_dir='', preload=False)
+    assert world.state_digest() != replay.final_digest
+
+
+def test_truncated_recording_keeps_its_frames(tmp_path, maze):
+    path = str(tmp_path / 'run.rpl')
+    world = World(levels=[maze], levels_dir='', preload=False, seed=11)
+    recorder = InputRecorder(path, world.seed)
+    for inputs in itertools.islice(scripted_inputs(50), 50):
+        recorder.record(inputs)
+    recorder.file.close()  # Crashed before close() wrote the frame count
+    replay = Replay.load(path)
+    assert len(replay) == 50 and replay.final_digest == ''
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'junk.rpl'
+    path.write_bytes(b'not a replay at all, not even close')
+    with pytest.raises(ValueError):
+        Replay.load(str(path))
@@ -0,0 +1,53 @@
+import pygame
+
+from src.spatial import SpatialHash
+
+
+class Thing(pygame.sprite.Sprite):
+    def __init__(self, x, y, size=16):
+        super().__init__()
+        self.rect = pygame.Rect(x, y, size, size)
+
+
+class Other(Thing):
+    pass
+
+
+def test_query_finds_overlapping_sprites_in_insertion_order():
+    spatial = SpatialHash(64)
+    a, b, far = Thing(10, 10), Thing(60, 60), Thing(500, 500)
+    spatial.add(a, b, far)
+    assert spatial.query(pygame.Rect(0, 0, 100, 100)) == [a, b]
+    assert spatial.query(pygame.Rect(0, 0, 20, 20)) == [a]
+    assert spatial.query(pygame.Rect(30, 30, 5, 5)) == []  # Same cell, no overlap
+    assert len(spatial) == 3 and far in spatial
+
+
+def test_large_sprite_is_found_from_every_cell_it_covers():
+    spatial = SpatialHash(64)
+    big = Thing(0, 0, size=200)
+    spatial.add(big)
+    assert spatial.query(pygame.Rect(190, 190, 4, 4)) == [big]
+
+
+def test_move_rebuckets_and_remove_forgets():
+    spatial = SpatialHash(64)
+    thing = Thing(0, 0)
+    spatial.add(thing)
+    thing.rect.topleft = (300, 300)
+    spatial.move(thing)
+    assert spatial.query(pygame.Rect(0, 0, 32, 32)) == []
+    assert spatial.query(pygame.Rect(300, 300, 4, 4)) == [thing]
+    spatial.remove(thing)
+    spatial.remove(thing)  # Removing twice is harmless
+    assert spatial.query(pygame.Rect(300, 300, 4, 4)) == []
+    assert spatial.cells == {}
+
+
+def test_query_filters_by_kind():
+    spatial = SpatialHash(64)
+    thing, other = Thing(0, 0), Other(8, 8)
+    spatial.add(thing, other)
+    area = pygame.Rect(0, 0, 32, 32)
+    assert spatial.query(area, Other) == [other]
+    assert spatial.query(area, (Thing, Other)) == [thing, other]
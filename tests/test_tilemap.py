@@ -0,0 +1,54 @@
+import pygame
+
+from src import tilemap as tilemap_module
+from src.tilemap import (TILE_END, TILE_WALL, TILE_WALL_BLUE, TILE_WALL_RED, TILE_WALL_YELLOW, TileMap,
+                         find_tiles)
+
+TILE = 32
+
+
+def row_map(*tiles):
+    return TileMap.from_rows([list(tiles)], TILE)
+
+
+def test_colored_walls_open_for_their_mask_only():
+    tiles = row_map(TILE_WALL, TILE_WALL_RED, TILE_WALL_BLUE, TILE_WALL_YELLOW, TILE_END, 0)
+    solid = [tiles.is_solid(col, 0) for col in range(6)]
+    assert solid == [True, True, True, True, False, False]
+    tiles.set_mask('red')
+    assert [tiles.is_solid(col, 0) for col in range(6)] == [True, False, True, True, False, False]
+    tiles.set_mask('blue')
+    assert [tiles.is_solid(col, 0) for col in range(6)] == [True, True, False, True, False, False]
+    assert not tiles.is_solid(-1, 0) and not tiles.is_solid(6, 0)
+
+
+def test_layers_are_built_on_first_use_and_kept():
+    tiles = row_map(TILE_WALL_RED)
+    assert list(tiles.layers) == [None]
+    tiles.set_mask('red')
+    red = tiles.solid
+    tiles.set_mask(None)
+    tiles.set_mask('red')
+    assert tiles.solid is red
+    assert set(tiles.layers) == {None, 'red'}
+    tiles.set_mask('yellow')  # No mask opens yellow walls: shares the no-mask layer
+    assert tiles.solid is tiles.layers[None]
+
+
+def test_collides_checks_every_overlapped_tile():
+    tiles = TileMap.from_rows([[0, 0, 0], [0, 0, TILE_WALL]], TILE)
+    assert not tiles.collides(pygame.Rect(0, 0, 64, 32))
+    assert tiles.collides(pygame.Rect(40, 20, 30, 20))
+    assert not tiles.collides(pygame.Rect(40, 20, 24, 20))  # Right edge stops short of the wall
+    assert not tiles.collides(pygame.Rect(-50, -50, 40, 40))
+    assert not tiles.collides(pygame.Rect(64, 32, 0, 10))
+
+
+def test_find_tiles_and_layers_span_scan_blocks(monkeypatch):
+    monkeypatch.setattr(tilemap_module, 'SCAN_BLOCK', 4)
+    tiles = bytearray(10)
+    tiles[3] = tiles[4] = tiles[9] = TILE_END
+    tiles[7] = TILE_WALL
+    assert list(find_tiles(tiles, TILE_END)) == [3, 4, 9]
+    assert list(find_tiles(memoryview(bytes(tiles)), TILE_END)) == [3, 4, 9]
+    assert bytes(TileMap(10, 1, TILE, tiles).solid) == bytes([0] * 7 + [1, 0, 0])
@@ -0,0 +1,90 @@
+import pygame
+
+from src.triggers import TriggerSystem
+from src.world import PLATE_DEBOUNCE_FRAMES, Inputs
+
+TILE = 32
+
+
+class Mover:
+    def __init__(self, col, row):
+        self.rect = pygame.Rect(col * TILE, row * TILE, TILE, TILE)
+
+    def goto(self, col, row):
+        self.rect.topleft = (col * TILE, row * TILE)
+
+
+def plate(system, debounce):
+    """A one-tile zone at (2, 0) that records its events as (event, frame) pairs."""
+    events = []
+    frame = [0]
+
+    def record(name):
+        return lambda zone, occupant: events.append((name, frame[0]))
+    system.add_zone('plate', pygame.Rect(2 * TILE, 0, TILE, TILE), Mover, on_enter=record('enter'),
+                    on_stay=record('stay'), on_exit=record('exit'), debounce=debounce)
+    return events, frame
+
+
+def test_undebounced_zone_exits_at_once():
+    system = TriggerSystem(TILE)
+    events, _ = plate(system, debounce=0)
+    mover = Mover(1, 0)
+    system.add_occupant(mover)
+    mover.goto(2, 0)
+    system.move(mover)
+    mover.goto(3, 0)
+    system.move(mover)
+    assert events == [('enter', 0), ('exit', 0)]
+
+
+def test_debounced_zone_exits_after_debounce_frames():
+    system = TriggerSystem(TILE)
+    events, frame = plate(system, debounce=3)
+    mover = Mover(2, 0)
+    system.add_occupant(mover)
+    mover.goto(3, 0)
+    system.move(mover)
+    assert system.zone('plate').occupied
+    for frame[0] in range(1, 4):
+        system.tick()
+    assert events == [('enter', 0), ('exit', 3)]
+    assert not system.zone('plate').occupied
+
+
+def test_returning_within_debounce_cancels_the_exit():
+    system = TriggerSystem(TILE)
+    events, frame = plate(system, debounce=3)
+    mover = Mover(2, 0)
+    system.add_occupant(mover)
+    mover.goto(3, 0)
+    system.move(mover)
+    frame[0] = 1
+    system.tick()
+    mover.goto(2, 0)
+    system.move(mover)
+    for frame[0] in range(2, 10):
+        system.tick()
+    assert events == [('enter', 0), ('stay', 1)]
+    assert system.zone('plate').occupied
+
+
+def test_debounced_plate_stays_down_after_the_player_leaves(make_world):
+    world = make_world([
+        'w w w w w w w w',
+        'w p p1d o o o end w',
+        'w o o o o o o w',
+        'w w w w w w w w',
+    ])
+    plate = next(iter(world.presses))
+    zone = world.triggers.zone(plate)
+    left = released = None
+    for _ in range(120):
+        world.step(Inputs(right=True), 1 / 60)
+        if left is None and plate.is_pressed and not zone.occupants:
+            left = world.frame
+        if left is not None and not plate.is_pressed:
+            released = world.frame
+            break
+    assert left is not None and released is not None
+    assert released - left == PLATE_DEBOUNCE_FRAMES
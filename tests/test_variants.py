@@ -0,0 +1,44 @@
+import pygame
+
+from src.entities import GHOST_ALPHA, Door, Player
+from src.render import StaticLayer
+from src.tilemap import TILE_WALL_RED, TileMap
+from src.variants import clear_variant_cache, get_variant, variant_cache_size
+
+
+def test_open_doors_share_one_ghost_surface():
+    base = pygame.Surface((32, 32))
+    doors = [Door(0, 0, base, 1), Door(32, 0, base, 12)]
+    for door in doors:
+        door.open_door()
+    assert doors[0].image is doors[1].image is get_variant(base, alpha=GHOST_ALPHA)
+    assert doors[0].image.get_alpha() == GHOST_ALPHA
+    doors[0].close_door()
+    assert doors[0].image is base
+
+
+def test_facing_left_reuses_the_flipped_surface():
+    base = pygame.Surface((24, 24))
+    players = [Player(0, 0, base), Player(40, 0, base)]
+    for player in players:
+        player.set_direction(-1, 0)
+    flipped = get_variant(base, flip_x=True)
+    assert all(player.image is flipped for player in players)
+
+
+def test_static_layer_ghost_tiles_come_from_the_cache():
+    red_wall = pygame.Surface((32, 32))
+    layer = StaticLayer(TileMap(1, 1, 32, bytearray([TILE_WALL_RED])), {TILE_WALL_RED: red_wall})
+    layer.set_mask('red')
+    assert layer.tile_image(TILE_WALL_RED, 0, 0) is get_variant(red_wall, alpha=GHOST_ALPHA)
+
+
+def test_clearing_one_base_keeps_the_others():
+    kept, dropped = pygame.Surface((8, 8)), pygame.Surface((8, 8))
+    kept_variant = get_variant(kept, flip_x=True)
+    get_variant(dropped, flip_x=True)
+    count, _ = variant_cache_size()
+    clear_variant_cache(dropped)
+    assert variant_cache_size()[0] == count - 1
+    assert get_variant(kept, flip_x=True) is kept_variant
+    assert get_variant(kept) is kept
@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from src.mazegen import write_level
+from src.world import Inputs, World
+
+DT = 1 / 60
+
+
+def wander(world, frames, seed=3):
+    """Step world with held directions that change every 20 frames."""
+    rng = random.Random(seed)
+    held = Inputs()
+    for frame in range(frames):
+        if frame % 20 == 0:
+            held = Inputs(**{name: rng.random() < 0.45 for name in ('left', 'right', 'up', 'down')})
+        world.step(held, DT)
+
+
+@pytest.fixture
+def maze(tmp_path):
+    return write_level(str(tmp_path / 'maze.csv'), 41, 31, seed=7, gates=1, ghosts=0.03)
+
+
+def test_same_seed_and_inputs_give_the_same_state(maze):
+    worlds = [World(levels=[maze], levels_dir='', preload=False, seed=5) for _ in range(2)]
+    for world in worlds:
+        wander(world, 600)
+    assert worlds[0].frame == worlds[1].frame == 600
+    assert worlds[0].state_digest() == worlds[1].state_digest()
+    assert worlds[0].player.pos == worlds[1].player.pos
+
+
+def test_step_runs_headless_and_moves_the_player(make_world):
+    world = make_world([
+        'w w w w w w',
+        'w p o o end w',
+        'w w w w w w',
+    ])
+    start = world.player.rect.x
+    world.step(Inputs(right=True), DT)
+    assert world.frame == 1
+    assert world.player.rect.x > start
+
+
+def test_reaching_the_end_of_the_last_level_stops_the_world(make_world):
+    world = make_world([
+        'w w w w w',
+        'w p o end w',
+        'w w w w w',
+    ])
+    for _ in range(60):
+        world.step(Inputs(right=True), DT)
+        if not world.running:
+            break
+    assert not world.running
+    frame = world.frame
+    world.step(Inputs(right=True), DT)
+    assert world.frame == frame
+
+
+def test_reload_puts_the_level_back(make_world):
+    world = make_world([
+        'w w w w w w w',
+        'w p o o o end w',
+        'w w w w w w w',
+    ])
+    start = world.player.rect.topleft
+    for _ in range(10):
+        world.step(Inputs(right=True), DT)
+    assert world.player.rect.topleft != start
+    world.step(Inputs(reload=True), DT)
+    assert world.player.rect.topleft == start and world.level_index == 0